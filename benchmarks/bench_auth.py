@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for per-call authentication overhead.
+
+Compares the old behaviour (a new MSAL application plus a cache file read on
+every call) with the process-wide application used by auth.get_app(), and
+with the memoized access token fast path in auth.get_token().
+Runs fully offline: MSAL talks to a stub HTTP client and the token cache is
+seeded with a synthetic account and access token.
+"""
+
+import base64
+import json
+import os
+import sys
+import tempfile
+import time
+import pathlib as pl
+
+sys.path.insert(0, str(pl.Path(__file__).parent.parent / "src"))
+
+import msal  # noqa: E402
+from microsoft_graph_mcp import auth  # noqa: E402
+
+CLIENT_ID = "00000000-0000-0000-0000-000000000000"
+TENANT_ID = "common"
+ITERATIONS = 2000
+
+
+def _b64(data: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+
+
+class _Response:
+    def __init__(self, payload: dict) -> None:
+        self.status_code = 200
+        self.headers: dict[str, str] = {}
+        self.text = json.dumps(payload)
+
+    def raise_for_status(self) -> None:
+        pass
+
+
+class StubHttpClient:
+    """Answers MSAL's discovery requests without touching the network"""
+
+    requests = 0
+
+    def get(self, url: str, **kwargs) -> _Response:
+        StubHttpClient.requests += 1
+        base = f"https://login.microsoftonline.com/{TENANT_ID}"
+        return _Response(
+            {
+                "authorization_endpoint": f"{base}/oauth2/v2.0/authorize",
+                "token_endpoint": f"{base}/oauth2/v2.0/token",
+                "device_authorization_endpoint": f"{base}/oauth2/v2.0/devicecode",
+                "issuer": "https://login.microsoftonline.com/{tenantid}/v2.0",
+                "tenant_discovery_endpoint": f"{base}/v2.0/.well-known/openid-configuration",
+                "metadata": [],
+            }
+        )
+
+    def post(self, url: str, **kwargs) -> _Response:
+        StubHttpClient.requests += 1
+        return _Response({"error": "invalid_request"})
+
+    def close(self) -> None:
+        pass
+
+
+def seed_cache(path: pl.Path) -> None:
+    cache = msal.SerializableTokenCache()
+    id_token = ".".join(
+        [
+            _b64({"alg": "none"}),
+            _b64(
+                {
+                    "oid": "bench-oid",
+                    "tid": "bench-tid",
+                    "preferred_username": "bench@example.com",
+                    "aud": CLIENT_ID,
+                    "iss": "https://login.microsoftonline.com/bench-tid/v2.0",
+                }
+            ),
+            "",
+        ]
+    )
+    cache.add(
+        {
+            "client_id": CLIENT_ID,
+            "scope": auth.SCOPES,
+            "token_endpoint": f"https://login.microsoftonline.com/{TENANT_ID}/oauth2/v2.0/token",
+            "response": {
+                "access_token": "bench-access-token",
+                "expires_in": 3600,
+                "refresh_token": "bench-refresh-token",
+                "id_token": id_token,
+                "client_info": _b64({"uid": "bench-oid", "utid": "bench-tid"}),
+                "token_type": "Bearer",
+                "scope": " ".join(auth.SCOPES),
+            },
+        }
+    )
+    path.write_text(cache.serialize())
+
+
+def get_token_uncached() -> str:
+    """The pre-singleton code path: build the app and read the cache every call"""
+    cache = msal.SerializableTokenCache()
+    cache.deserialize(auth.CACHE_FILE.read_text())
+    app = msal.PublicClientApplication(
+        CLIENT_ID,
+        authority=f"https://login.microsoftonline.com/{TENANT_ID}",
+        token_cache=cache,
+        http_client=StubHttpClient(),
+    )
+    account = app.get_accounts()[0]
+    result = app.acquire_token_silent(auth.SCOPES, account=account)
+    return result["access_token"]
+
+
+def get_token_unmemoized() -> str:
+    auth._tokens.clear()
+    return auth.get_token()
+
+
+def bench(label: str, fn) -> float:
+    StubHttpClient.requests = 0
+    fn()
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        fn()
+    per_call = (time.perf_counter() - start) / ITERATIONS * 1e6
+    print(
+        f"{label:<12} {per_call:10.1f} us/call"
+        f"   stub HTTP requests: {StubHttpClient.requests}"
+    )
+    return per_call
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        auth.CACHE_FILE = pl.Path(tmp) / "token_cache.json"
+        seed_cache(auth.CACHE_FILE)
+
+        os.environ["MICROSOFT_MCP_CLIENT_ID"] = CLIENT_ID
+        os.environ["MICROSOFT_MCP_TENANT_ID"] = TENANT_ID
+        auth.BACKGROUND_REFRESH = False
+        auth._build_app = lambda client_id, tenant_id: msal.PublicClientApplication(
+            client_id,
+            authority=f"https://login.microsoftonline.com/{tenant_id}",
+            token_cache=auth._TokenCache(),
+            http_client=StubHttpClient(),
+        )
+
+        print(f"Per-call auth overhead over {ITERATIONS} calls\n")
+        before = bench("new app", get_token_uncached)
+        reused = bench("reused app", get_token_unmemoized)
+        memoized = bench("memoized", auth.get_token)
+        print(
+            f"\nspeedup: {before / reused:.1f}x (reused app),"
+            f" {before / memoized:.1f}x (memoized token)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Measure what the body pipeline saves on a page of list_emails.
+
+Builds a page of HTML replies that each quote the thread before them, as
+Outlook sends them, and compares the JSON size of the bodies as Graph
+returns them, converted to text, with quoted history and signatures
+stripped, and within the per-message and total budgets. Also times the
+HTML-to-text conversion.
+"""
+
+import copy
+import json
+import sys
+import time
+import pathlib as pl
+
+sys.path.insert(0, str(pl.Path(__file__).parent.parent / "src"))
+
+from microsoft_graph_mcp import bodies  # noqa: E402
+
+PAGE = 50
+
+
+def reply(i: int) -> str:
+    own = f"<p>Update {i}: " + "the figures for the quarter are in and look fine. " * 8
+    own += "</p><p>Regards,<br>Person %d</p>" % i
+    signature = (
+        "<div>-- <br>Person %d | Finance | Contoso<br>"
+        "<a href=\"https://contoso.com\">contoso.com</a></div>" % i
+    )
+    return own + signature
+
+
+def message(i: int) -> dict:
+    # Each message quotes every earlier one in its thread of up to 20
+    thread = range(i - i % 20, i)
+    quoted = "".join(
+        '<hr><div style="font-family:Calibri"><b>From:</b> Person %d<br>'
+        "<b>Sent:</b> Monday, October 5, 2026 09:30<br><b>Subject:</b> Update"
+        "</div>%s" % (j, reply(j))
+        for j in reversed(thread)
+    )
+    content = (
+        '<html><head><style>p { margin: 0 }</style></head><body dir="ltr">'
+        f"{reply(i)}{quoted}</body></html>"
+    )
+    return {"id": f"m{i}", "body": {"contentType": "html", "content": content}}
+
+
+def size(value: object) -> int:
+    return len(json.dumps(value).encode())
+
+
+def main() -> None:
+    page = [message(i) for i in range(PAGE)]
+    text = [
+        {**m, "body": {"contentType": "text", "content": bodies.body_text(m["body"])}}
+        for m in page
+    ]
+    stages = [
+        ("html", page),
+        ("text", text),
+        ("own text", list(bodies.trim(copy.deepcopy(page), 10**9, None))),
+        ("budgeted", list(bodies.trim(copy.deepcopy(page)))),
+    ]
+    raw = size(page)
+    print(f"{PAGE} messages per page\n")
+    for name, stage in stages:
+        print(f"{name:<10} {size(stage):>9,} bytes {1 - size(stage) / raw:>6.0%} saved")
+
+    start = time.perf_counter()
+    rounds = 20
+    for _ in range(rounds):
+        for m in page:
+            bodies.html_to_text(m["body"]["content"])
+    elapsed = time.perf_counter() - start
+    total = sum(len(m["body"]["content"]) for m in page) * rounds
+    print(f"\nhtml_to_text: {total / elapsed / 1e6:.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
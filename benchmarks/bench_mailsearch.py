@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark the local full-text index behind search_emails.
+
+Feeds a synthetic mailbox through mailsync.apply_changes in delta-sized
+pages, the way a first sync of a large mailbox would, then times ranked
+queries with snippets against it. Graph's $search answers in hundreds of
+milliseconds and counts against the mailbox's throttling budget; the local
+index should answer in a few milliseconds.
+"""
+
+import random
+import string
+import sys
+import tempfile
+import time
+import pathlib as pl
+
+sys.path.insert(0, str(pl.Path(__file__).parent.parent / "src"))
+
+from microsoft_graph_mcp import mailsync, syncstore  # noqa: E402
+
+MESSAGES = 100_000
+PAGE = 1000
+FOLDERS = ["inbox", "sentitems", "archive", "projects"]
+# Share of messages mentioning each topic, from common to rare
+TOPICS = {
+    "meeting notes": 0.05,
+    "quarterly budget review": 0.01,
+    "invoice acme": 0.001,
+}
+QUERIES = [
+    "the",  # worst case: in nearly every message
+    "meeting notes",
+    "quarterly budget review",
+    "invoice acme",
+    "budg",
+    "zzzz",
+]
+RUNS = 50
+
+
+def vocabulary(rng: random.Random) -> list[str]:
+    words = {
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9)))
+        for _ in range(20_000)
+    }
+    return ["the"] + sorted(words)
+
+
+def text(rng: random.Random, words: list[str], n: int) -> str:
+    # Zipf-like: "the" and a few others are everywhere, most words are rare
+    ranks = (int(rng.paretovariate(1.1)) - 1 for _ in range(n))
+    return " ".join(words[rank % len(words)] for rank in ranks)
+
+
+def message(rng: random.Random, words: list[str], i: int) -> dict:
+    subject = text(rng, words, 6)
+    body = text(rng, words, 120)
+    for topic, share in TOPICS.items():
+        if rng.random() < share:
+            body += f" {topic}"
+            if rng.random() < 0.3:
+                subject += f" {topic}"
+    sender = rng.choice(words[1:500])
+    return {
+        "id": f"m{i}",
+        "subject": subject,
+        "from": {"emailAddress": {"name": sender, "address": f"{sender}@example.com"}},
+        "toRecipients": [{"emailAddress": {"name": "Me", "address": "me@example.com"}}],
+        "receivedDateTime": f"2026-{1 + i % 12:02d}-{1 + i % 28:02d}T10:00:00Z",
+        "body": {"contentType": "html", "content": f"<div><p>{body}</p></div>"},
+        "isRead": bool(i % 3),
+    }
+
+
+def main() -> None:
+    rng = random.Random(1)
+    words = vocabulary(rng)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = syncstore.SyncStore(pl.Path(tmp) / "sync.db")
+        syncstore._store = store
+        store.ensure(mailsync.SCHEMA)
+
+        pages = [
+            [message(rng, words, i) for i in range(start, min(start + PAGE, MESSAGES))]
+            for start in range(0, MESSAGES, PAGE)
+        ]
+        started = time.perf_counter()
+        for n, page in enumerate(pages):
+            with store.transaction() as conn:
+                mailsync.apply_changes(conn, "bench", FOLDERS[n % len(FOLDERS)], page)
+        elapsed = time.perf_counter() - started
+        size = (pl.Path(tmp) / "sync.db").stat().st_size + (
+            pl.Path(tmp) / "sync.db-wal"
+        ).stat().st_size
+        print(
+            f"indexed {MESSAGES:,} messages in {elapsed:.1f} s"
+            f"  ({MESSAGES / elapsed:,.0f} msg/s, database {size / 2**20:.0f} MiB)\n"
+        )
+
+        print(f"{'query':<36} {'hits':>5} {'p50 ms':>8} {'p95 ms':>8}")
+        for query in QUERIES:
+            for folder in (None, "archive"):
+                timings = []
+                for _ in range(RUNS):
+                    started = time.perf_counter()
+                    hits = mailsync.query_index("bench", query, folder, limit=25)
+                    timings.append((time.perf_counter() - started) * 1000)
+                timings.sort()
+                label = query if folder is None else f"{query} [{folder}]"
+                print(
+                    f"{label:<36} {len(hits):>5} {timings[RUNS // 2]:>8.2f}"
+                    f" {timings[int(RUNS * 0.95)]:>8.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
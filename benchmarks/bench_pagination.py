@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark page prefetch in request_paginated() and arequest_paginated().
+
+A local server answers paged listings after a fixed delay, standing in for
+Graph's per-page latency. Each listing is consumed with and without
+read-ahead, both by a plain collector (what list_emails, list_events and
+list_contacts do) and by consumers that spend time on every page. Prefetch
+pays off in proportion to the work done between pages: a collector has
+next to none, so its listing still costs one round trip per page.
+"""
+
+import asyncio
+import http.server
+import json
+import os
+import sys
+import threading
+import time
+import pathlib as pl
+import urllib.parse
+
+sys.path.insert(0, str(pl.Path(__file__).parent.parent / "src"))
+# Measure round trips, not request pacing
+os.environ["MICROSOFT_MCP_RATE_LIMIT"] = "0"
+os.environ["MICROSOFT_MCP_HTTP2"] = "0"
+
+from microsoft_graph_mcp import graph  # noqa: E402
+
+LATENCY = 0.08
+PAGES = 10
+PAGE_SIZE = 100
+WORK_PER_PAGE = 0.06
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self) -> None:
+        time.sleep(LATENCY)
+        url = urllib.parse.urlsplit(self.path)
+        page = int(urllib.parse.parse_qs(url.query).get("page", ["0"])[0])
+        body = {"value": [{"id": f"{page}-{i}"} for i in range(PAGE_SIZE)]}
+        if page + 1 < PAGES:
+            body["@odata.nextLink"] = f"{graph.BASE_URL}{url.path}?page={page + 1}"
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+async def collect(prefetch: int) -> int:
+    return len(
+        [
+            item
+            async for item in graph.arequest_paginated(
+                "/me/messages", prefetch=prefetch
+            )
+        ]
+    )
+
+
+async def process_async(prefetch: int) -> int:
+    count = 0
+    async for _ in graph.arequest_paginated("/me/events", prefetch=prefetch):
+        count += 1
+        if count % PAGE_SIZE == 0:
+            await asyncio.sleep(WORK_PER_PAGE)  # e.g. writing the page to a store
+    return count
+
+
+async def process_sync(prefetch: int) -> int:
+    count = 0
+    for _ in graph.request_paginated("/me/contacts", prefetch=prefetch):
+        count += 1
+        if count % PAGE_SIZE == 0:
+            time.sleep(WORK_PER_PAGE)
+    return count
+
+
+def main() -> None:
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    graph.BASE_URL = f"http://127.0.0.1:{server.server_address[1]}/v1.0"
+
+    async def token(account_id: str | None = None) -> str:
+        return "token"
+
+    graph.aget_token = token
+    graph.get_token = lambda account_id=None: "token"
+
+    print(
+        f"{PAGES} pages of {PAGE_SIZE} items, {LATENCY * 1000:.0f} ms per page,"
+        f" {WORK_PER_PAGE * 1000:.0f} ms of consumer work per page\n"
+    )
+    print(f"{'consumer':<28} {'prefetch 0':>11} {'prefetch 1':>11} {'prefetch 2':>11}")
+    for label, consume in [
+        ("collect (list tools)", collect),
+        ("async work per page", process_async),
+        ("blocking work per page", process_sync),
+    ]:
+        timings = []
+        for prefetch in (0, 1, 2):
+            graph._async_clients.clear()
+            started = time.perf_counter()
+            assert asyncio.run(consume(prefetch)) == PAGES * PAGE_SIZE
+            timings.append(time.perf_counter() - started)
+        print(f"{label:<28}" + "".join(f" {t * 1000:>8.0f} ms" for t in timings))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark connection reuse of the Graph HTTP pools.
+
+An agent talks to Graph in bursts separated by think time. This sends bursts
+of concurrent requests to a local HTTP/1.1 server, pausing longer than
+httpx's default 5 s keep-alive expiry between bursts, and counts the TCP
+connections each client configuration opens. Against graph.microsoft.com
+every extra connection is an extra TLS handshake.
+"""
+
+import asyncio
+import http.server
+import sys
+import threading
+import time
+import pathlib as pl
+
+sys.path.insert(0, str(pl.Path(__file__).parent.parent / "src"))
+
+import httpx  # noqa: E402
+from microsoft_graph_mcp import graph  # noqa: E402
+
+LATENCY = 0.005
+CONCURRENCY = 20
+ROUNDS = 4
+THINK_TIME = 6.0
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self) -> None:
+        time.sleep(LATENCY)
+        body = b'{"value": []}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class CountingServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+    connections = 0
+
+    def get_request(self):
+        CountingServer.connections += 1
+        return super().get_request()
+
+
+async def bursts(url: str, client: httpx.AsyncClient) -> None:
+    async with client:
+        for i in range(ROUNDS):
+            if i:
+                await asyncio.sleep(THINK_TIME)
+            responses = await asyncio.gather(
+                *(client.get(url) for _ in range(CONCURRENCY))
+            )
+            for response in responses:
+                response.raise_for_status()
+
+
+def run(label: str, url: str, client: httpx.AsyncClient) -> None:
+    CountingServer.connections = 0
+    asyncio.run(bursts(url, client))
+    total = CONCURRENCY * ROUNDS
+    reused = 1 - CountingServer.connections / total
+    print(
+        f"{label:<22} {CountingServer.connections:4d} connections"
+        f" for {total} requests   ({reused:.0%} reused)"
+    )
+
+
+def main() -> None:
+    server = CountingServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1.0/me"
+
+    options = graph._client_options()
+    options["http2"] = False  # the local server only speaks HTTP/1.1
+
+    print(
+        f"{ROUNDS} bursts of {CONCURRENCY} concurrent requests,"
+        f" {THINK_TIME:.0f} s apart\n"
+    )
+    run("httpx defaults", url, httpx.AsyncClient())
+    run("configured pool", url, httpx.AsyncClient(**options))
+    print(
+        f"\nkeep-alive expiry {graph.HTTP_KEEPALIVE_EXPIRY:.0f} s,"
+        f" max keep-alive {graph.HTTP_MAX_KEEPALIVE},"
+        f" HTTP/2 for Graph pools: {graph.HTTP2}"
+    )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Measure how many bytes response slimming and field projection save per tool.
+
+Builds Graph-shaped payloads for a page of each list tool and compares the
+serialized size of the raw page, the slimmed page, and a slimmed page
+restricted to a typical fields selection. Sizes are of the JSON an MCP
+client receives.
+"""
+
+import json
+import sys
+import pathlib as pl
+
+sys.path.insert(0, str(pl.Path(__file__).parent.parent / "src"))
+
+from microsoft_graph_mcp import responses  # noqa: E402
+
+PAGE = 50
+
+
+def person(i: int) -> dict:
+    address = {"name": f"Person {i}", "address": f"person{i}@contoso.com"}
+    return {"emailAddress": address}
+
+
+def message(i: int) -> dict:
+    return {
+        "@odata.etag": f'W/"CQAAABYAAAB{i:08d}lRqXlG2+m0C8L8L9v7IAAA=="',
+        "id": f"AAMkAGVmMDEzMTM4LTZmYWUtNDdkNC1hMDZiLTU1OGY5OTZhYmY4OABGAAAAAAAiQ8W967B7TKBjgx9rVEURBwAiIsqMbYjsT5e-T7KzowPTAAAAAAEMAAAiIsqMbYjsT5e-T7KzowPTAAA{i:04d}",
+        "subject": f"Re: Project update {i}",
+        "from": person(i),
+        "toRecipients": [person(0), person(i + 1)],
+        "ccRecipients": [],
+        "receivedDateTime": "2026-10-01T09:30:00Z",
+        "hasAttachments": False,
+        "body": {
+            "contentType": "html",
+            "content": "<html><head><meta http-equiv=\"Content-Type\" content=\"text/html; charset=utf-8\"></head><body><div>"
+            + "Thanks, the numbers look good. " * 20
+            + "</div></body></html>",
+        },
+        "conversationId": "AAQkAGVmMDEzMTM4LTZmYWUtNDdkNC1hMDZiLTU1OGY5OTZhYmY4OAAQAMb",
+        "isRead": bool(i % 2),
+    }
+
+
+def event(i: int) -> dict:
+    return {
+        "@odata.etag": f'W/"ZlnW4RIAV06KYYwlrfNZvQAAKGWwbw{i:04d}=="',
+        "id": f"AAMkAGIAAAoZDOFAAA{i:04d}",
+        "subject": f"Weekly sync {i}",
+        "start": {"dateTime": "2026-10-20T10:00:00.0000000", "timeZone": "UTC"},
+        "end": {"dateTime": "2026-10-20T10:30:00.0000000", "timeZone": "UTC"},
+        "location": {
+            "displayName": "",
+            "locationType": "default",
+            "uniqueIdType": "unknown",
+            "address": {},
+            "coordinates": {},
+        },
+        "body": {"contentType": "html", "content": ""},
+        "attendees": [
+            {
+                "type": "required",
+                "status": {"response": "none", "time": "0001-01-01T00:00:00Z"},
+                **person(j),
+            }
+            for j in range(4)
+        ],
+        "organizer": person(0),
+        "isAllDay": False,
+        "recurrence": None,
+        "onlineMeeting": None,
+        "seriesMasterId": None,
+    }
+
+
+def contact(i: int) -> dict:
+    return {
+        "@odata.etag": f'W/"EQAAABYAAAD{i:04d}"',
+        "id": f"AAMkADh6v5AAAvgTCEAAA{i:04d}",
+        "createdDateTime": "2026-01-01T00:00:00Z",
+        "lastModifiedDateTime": "2026-01-01T00:00:00Z",
+        "changeKey": "EQAAABYAAAD",
+        "categories": [],
+        "parentFolderId": "AAMkADh6v5AAAAAAEOAAA=",
+        "birthday": None,
+        "fileAs": "",
+        "displayName": f"Person {i}",
+        "givenName": "Person",
+        "initials": None,
+        "middleName": None,
+        "nickName": None,
+        "surname": str(i),
+        "title": None,
+        "yomiGivenName": None,
+        "yomiSurname": None,
+        "yomiCompanyName": None,
+        "generation": None,
+        "imAddresses": [],
+        "jobTitle": None,
+        "companyName": "Contoso",
+        "department": None,
+        "officeLocation": None,
+        "profession": None,
+        "businessHomePage": None,
+        "assistantName": None,
+        "manager": None,
+        "homePhones": [],
+        "mobilePhone": None,
+        "businessPhones": ["+1 555 0100"],
+        "spouseName": None,
+        "personalNotes": "",
+        "children": [],
+        "emailAddresses": [{"name": f"Person {i}", "address": f"person{i}@contoso.com"}],
+        "homeAddress": {},
+        "businessAddress": {},
+        "otherAddress": {},
+    }
+
+
+def size(value: object) -> int:
+    return len(json.dumps(value).encode())
+
+
+def main() -> None:
+    cases = [
+        ("list_emails", message, ["subject", "from", "receivedDateTime", "isRead"]),
+        ("list_events", event, ["subject", "start", "end", "organizer"]),
+        ("list_contacts", contact, ["displayName", "emailAddresses"]),
+    ]
+    print(f"{PAGE} items per page\n")
+    print(f"{'tool':<16} {'raw':>9} {'slimmed':>9} {'saved':>6} {'+fields':>9} {'saved':>6}")
+    for tool, build, fields in cases:
+        page = [build(i) for i in range(PAGE)]
+        raw = size(page)
+        slimmed = size(responses.slim(page))
+        projected = size(responses.slim(responses.project(page, fields)))
+        print(
+            f"{tool:<16} {raw:>9,} {slimmed:>9,} {1 - slimmed / raw:>6.0%}"
+            f" {projected:>9,} {1 - projected / raw:>6.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
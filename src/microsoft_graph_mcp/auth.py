@@ -1,13 +1,35 @@
+import asyncio
 import os
 import msal
 import pathlib as pl
+import random
+import threading
+import time
+import weakref
 from typing import NamedTuple
 from dotenv import load_dotenv
+from microsoft_graph_mcp.token_store import (
+    CacheState,
+    FileTokenStore,
+    SqliteTokenStore,
+    TokenStore,
+    apply_changes,
+    diff_state,
+)
 
 load_dotenv()
 
 CACHE_FILE = pl.Path.home() / ".microsoft_mcp_token_cache.json"
+# "file" (JSON, default) or "sqlite" for caches holding many accounts
+TOKEN_STORE = os.getenv("MICROSOFT_MCP_TOKEN_STORE", "file")
 SCOPES = ["https://graph.microsoft.com/.default"]
+# Seconds before expiry at which a memoized access token is no longer handed out
+TOKEN_EXPIRY_SKEW = int(os.getenv("MICROSOFT_MCP_TOKEN_EXPIRY_SKEW", "300"))
+# Have the server proactively renew tokens in a background thread so tool calls
+# never wait on login; library and CLI use never starts the thread
+BACKGROUND_REFRESH = os.getenv("MICROSOFT_MCP_BACKGROUND_REFRESH", "1") != "0"
+# Upper bound of the random delay spreading account refreshes apart
+REFRESH_JITTER = float(os.getenv("MICROSOFT_MCP_REFRESH_JITTER", "60"))
 
 
 class Account(NamedTuple):
@@ -15,53 +37,248 @@ class Account(NamedTuple):
     account_id: str
 
 
-def _read_cache() -> str | None:
-    try:
-        return CACHE_FILE.read_text()
-    except FileNotFoundError:
-        return None
+class _TokenCache(msal.SerializableTokenCache):
+    """Serializable cache exposing its raw state for incremental persistence
 
+    ``generation`` increases on every change so derived indexes know when to
+    rebuild.
+    """
 
-def _write_cache(content: str) -> None:
-    CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
-    CACHE_FILE.write_text(content)
+    generation = 0
+
+    def modify(self, credential_type, old_entry, new_key_value_pairs=None):
+        super().modify(credential_type, old_entry, new_key_value_pairs)
+        self.generation += 1
+
+    def state(self) -> CacheState:
+        with self._lock:
+            return {section: dict(entries) for section, entries in self._cache.items()}
+
+    def replace(self, state: CacheState) -> None:
+        with self._lock:
+            self._cache = state
+            self.has_state_changed = False
+            self.generation += 1
+
+    def reload(self, stored: CacheState, snapshot: CacheState) -> None:
+        """Take the stored state, keeping what changed here since snapshot
+
+        Another thread may have written tokens (a rotated refresh token
+        among them) that are not saved yet; those stay and stay unsaved.
+        """
+        with self._lock:
+            upserts, deletions = diff_state(snapshot, self._cache)
+            self._cache = apply_changes(stored, upserts, deletions)
+            self.has_state_changed = bool(upserts or deletions)
+            self.generation += 1
+
+
+class _AppState:
+    """A long-lived MSAL application and the store version it has loaded"""
+
+    def __init__(self, app: msal.PublicClientApplication, store: TokenStore) -> None:
+        self.app = app
+        self.store = store
+        self.version: object = None
+        self.loaded = False
+        self.snapshot: CacheState = {}
+
+
+class _AccountIndex:
+    """Cached accounts indexed by home_account_id and case-folded username"""
+
+    def __init__(self, accounts: list[dict], generation: int | None) -> None:
+        self.accounts = accounts
+        self.generation = generation
+        self.by_id = {a["home_account_id"]: a for a in accounts}
+        self.by_username = {a.get("username", "").casefold(): a for a in accounts}
+
+    def find(self, account_id: str | None) -> dict | None:
+        """Look up an account by id or email address, or the first one if None"""
+        if not account_id:
+            return self.accounts[0] if self.accounts else None
+        return self.by_id.get(account_id) or self.by_username.get(
+            account_id.casefold()
+        )
+
+
+class _CachedToken(NamedTuple):
+    access_token: str
+    expires_at: float
+
+
+_apps: dict[tuple[str, str], _AppState] = {}
+_apps_lock = threading.RLock()
+
+_account_indexes: weakref.WeakKeyDictionary[
+    msal.PublicClientApplication, _AccountIndex
+] = weakref.WeakKeyDictionary()
+
+# Access tokens keyed by home_account_id; usernames and None map to it via aliases
+_tokens: dict[str | None, _CachedToken] = {}
+_token_aliases: dict[str | None, str] = {}
+_stale_tokens: set[str | None] = set()
+
+
+def _get_store() -> TokenStore:
+    if TOKEN_STORE == "sqlite":
+        return SqliteTokenStore(CACHE_FILE.with_suffix(".db"), seed=CACHE_FILE)
+    if TOKEN_STORE != "file":
+        raise ValueError(f"Unknown MICROSOFT_MCP_TOKEN_STORE: {TOKEN_STORE}")
+    return FileTokenStore(CACHE_FILE)
+
+
+def _load_cache(state: _AppState) -> None:
+    """Reload the token cache if another writer changed the store since the last load"""
+    version = state.store.version()
+    if state.loaded and version == state.version:
+        return
+
+    cache = state.app.token_cache
+    if isinstance(cache, _TokenCache):
+        data = state.store.load()
+        stored = {section: dict(entries) for section, entries in data.items()}
+        cache.reload(data, state.snapshot)
+        state.snapshot = stored
+    state.version = version
+    state.loaded = True
+
+
+def _save_cache(app: msal.PublicClientApplication) -> None:
+    """Persist the entries MSAL changed, merged into the shared store under its lock"""
+    cache = app.token_cache
+    if not isinstance(cache, _TokenCache):
+        return
+
+    with _apps_lock:
+        if not cache.has_state_changed:
+            return
+        state = next((s for s in _apps.values() if s.app is app), None)
+        if state is None:
+            return
+        # Cleared first, so a write landing after the copy is saved next time
+        cache.has_state_changed = False
+        current = cache.state()
+        upserts, deletions = diff_state(state.snapshot, current)
+        if upserts or deletions:
+            state.store.save(upserts, deletions)
+        state.snapshot = current
+        # Pick up entries written by other processes before ours
+        _load_cache(state)
+
+
+def _build_app(client_id: str, tenant_id: str) -> msal.PublicClientApplication:
+    authority = f"https://login.microsoftonline.com/{tenant_id}"
+    return msal.PublicClientApplication(
+        client_id, authority=authority, token_cache=_TokenCache()
+    )
 
 
 def get_app() -> msal.PublicClientApplication:
+    """Return the process-wide MSAL application for the configured client and tenant
+
+    The application (and its tenant discovery) is built once per
+    (client_id, tenant) pair. The persisted token cache is only re-read when
+    another writer has changed it.
+    """
     client_id = os.getenv("MICROSOFT_MCP_CLIENT_ID")
-    print( "client_id : ", client_id, " MICROSOFT_MCP_TENANT_ID : ", os.getenv("MICROSOFT_MCP_TENANT_ID"))
     if not client_id:
         raise ValueError("MICROSOFT_MCP_CLIENT_ID environment variable is required")
 
     tenant_id = os.getenv("MICROSOFT_MCP_TENANT_ID", "common")
-    authority = f"https://login.microsoftonline.com/{tenant_id}"
+    key = (client_id, tenant_id)
+
+    with _apps_lock:
+        state = _apps.get(key)
+        if state is None:
+            state = _AppState(_build_app(client_id, tenant_id), _get_store())
+            _apps[key] = state
+        _load_cache(state)
+        return state.app
+
+
+def _remember_token(key: str | None, result: dict) -> None:
+    expires_in = int(result.get("expires_in") or 0)
+    if expires_in > TOKEN_EXPIRY_SKEW:
+        _tokens[key] = _CachedToken(
+            result["access_token"], time.monotonic() + expires_in
+        )
 
-    cache = msal.SerializableTokenCache()
-    cache_content = _read_cache()
-    if cache_content:
-        cache.deserialize(cache_content)
 
-    app = msal.PublicClientApplication(
-        client_id, authority=authority, token_cache=cache
-    )
+def account_key(account_id: str | None) -> str | None:
+    """Canonical id for per-account state, resolved without touching MSAL
 
-    return app
+    Email addresses map to their home_account_id once get_token() has seen them.
+    """
+    return _token_aliases.get(account_id, account_id)
 
 
-def get_token(account_id: str | None = None) -> str:
-    app = get_app()
+def invalidate_token(account_id: str | None = None) -> None:
+    """Drop the memoized token so the next get_token() forces a refresh
 
-    accounts = app.get_accounts()
-    account = None
+    Used when Graph rejects a token with 401 before its advertised expiry.
+    """
+    key = account_key(account_id)
+    _tokens.pop(key, None)
+    _stale_tokens.add(key)
 
-    if account_id:
-        account = next(
-            (a for a in accounts if a["home_account_id"] == account_id), None
-        )
-    elif accounts:
-        account = accounts[0]
 
-    result = app.acquire_token_silent(SCOPES, account=account)
+def _account_index(app: msal.PublicClientApplication) -> _AccountIndex:
+    """Return the account index for app, rebuilding it only after cache changes"""
+    cache = app.token_cache
+    generation = cache.generation if isinstance(cache, _TokenCache) else None
+    with _apps_lock:
+        index = _account_indexes.get(app)
+        if index is None or generation is None or index.generation != generation:
+            index = _AccountIndex(app.get_accounts(), generation)
+            _account_indexes[app] = index
+            # Any token write bumps the generation; only aliases of accounts
+            # that were signed out stop being valid
+            for alias, key in list(_token_aliases.items()):
+                if key not in index.by_id:
+                    del _token_aliases[alias]
+        return index
+
+
+def _find_account(
+    app: msal.PublicClientApplication, account_id: str | None
+) -> dict | None:
+    return _account_index(app).find(account_id)
+
+
+def resolve_account_id(account_id: str | None) -> str | None:
+    """Map an email address (or None for the default account) to its home_account_id"""
+    account = _find_account(get_app(), account_id)
+    return account["home_account_id"] if account else account_id
+
+
+def peek_token(account_id: str | None = None) -> str | None:
+    """Return the memoized access token if it is still fresh, without calling MSAL"""
+    cached = _tokens.get(account_key(account_id))
+    if cached and time.monotonic() < cached.expires_at - TOKEN_EXPIRY_SKEW:
+        return cached.access_token
+    return None
+
+
+def get_token(account_id: str | None = None) -> str:
+    """Return an access token for the account given by id or email address"""
+    token = peek_token(account_id)
+    if token:
+        return token
+
+    app = get_app()
+    account = _find_account(app, account_id)
+    key = account["home_account_id"] if account else account_id
+    if key != account_id:
+        _token_aliases[account_id] = key
+        cached = _tokens.get(key)
+        if cached and time.monotonic() < cached.expires_at - TOKEN_EXPIRY_SKEW:
+            return cached.access_token
+
+    force_refresh = key in _stale_tokens
+    result = app.acquire_token_silent(
+        SCOPES, account=account, force_refresh=force_refresh
+    )
 
     if not result:
         flow = app.initiate_device_flow(scopes=SCOPES)
@@ -83,19 +300,37 @@ def get_token(account_id: str | None = None) -> str:
             f"Auth failed: {result.get('error_description', result['error'])}"
         )
 
-    cache = app.token_cache
-    if isinstance(cache, msal.SerializableTokenCache) and cache.has_state_changed:
-        _write_cache(cache.serialize())
+    _save_cache(app)
+    _stale_tokens.discard(key)
+    _remember_token(key, result)
 
     return result["access_token"]
 
 
+def _to_account(account: dict) -> Account:
+    return Account(username=account["username"], account_id=account["home_account_id"])
+
+
+def _account_for_result(
+    app: msal.PublicClientApplication, result: dict
+) -> Account | None:
+    """Find the cached account a device flow result signed in"""
+    index = _account_index(app)
+    username = result.get("id_token_claims", {}).get("preferred_username", "")
+    account = index.by_username.get(username.casefold())
+    if account is None and index.accounts:
+        # If exact match not found, return the last account
+        account = index.accounts[-1]
+    return _to_account(account) if account else None
+
+
+async def aget_token(account_id: str | None = None) -> str:
+    """Async get_token() that only leaves the event loop when MSAL has to do I/O"""
+    return peek_token(account_id) or await asyncio.to_thread(get_token, account_id)
+
+
 def list_accounts() -> list[Account]:
-    app = get_app()
-    return [
-        Account(username=a["username"], account_id=a["home_account_id"])
-        for a in app.get_accounts()
-    ]
+    return [_to_account(a) for a in _account_index(get_app()).accounts]
 
 
 def authenticate_new_account() -> Account | None:
@@ -123,28 +358,145 @@ def authenticate_new_account() -> Account | None:
             f"Auth failed: {result.get('error_description', result['error'])}"
         )
 
-    cache = app.token_cache
-    if isinstance(cache, msal.SerializableTokenCache) and cache.has_state_changed:
-        _write_cache(cache.serialize())
-
-    # Get the newly added account
-    accounts = app.get_accounts()
-    if accounts:
-        # Find the account that matches the token we just got
-        for account in accounts:
-            if (
-                account.get("username", "").lower()
-                == result.get("id_token_claims", {})
-                .get("preferred_username", "")
-                .lower()
-            ):
-                return Account(
-                    username=account["username"], account_id=account["home_account_id"]
-                )
-        # If exact match not found, return the last account
-        account = accounts[-1]
-        return Account(
-            username=account["username"], account_id=account["home_account_id"]
+    _save_cache(app)
+
+    return _account_for_result(app, result)
+
+
+class RefreshMetrics:
+    """Counters describing the background token refresher"""
+
+    def __init__(self) -> None:
+        self.refreshes = 0
+        self.failures = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.last_error: str | None = None
+
+    def record(self, latency: float, error: Exception | None = None) -> None:
+        if error is None:
+            self.refreshes += 1
+        else:
+            self.failures += 1
+            self.last_error = str(error)
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+
+    def snapshot(self) -> dict[str, float | int | str | None]:
+        attempts = self.refreshes + self.failures
+        return {
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "avg_latency_ms": round(self.total_latency / attempts * 1000, 2)
+            if attempts
+            else 0.0,
+            "max_latency_ms": round(self.max_latency * 1000, 2),
+            "last_error": self.last_error,
+        }
+
+
+class TokenRefresher:
+    """Renews access tokens for every cached account before they expire
+
+    Each account gets its own due time (token expiry minus the expiry skew,
+    a fixed lead and a random jitter) so refreshes are spread out instead of
+    hitting the token endpoint all at once. Failed refreshes are retried with
+    a short backoff; tool calls fall back to the normal lazy path meanwhile.
+    """
+
+    lead = 60.0
+    poll_interval = 60.0
+    failure_backoff = 30.0
+
+    def __init__(self, jitter: float = REFRESH_JITTER) -> None:
+        self.jitter = jitter
+        self.metrics = RefreshMetrics()
+        self._due: dict[str, float] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="token-refresher", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                self.metrics.last_error = str(e)
+            self._stop.wait(self.next_wakeup())
+
+    def next_wakeup(self) -> float:
+        now = time.monotonic()
+        soonest = min(self._due.values(), default=now + self.poll_interval)
+        return max(0.0, min(soonest - now, self.poll_interval))
+
+    def run_once(self) -> None:
+        """Refresh every tracked account whose due time has passed"""
+        account_ids = {a.account_id for a in list_accounts()}
+        for account_id in list(self._due):
+            if account_id not in account_ids:
+                del self._due[account_id]
+
+        for account_id in account_ids:
+            if time.monotonic() >= self._due.get(account_id, 0.0):
+                self.refresh(account_id)
+
+    def refresh(self, account_id: str) -> None:
+        # Tokens already memoized are renewed for real; a new account is first
+        # seeded from whatever MSAL has cached
+        force_refresh = account_id in self._due
+        start = time.monotonic()
+        try:
+            app = get_app()
+            account = _find_account(app, account_id)
+            if account is None:
+                raise ValueError(f"Account {account_id} not found in token cache")
+            result = app.acquire_token_silent(
+                SCOPES, account=account, force_refresh=force_refresh
+            )
+            if not result or "error" in result:
+                error = (result or {}).get("error_description", "no refresh token")
+                raise Exception(f"Token refresh failed: {error}")
+        except Exception as e:
+            self.metrics.record(time.monotonic() - start, e)
+            self._due[account_id] = time.monotonic() + self.failure_backoff
+            return
+
+        self.metrics.record(time.monotonic() - start)
+        _save_cache(app)
+        _stale_tokens.discard(account_id)
+        _remember_token(account_id, result)
+
+        expires_in = int(result.get("expires_in") or 0)
+        delay = expires_in - TOKEN_EXPIRY_SKEW - self.lead
+        self._due[account_id] = (
+            time.monotonic()
+            + max(delay, self.failure_backoff)
+            - random.uniform(0, min(self.jitter, max(delay, 0)))
         )
 
-    return None
+
+_refresher: TokenRefresher | None = None
+
+
+def get_refresher() -> TokenRefresher:
+    global _refresher
+    with _apps_lock:
+        if _refresher is None:
+            _refresher = TokenRefresher()
+        return _refresher
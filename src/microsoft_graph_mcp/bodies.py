@@ -0,0 +1,104 @@
+import html
+import os
+import re
+from typing import Any, Iterable, Iterator
+
+# Characters of body text kept per message in listings, and per listing overall
+BODY_MAX_CHARS = int(os.getenv("MICROSOFT_MCP_BODY_MAX_CHARS", "4000"))
+BODY_TOTAL_CHARS = int(os.getenv("MICROSOFT_MCP_BODY_TOTAL_CHARS", "40000"))
+
+_INVISIBLE = re.compile(
+    r"<!--.*?-->|<(head|script|style|title)\b.*?</\1\s*>", re.I | re.S
+)
+_BREAK = re.compile(
+    r"<br\s*/?>|</?(p|div|tr|li|ul|ol|table|h[1-6]|blockquote)\b[^>]*>", re.I
+)
+_TAG = re.compile(r"<[^>]*>")
+_SPACES = re.compile(r"[ \t\r\f\v\xa0\u200b]+")
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+# Where a reply's quoted history starts
+_QUOTE_HEADERS = re.compile(
+    r"^(-{2,}\s*Original Message\s*-{2,}"
+    r"|_{10,}"
+    r"|On .{1,200} wrote:"
+    r"|From: .+\n(?:.*\n){0,3}?(Sent|Date): .+)",
+    re.I | re.M,
+)
+# Where a signature starts: the "-- " delimiter or a mobile client footer
+_SIGNATURE = re.compile(
+    r"^(-- ?$|Sent from my \w+|Get Outlook for \w+|Sent from Outlook)", re.I | re.M
+)
+
+
+def html_to_text(content: str) -> str:
+    """Readable text from an HTML body: block elements become line breaks"""
+    content = _INVISIBLE.sub("", content)
+    content = _BREAK.sub("\n", content)
+    content = html.unescape(_TAG.sub("", content))
+    lines = (_SPACES.sub(" ", line).strip() for line in content.split("\n"))
+    return _BLANK_LINES.sub("\n\n", "\n".join(lines)).strip()
+
+
+def strip_quoted(text: str) -> str:
+    """Drop quoted reply history, ">"-quoted lines and the signature
+
+    A message that would be left empty (a bare forward) is returned whole.
+    """
+    own = text
+    match = _QUOTE_HEADERS.search(own)
+    if match and match.start() > 0:
+        own = own[: match.start()]
+    own = "\n".join(line for line in own.split("\n") if not line.startswith(">"))
+    match = _SIGNATURE.search(own)
+    if match and match.start() > 0:
+        own = own[: match.start()]
+    return own.strip() or text.strip()
+
+
+def body_text(body: dict[str, Any] | None) -> str:
+    content = (body or {}).get("content") or ""
+    if (body or {}).get("contentType", "").lower() == "html":
+        return html_to_text(content)
+    return content
+
+
+def _truncated(text: str, max_chars: int) -> dict[str, Any]:
+    body: dict[str, Any] = {"contentType": "text", "content": text}
+    if len(text) > max_chars:
+        body["content"] = (
+            text[:max_chars] + f"\n\n[Content truncated - {len(text)} total characters]"
+        )
+        body["truncated"] = True
+        body["total_length"] = len(text)
+    return body
+
+
+def trim(
+    messages: Iterable[dict[str, Any]],
+    max_chars: int = BODY_MAX_CHARS,
+    total_chars: int | None = BODY_TOTAL_CHARS,
+    include_quoted: bool = False,
+) -> Iterator[dict[str, Any]]:
+    """Turn each message's body into bounded plain text, one message at a time
+
+    Unless include_quoted is set, uniqueBody (when selected) or quote and
+    signature stripping leaves only what the message itself added. Once
+    total_chars is spent, later bodies keep only their truncation marker.
+    """
+    remaining = total_chars
+    for message in messages:
+        unique = message.pop("uniqueBody", None)
+        full = message.get("body") or unique
+        if full is None:
+            yield message
+            continue
+        if include_quoted:
+            text = body_text(full)
+        else:
+            text = strip_quoted(body_text(unique or full))
+        budget = max_chars if remaining is None else min(max_chars, remaining)
+        message["body"] = _truncated(text, budget)
+        if remaining is not None:
+            remaining -= min(len(text), budget)
+        yield message
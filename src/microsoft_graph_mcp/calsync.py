@@ -0,0 +1,208 @@
+import datetime as dt
+import httpx
+import json
+import os
+import sqlite3
+from typing import Any
+from microsoft_graph_mcp import graph
+from microsoft_graph_mcp.auth import account_key
+from microsoft_graph_mcp.syncstore import get_store
+
+# Serve list_events and search_events from a local index kept current through
+# calendarView delta queries
+CALENDAR_SYNC = os.getenv("MICROSOFT_MCP_CALENDAR_SYNC", "0") == "1"
+# Window synced around the current time; widened when a query reaches outside
+CALENDAR_SYNC_DAYS_BACK = int(
+    os.getenv("MICROSOFT_MCP_CALENDAR_SYNC_DAYS_BACK", "30")
+)
+CALENDAR_SYNC_DAYS_AHEAD = int(
+    os.getenv("MICROSOFT_MCP_CALENDAR_SYNC_DAYS_AHEAD", "365")
+)
+# Days synced past the furthest end asked for, so queries ending "N days from
+# now" stay inside the window as time moves on instead of widening it each call
+WINDOW_SLACK_DAYS = 30
+
+SCOPE = "calendar"
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    account TEXT NOT NULL,
+    id TEXT NOT NULL,
+    start_utc TEXT NOT NULL,
+    end_utc TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (account, id)
+);
+CREATE INDEX IF NOT EXISTS events_by_start ON events (account, start_utc);
+CREATE TABLE IF NOT EXISTS calendar_windows (
+    account TEXT PRIMARY KEY,
+    window_start TEXT NOT NULL,
+    window_end TEXT NOT NULL
+);
+"""
+
+
+def _key(value: dt.datetime) -> str:
+    """Sortable UTC timestamp used for interval comparisons"""
+    return value.astimezone(dt.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def _event_key(time: dict[str, Any] | None) -> str:
+    # calendarView returns UTC unless a Prefer: outlook.timezone header is sent
+    return (time or {}).get("dateTime", "")[:19]
+
+
+def _apply(
+    conn: sqlite3.Connection, account: str, items: list[dict[str, Any]]
+) -> None:
+    conn.executemany(
+        "DELETE FROM events WHERE account = ? AND id = ?",
+        [(account, item["id"]) for item in items if "@removed" in item],
+    )
+    conn.executemany(
+        "INSERT OR REPLACE INTO events (account, id, start_utc, end_utc, data)"
+        " VALUES (?, ?, ?, ?, ?)",
+        [
+            (
+                account,
+                item["id"],
+                _event_key(item.get("start")),
+                _event_key(item.get("end")),
+                json.dumps({k: v for k, v in item.items() if not k.startswith("@")}),
+            )
+            for item in items
+            if "@removed" not in item
+        ],
+    )
+
+
+async def _resync(
+    account_id: str | None, account: str, start: dt.datetime, end: dt.datetime
+) -> None:
+    # Whole seconds, widened outwards, so the stored window matches the token's
+    start = start.astimezone(dt.timezone.utc).replace(microsecond=0)
+    end = end.astimezone(dt.timezone.utc).replace(microsecond=0) + dt.timedelta(
+        seconds=1 if end.microsecond else 0
+    )
+    params = {"startDateTime": start.isoformat(), "endDateTime": end.isoformat()}
+    items, delta_link = await graph.adelta(
+        "/me/calendarView/delta", account_id, params
+    )
+    store = get_store()
+    with store.transaction() as conn:
+        conn.execute("DELETE FROM events WHERE account = ?", (account,))
+        _apply(conn, account, items)
+        conn.execute(
+            "INSERT OR REPLACE INTO calendar_windows"
+            " (account, window_start, window_end) VALUES (?, ?, ?)",
+            (account, _key(start), _key(end)),
+        )
+        store.set_delta_link(conn, account, SCOPE, delta_link)
+
+
+async def sync(account_id: str | None, start: dt.datetime, end: dt.datetime) -> None:
+    """Bring the index up to date and make sure it covers [start, end)
+
+    The delta token pins the window it was created for, so a query reaching
+    outside it starts a new initial round over a wider window.
+    """
+    store = get_store()
+    store.ensure(SCHEMA)
+    account = await graph.aaccount_key(account_id) or ""
+    rows = store.query(
+        "SELECT window_start, window_end FROM calendar_windows WHERE account = ?",
+        (account,),
+    )
+    delta_link = store.delta_link(account, SCOPE)
+    now = dt.datetime.now(dt.timezone.utc)
+
+    covered = rows and rows[0][0] <= _key(start) <= _key(end) <= rows[0][1]
+    if not covered or not delta_link:
+        await _resync(
+            account_id,
+            account,
+            min(start, now - dt.timedelta(days=CALENDAR_SYNC_DAYS_BACK)),
+            max(end, now + dt.timedelta(days=CALENDAR_SYNC_DAYS_AHEAD))
+            + dt.timedelta(days=WINDOW_SLACK_DAYS),
+        )
+        return
+
+    try:
+        items, next_link = await graph.adelta(
+            "/me/calendarView/delta", account_id, delta_link=delta_link
+        )
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code != 410:
+            raise
+        window = [dt.datetime.fromisoformat(t + "+00:00") for t in rows[0]]
+        await _resync(account_id, account, *window)
+        return
+
+    with store.transaction() as conn:
+        _apply(conn, account, items)
+        store.set_delta_link(conn, account, SCOPE, next_link)
+
+
+def _between(
+    account: str,
+    start: dt.datetime,
+    end: dt.datetime,
+    limit: int = -1,
+    offset: int = 0,
+) -> list[dict[str, Any]]:
+    rows = get_store().query(
+        "SELECT data FROM events WHERE account = ? AND start_utc < ? AND end_utc > ?"
+        " ORDER BY start_utc, id LIMIT ? OFFSET ?",
+        (account, _key(end), _key(start), limit, offset),
+    )
+    return [json.loads(data) for (data,) in rows]
+
+
+async def list_events(
+    account_id: str | None,
+    start: dt.datetime,
+    end: dt.datetime,
+    fields: list[str] | None = None,
+    limit: int = -1,
+    offset: int = 0,
+) -> list[dict[str, Any]]:
+    """Event occurrences overlapping [start, end), ordered by start time"""
+    await sync(account_id, start, end)
+    events = _between(account_key(account_id) or "", start, end, limit, offset)
+    if fields:
+        events = [{k: e[k] for k in fields if k in e} for e in events]
+    return events
+
+
+def _search_text(event: dict[str, Any]) -> str:
+    people = [event.get("organizer") or {}] + (event.get("attendees") or [])
+    parts = [
+        event.get("subject") or "",
+        event.get("bodyPreview") or "",
+        (event.get("body") or {}).get("content") or "",
+        (event.get("location") or {}).get("displayName") or "",
+    ]
+    for person in people:
+        address = person.get("emailAddress") or {}
+        parts += [address.get("name") or "", address.get("address") or ""]
+    return " ".join(parts).casefold()
+
+
+async def search_events(
+    account_id: str | None,
+    query: str,
+    start: dt.datetime,
+    end: dt.datetime,
+    limit: int = 50,
+    offset: int = 0,
+) -> list[dict[str, Any]]:
+    """Occurrences in [start, end) whose text contains every word of query"""
+    await sync(account_id, start, end)
+    terms = query.casefold().split()
+    matches = []
+    for event in _between(account_key(account_id) or "", start, end):
+        text = _search_text(event)
+        if all(term in text for term in terms):
+            matches.append(event)
+            if len(matches) >= offset + limit:
+                break
+    return matches[offset:]
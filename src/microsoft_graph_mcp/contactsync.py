@@ -0,0 +1,245 @@
+import bisect
+import httpx
+import json
+import os
+import re
+import time
+from typing import Any
+from microsoft_graph_mcp import graph
+from microsoft_graph_mcp.auth import account_key
+from microsoft_graph_mcp.syncstore import get_store
+
+# Answer contact searches and resolve recipient names from a local copy of the
+# address book kept current through /me/contacts/delta
+CONTACT_SYNC = os.getenv("MICROSOFT_MCP_CONTACT_SYNC", "0") == "1"
+# Seconds between delta refreshes; searches in between never touch Graph
+CONTACTS_TTL = float(os.getenv("MICROSOFT_MCP_CONTACTS_TTL", "300"))
+# Share of the query's trigrams a contact must contain to count as a fuzzy hit
+FUZZY_THRESHOLD = 0.5
+
+SCOPE = "contacts"
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS contacts (
+    account TEXT NOT NULL,
+    id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (account, id)
+);
+"""
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def _words(text: str) -> list[str]:
+    return _WORD.findall(text.casefold())
+
+
+def _trigrams(word: str) -> set[str]:
+    padded = f"  {word} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def _addresses(contact: dict[str, Any]) -> list[str]:
+    return [
+        e["address"] for e in contact.get("emailAddresses") or [] if e.get("address")
+    ]
+
+
+def _fields(contact: dict[str, Any]) -> list[str]:
+    return [
+        contact.get("displayName") or "",
+        contact.get("givenName") or "",
+        contact.get("surname") or "",
+        contact.get("companyName") or "",
+        *_addresses(contact),
+    ]
+
+
+class ContactIndex:
+    """In-memory prefix and trigram index over one account's contacts
+
+    Every word of the names, company and email addresses is kept in a sorted
+    list for prefix lookups by bisection, and in trigram postings for
+    typo-tolerant matching when no prefix matches.
+    """
+
+    def __init__(self) -> None:
+        self.contacts: dict[str, dict[str, Any]] = {}
+        self.expires = 0.0
+        self._words: list[tuple[str, str]] = []
+        self._postings: dict[str, set[str]] = {}
+
+    def rebuild(self) -> None:
+        words = set()
+        postings: dict[str, set[str]] = {}
+        for contact_id, contact in self.contacts.items():
+            for field in _fields(contact):
+                for word in _words(field):
+                    words.add((word, contact_id))
+                    for trigram in _trigrams(word):
+                        postings.setdefault(trigram, set()).add(contact_id)
+        self._words = sorted(words)
+        self._postings = postings
+
+    def _prefixed(self, prefix: str) -> set[str]:
+        start = bisect.bisect_left(self._words, (prefix, ""))
+        found = set()
+        for word, contact_id in self._words[start:]:
+            if not word.startswith(prefix):
+                break
+            found.add(contact_id)
+        return found
+
+    def _sort_key(self, contact_id: str) -> tuple[str, str]:
+        name = self.contacts[contact_id].get("displayName") or ""
+        return name.casefold(), contact_id
+
+    def search(self, query: str, limit: int = 50) -> list[dict[str, Any]]:
+        terms = _words(query)
+        if not terms:
+            return []
+        matches = self._prefixed(terms[0])
+        for term in terms[1:]:
+            matches &= self._prefixed(term)
+        if matches:
+            ranked = sorted(matches, key=self._sort_key)
+        else:
+            wanted = set().union(*(_trigrams(t) for t in terms))
+            scores: dict[str, int] = {}
+            for trigram in wanted:
+                for contact_id in self._postings.get(trigram, ()):
+                    scores[contact_id] = scores.get(contact_id, 0) + 1
+            ranked = sorted(
+                (i for i, n in scores.items() if n >= FUZZY_THRESHOLD * len(wanted)),
+                key=lambda i: (-scores[i], self._sort_key(i)),
+            )
+        return [self.contacts[i] for i in ranked[:limit]]
+
+
+_indexes: dict[str | None, ContactIndex] = {}
+
+
+async def _refresh(index: ContactIndex, account_id: str | None) -> None:
+    store = get_store()
+    store.ensure(SCHEMA)
+    account = await graph.aaccount_key(account_id) or ""
+    delta_link = store.delta_link(account, SCOPE)
+    if delta_link and not index.contacts:
+        # New process: start from what an earlier one stored
+        rows = store.query("SELECT data FROM contacts WHERE account = ?", (account,))
+        index.contacts = {c["id"]: c for c in (json.loads(d) for (d,) in rows)}
+    try:
+        items, next_link = await graph.adelta(
+            "/me/contacts/delta", account_id, delta_link=delta_link
+        )
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code != 410:
+            raise
+        delta_link = None
+        items, next_link = await graph.adelta("/me/contacts/delta", account_id)
+
+    if delta_link is None:
+        index.contacts = {}
+    for item in items:
+        if "@removed" in item:
+            index.contacts.pop(item["id"], None)
+        else:
+            contact = {k: v for k, v in item.items() if not k.startswith("@")}
+            index.contacts[item["id"]] = {
+                **index.contacts.get(item["id"], {}),
+                **contact,
+            }
+
+    changed = {item["id"] for item in items}
+    with store.transaction() as conn:
+        if delta_link is None:
+            conn.execute("DELETE FROM contacts WHERE account = ?", (account,))
+        conn.executemany(
+            "DELETE FROM contacts WHERE account = ? AND id = ?",
+            [(account, i) for i in changed if i not in index.contacts],
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO contacts (account, id, data) VALUES (?, ?, ?)",
+            [
+                (account, i, json.dumps(index.contacts[i]))
+                for i in changed
+                if i in index.contacts
+            ],
+        )
+        store.set_delta_link(conn, account, SCOPE, next_link)
+    index.rebuild()
+    index.expires = time.monotonic() + CONTACTS_TTL
+
+
+async def get_index(account_id: str | None) -> ContactIndex:
+    key = await graph.aaccount_key(account_id)
+    index = _indexes.get(key)
+    if index is None:
+        index = _indexes[key] = ContactIndex()
+    if index.expires <= time.monotonic():
+        await _refresh(index, account_id)
+    return index
+
+
+def invalidate(account_id: str | None) -> None:
+    """Pick up local changes on the next lookup"""
+    index = _indexes.get(account_key(account_id))
+    if index is not None:
+        index.expires = 0.0
+
+
+async def search(
+    account_id: str | None, query: str, limit: int = 50, offset: int = 0
+) -> list[dict[str, Any]]:
+    return (await get_index(account_id)).search(query, offset + limit)[offset:]
+
+
+async def list_contacts(
+    account_id: str | None, limit: int = 50, offset: int = 0
+) -> list[dict[str, Any]]:
+    index = await get_index(account_id)
+    ordered = sorted(index.contacts, key=index._sort_key)
+    return [index.contacts[i] for i in ordered[offset : offset + limit]]
+
+
+async def resolve_recipients(
+    account_id: str | None, recipients: list[str]
+) -> list[str]:
+    """Replace contact names with their email address; addresses pass through
+
+    Only a display name that exactly names one contact is replaced. Anything
+    else, including a unique prefix or typo match, raises ValueError listing
+    the candidates so the caller can pick one; mail never goes to a guess.
+    """
+    if all("@" in r for r in recipients):
+        return recipients
+    index = await get_index(account_id)
+    resolved = []
+    for recipient in recipients:
+        if "@" in recipient:
+            resolved.append(recipient)
+            continue
+        exact = [
+            c
+            for c in index.contacts.values()
+            if (c.get("displayName") or "").casefold() == recipient.casefold()
+            and _addresses(c)
+        ]
+        addresses = list(dict.fromkeys(_addresses(c)[0] for c in exact))
+        if len(addresses) == 1:
+            resolved.append(addresses[0])
+            continue
+        candidates = exact or [
+            c for c in index.search(recipient, limit=10) if _addresses(c)
+        ]
+        if not candidates:
+            raise ValueError(f"No contact with an email address matches '{recipient}'")
+        listing = ", ".join(
+            f"{c.get('displayName')} <{_addresses(c)[0]}>" for c in candidates
+        )
+        if exact:
+            raise ValueError(f"'{recipient}' matches several contacts: {listing}")
+        raise ValueError(
+            f"'{recipient}' is not the exact name of a contact; did you mean: {listing}"
+        )
+    return resolved
@@ -0,0 +1,62 @@
+import base64
+import binascii
+import hashlib
+import json
+from typing import Any
+from microsoft_graph_mcp import graph
+from microsoft_graph_mcp.responses import slim
+
+# Continuation cursors handed out by list and search tools. They carry all
+# the state needed to resume (a Graph nextLink, a search offset, or an offset
+# into a local index), so the server keeps nothing between pages.
+
+
+async def _fingerprint(
+    tool: str, account_id: str | None, request: dict[str, Any]
+) -> str:
+    """Ties a cursor to the tool, account and arguments that produced it"""
+    # Resolved against the token cache, so a cursor still matches after a restart
+    # when the account is named by email address
+    key = await graph.aaccount_key(account_id)
+    identity = json.dumps([tool, key, request], sort_keys=True, default=str)
+    return hashlib.sha256(identity.encode()).hexdigest()[:16]
+
+
+async def encode(
+    tool: str, account_id: str | None, request: dict[str, Any], state: dict[str, Any]
+) -> str:
+    payload = {"f": await _fingerprint(tool, account_id, request), **state}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+async def decode(
+    cursor: str | None, tool: str, account_id: str | None, request: dict[str, Any]
+) -> dict[str, Any]:
+    """State stored in cursor, or {} to start from the first page"""
+    if not cursor:
+        return {}
+    try:
+        payload = json.loads(
+            base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        )
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor") from None
+    fingerprint = await _fingerprint(tool, account_id, request)
+    if not isinstance(payload, dict) or payload.pop("f", None) != fingerprint:
+        raise ValueError(
+            f"Cursor was not issued by {tool} for this account and these arguments"
+        )
+    return payload
+
+
+async def page(
+    items: Any,
+    tool: str,
+    account_id: str | None,
+    request: dict[str, Any],
+    state: dict[str, Any] | None,
+) -> dict[str, Any]:
+    """Tool result: one page of slimmed items and the cursor for the next, if any"""
+    next_cursor = await encode(tool, account_id, request, state) if state else None
+    return {"items": slim(items), "next_cursor": next_cursor}
@@ -0,0 +1,192 @@
+import httpx
+import json
+import os
+import sqlite3
+from typing import Any
+from microsoft_graph_mcp import graph
+from microsoft_graph_mcp.auth import account_key
+from microsoft_graph_mcp.syncstore import get_store
+
+# Serve list_files and search_files from a local index of the whole drive kept
+# current through /me/drive/root/delta
+DRIVE_SYNC = os.getenv("MICROSOFT_MCP_DRIVE_SYNC", "0") == "1"
+
+SCOPE = "drive"
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS drive_items (
+    account TEXT NOT NULL,
+    id TEXT NOT NULL,
+    parent_id TEXT,
+    name TEXT NOT NULL,
+    name_folded TEXT NOT NULL,
+    is_folder INTEGER NOT NULL,
+    size INTEGER NOT NULL DEFAULT 0,
+    modified TEXT,
+    mime_type TEXT,
+    hashes TEXT,
+    PRIMARY KEY (account, id)
+);
+CREATE INDEX IF NOT EXISTS drive_items_by_parent
+    ON drive_items (account, parent_id, name_folded);
+"""
+
+
+def _apply(
+    conn: sqlite3.Connection, account: str, items: list[dict[str, Any]]
+) -> None:
+    """Write delta changes in order; later entries for the same item win"""
+    for item in items:
+        if "deleted" in item or "@removed" in item:
+            # Graph does not always report the children of a deleted folder
+            conn.execute(
+                "WITH RECURSIVE doomed(id) AS (SELECT ? UNION"
+                " SELECT d.id FROM drive_items d JOIN doomed ON d.parent_id = doomed.id"
+                " WHERE d.account = ?)"
+                " DELETE FROM drive_items WHERE account = ? AND id IN doomed",
+                (item["id"], account, account),
+            )
+            continue
+        file = item.get("file") or {}
+        parent_id = (item.get("parentReference") or {}).get("id")
+        conn.execute(
+            "INSERT OR REPLACE INTO drive_items (account, id, parent_id, name,"
+            " name_folded, is_folder, size, modified, mime_type, hashes)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                account,
+                item["id"],
+                None if "root" in item else parent_id,
+                item.get("name", ""),
+                item.get("name", "").casefold(),
+                int("folder" in item or "root" in item),
+                item.get("size", 0),
+                item.get("lastModifiedDateTime"),
+                file.get("mimeType"),
+                json.dumps(file["hashes"]) if "hashes" in file else None,
+            ),
+        )
+
+
+async def sync(account_id: str | None) -> None:
+    """Catch the drive index up with every change since the last delta token"""
+    store = get_store()
+    store.ensure(SCHEMA)
+    account = await graph.aaccount_key(account_id) or ""
+    delta_link = store.delta_link(account, SCOPE)
+    try:
+        items, next_link = await graph.adelta(
+            "/me/drive/root/delta", account_id, delta_link=delta_link
+        )
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code != 410:
+            raise
+        # resyncRequired: enumerate the drive again and replace the local copy
+        delta_link = None
+        items, next_link = await graph.adelta("/me/drive/root/delta", account_id)
+
+    with store.transaction() as conn:
+        if delta_link is None:
+            conn.execute("DELETE FROM drive_items WHERE account = ?", (account,))
+        _apply(conn, account, items)
+        store.set_delta_link(conn, account, SCOPE, next_link)
+
+
+_COLUMNS = "id, name, is_folder, size, modified"
+
+
+def _to_item(row: tuple[Any, ...]) -> dict[str, Any]:
+    id, name, is_folder, size, modified = row
+    return {
+        "id": id,
+        "name": name,
+        "type": "folder" if is_folder else "file",
+        "size": size,
+        "modified": modified,
+    }
+
+
+def _root_id(account: str) -> str | None:
+    rows = get_store().query(
+        "SELECT id FROM drive_items WHERE account = ? AND parent_id IS NULL",
+        (account,),
+    )
+    return rows[0][0] if rows else None
+
+
+def resolve_path(account: str, path: str) -> str | None:
+    """Item id for a path like "Documents/Reports", looked up one level at a time"""
+    item_id = _root_id(account)
+    for name in [p for p in path.split("/") if p]:
+        if item_id is None:
+            return None
+        rows = get_store().query(
+            "SELECT id FROM drive_items"
+            " WHERE account = ? AND parent_id = ? AND name_folded = ?",
+            (account, item_id, name.casefold()),
+        )
+        item_id = rows[0][0] if rows else None
+    return item_id
+
+
+def item_path(account: str, item_id: str) -> str:
+    """Path of an item from the drive root, e.g. "/Documents/report.docx\""""
+    names = []
+    while True:
+        rows = get_store().query(
+            "SELECT parent_id, name FROM drive_items WHERE account = ? AND id = ?",
+            (account, item_id),
+        )
+        if not rows or rows[0][0] is None:
+            break
+        item_id, name = rows[0]
+        names.append(name)
+    return "/" + "/".join(reversed(names))
+
+
+async def list_folder(
+    account_id: str | None, path: str, limit: int, offset: int = 0
+) -> list[dict[str, Any]] | None:
+    """A page of a folder's children, or None if the index has no such folder
+
+    None leaves a missing path or a file to Graph, so it fails the same way.
+    Download URLs expire within the hour, so they are not kept and items
+    come without download_url.
+    """
+    await sync(account_id)
+    account = account_key(account_id) or ""
+    folder_id = resolve_path(account, path)
+    if folder_id is None:
+        return None
+    store = get_store()
+    rows = store.query(
+        "SELECT is_folder FROM drive_items WHERE account = ? AND id = ?",
+        (account, folder_id),
+    )
+    if not rows[0][0]:
+        return None
+    rows = store.query(
+        f"SELECT {_COLUMNS} FROM drive_items WHERE account = ? AND parent_id = ?"
+        " ORDER BY name_folded, id LIMIT ? OFFSET ?",
+        (account, folder_id, limit, offset),
+    )
+    return [_to_item(row) for row in rows]
+
+
+async def search(
+    account_id: str | None, query: str, limit: int, offset: int = 0
+) -> list[dict[str, Any]]:
+    """Items whose name contains every word of query"""
+    await sync(account_id)
+    account = account_key(account_id) or ""
+    terms = query.casefold().split()
+    where = "".join(" AND instr(name_folded, ?) > 0" for _ in terms)
+    rows = get_store().query(
+        f"SELECT {_COLUMNS} FROM drive_items"
+        f" WHERE account = ? AND parent_id IS NOT NULL{where}"
+        " ORDER BY modified DESC, id LIMIT ? OFFSET ?",
+        (account, *terms, limit, offset),
+    )
+    items = [_to_item(row) for row in rows]
+    for item in items:
+        item["path"] = item_path(account, item["id"])
+    return items
@@ -1,32 +1,126 @@
+import asyncio
+import collections
+import importlib.util
 import httpx
+import os
+import pathlib as pl
+import queue
+import threading
 import time
-from typing import Any, Iterator
-from microsoft_graph_mcp.auth import get_token
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, BinaryIO, Iterator, Literal, NamedTuple
+from urllib.parse import parse_qs, urlsplit
+from microsoft_graph_mcp.auth import (
+    account_key,
+    aget_token,
+    get_token,
+    invalidate_token,
+)
+from microsoft_graph_mcp.httpcache import CacheEntry, CacheKey, cache_key, get_cache
+from microsoft_graph_mcp.ratelimit import RateLimiter, get_limiter, resource_for
+from microsoft_graph_mcp.retry import Retry, parse_retry_after, retry_after
 
 BASE_URL = "https://graph.microsoft.com/v1.0"
 # 15 x 320 KiB = 4,915,200 bytes
 UPLOAD_CHUNK_SIZE = 15 * 320 * 1024
+# Content for the upload functions: the bytes themselves, a file path, or a
+# binary file object positioned at the start of the content
+Upload = bytes | pl.Path | BinaryIO
+# Graph accepts at most 20 sub-requests per JSON $batch call
+BATCH_SIZE = 20
+# $batch calls in flight at once for a single batch()/abatch() call
+BATCH_CONCURRENCY = int(os.getenv("MICROSOFT_MCP_BATCH_CONCURRENCY", "4"))
+# Byte ranges adownload_file() splits a large file into, fetched in parallel
+DOWNLOAD_SEGMENTS = int(os.getenv("MICROSOFT_MCP_DOWNLOAD_SEGMENTS", "4"))
+# Smallest range worth a request of its own; smaller files come in one stream
+DOWNLOAD_SEGMENT_MIN = int(
+    os.getenv("MICROSOFT_MCP_DOWNLOAD_SEGMENT_MIN", str(8 * 1024 * 1024))
+)
+# Largest $top asked for when a tool fetches a single page
+PAGE_SIZE_MAX = 999
+# Pages request_paginated()/arequest_paginated() fetch ahead of the consumer;
+# 0 fetches each page only once the previous one has been consumed
+PAGINATION_PREFETCH = int(os.getenv("MICROSOFT_MCP_PAGINATION_PREFETCH", "1"))
 
-_client = httpx.Client(timeout=30.0, follow_redirects=True)
+# Connection pool settings, shared by every pool
+HTTP_MAX_CONNECTIONS = int(os.getenv("MICROSOFT_MCP_HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("MICROSOFT_MCP_HTTP_MAX_KEEPALIVE", "50"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("MICROSOFT_MCP_HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("MICROSOFT_MCP_HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_READ_TIMEOUT = float(os.getenv("MICROSOFT_MCP_HTTP_READ_TIMEOUT", "30"))
+HTTP_WRITE_TIMEOUT = float(os.getenv("MICROSOFT_MCP_HTTP_WRITE_TIMEOUT", "30"))
+HTTP_POOL_TIMEOUT = float(os.getenv("MICROSOFT_MCP_HTTP_POOL_TIMEOUT", "10"))
+# HTTP/2 multiplexing needs the optional h2 package (pip install "httpx[http2]")
+HTTP2 = (
+    os.getenv("MICROSOFT_MCP_HTTP2", "1") != "0"
+    and importlib.util.find_spec("h2") is not None
+)
 
+# API calls, upload-session hosts and pre-authenticated download hosts each get
+# their own pool so long transfers never starve small API requests
+Pool = Literal["api", "upload", "download"]
+POOLS: tuple[Pool, ...] = ("api", "upload", "download")
 
-def request(
+
+def _client_options() -> dict[str, Any]:
+    return {
+        "http2": HTTP2,
+        "follow_redirects": True,
+        "limits": httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        "timeout": httpx.Timeout(
+            connect=HTTP_CONNECT_TIMEOUT,
+            read=HTTP_READ_TIMEOUT,
+            write=HTTP_WRITE_TIMEOUT,
+            pool=HTTP_POOL_TIMEOUT,
+        ),
+    }
+
+
+_client = httpx.Client(**_client_options())
+_upload_client = httpx.Client(**_client_options())
+_download_client = httpx.Client(**_client_options())
+_async_clients: dict[Pool, httpx.AsyncClient] = {}
+
+
+def _get_async_client(pool: Pool = "api") -> httpx.AsyncClient:
+    client = _async_clients.get(pool)
+    if client is None:
+        client = _async_clients[pool] = httpx.AsyncClient(**_client_options())
+    return client
+
+
+def _wants_text(path: str, params: dict[str, Any] | None) -> bool:
+    """Whether a GET can return message bodies, which Graph should send as text
+
+    nextLink and deltaLink paths carry their $select in the query string.
+    """
+    if "$search" in (params or {}):
+        return True
+    select = (params or {}).get("$select")
+    if select is None:
+        select = ",".join(parse_qs(urlsplit(path).query).get("$select", []))
+    if select:
+        # body and uniqueBody alike
+        return "body" in select.casefold()
+    # A message fetched with all of its properties
+    return "/messages/" in urlsplit(path).path
+
+
+def _prepare_headers(
     method: str,
     path: str,
-    account_id: str | None = None,
-    params: dict[str, Any] | None = None,
-    json: dict[str, Any] | None = None,
-    data: bytes | None = None,
-    max_retries: int = 3,
-) -> dict[str, Any] | None:
-    headers = {
-        "Authorization": f"Bearer {get_token(account_id)}",
-    }
+    params: dict[str, Any] | None,
+    json: dict[str, Any] | None,
+) -> dict[str, str]:
+    """Content negotiation headers shared by request() and arequest()"""
+    headers = {}
 
     if method == "GET":
-        if "$search" in (params or {}):
-            headers["Prefer"] = 'outlook.body-content-type="text"'
-        elif "body" in (params or {}).get("$select", ""):
+        if _wants_text(path, params):
             headers["Prefer"] = 'outlook.body-content-type="text"'
     else:
         headers["Content-Type"] = (
@@ -41,46 +135,160 @@ def request(
         headers["ConsistencyLevel"] = "eventual"
         params.setdefault("$count", "true")
 
-    retry_count = 0
-    while retry_count <= max_retries:
+    return headers
+
+
+def _note_throttle(limiter: RateLimiter, response: httpx.Response) -> None:
+    if response.status_code == 429:
+        limiter.on_throttle(min(retry_after(response) or 5.0, 60.0))
+
+
+def _cache_lookup(
+    method: str,
+    url: str,
+    params: dict[str, Any] | None,
+    headers: dict[str, str],
+    account_id: str | None,
+) -> tuple[CacheKey | None, CacheEntry | None]:
+    """Find a cached body for a GET and ask Graph to revalidate it"""
+    cache = get_cache()
+    if cache is None or method != "GET":
+        return None, None
+    key = cache_key(account_key(account_id), url, params, headers)
+    entry = cache.lookup(key)
+    if entry is not None:
+        headers["If-None-Match"] = entry.etag
+    return key, entry
+
+
+def _pace(limiter: RateLimiter, count: int = 1) -> None:
+    """Block until the limiter lets the next request for its bucket go out"""
+    wait = limiter.reserve(count)
+    if wait > 0:
+        time.sleep(wait)
+
+
+async def _apace(limiter: RateLimiter, count: int = 1) -> None:
+    wait = limiter.reserve(count)
+    if wait > 0:
+        await asyncio.sleep(wait)
+
+
+def request(
+    method: str,
+    path: str,
+    account_id: str | None = None,
+    params: dict[str, Any] | None = None,
+    json: dict[str, Any] | None = None,
+    data: bytes | None = None,
+    max_retries: int = 3,
+    resource: str | None = None,
+    weight: int = 1,
+) -> dict[str, Any] | None:
+    """Send one Graph request, paced as weight requests to resource's limiter
+
+    resource defaults to the bucket path belongs to.
+    """
+    headers = _prepare_headers(method, path, params, json)
+    headers["Authorization"] = f"Bearer {get_token(account_id)}"
+    limiter = get_limiter(account_key(account_id), resource or resource_for(path))
+    url = f"{BASE_URL}{path}"
+    attempts = Retry(method, url, max_retries)
+    key, cached = _cache_lookup(method, url, params, headers, account_id)
+
+    token_refreshed = False
+    while True:
+        attempts.begin()
+        _pace(limiter, weight)
         try:
             response = _client.request(
                 method=method,
-                url=f"{BASE_URL}{path}",
+                url=url,
                 headers=headers,
                 params=params,
                 json=json,
                 content=data,
             )
+        except httpx.TransportError as e:
+            delay = attempts.on_error(e)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            continue
 
-            if response.status_code == 429:
-                retry_after = int(response.headers.get("Retry-After", "5"))
-                if retry_count < max_retries:
-                    time.sleep(min(retry_after, 60))
-                    retry_count += 1
-                    continue
-
-            if response.status_code >= 500 and retry_count < max_retries:
-                wait_time = (2**retry_count) * 1
-                time.sleep(wait_time)
-                retry_count += 1
-                continue
+        if response.status_code == 401 and not token_refreshed:
+            invalidate_token(account_id)
+            headers["Authorization"] = f"Bearer {get_token(account_id)}"
+            token_refreshed = True
+            continue
 
-            response.raise_for_status()
+        _note_throttle(limiter, response)
+        delay = attempts.on_response(response)
+        if delay is not None:
+            time.sleep(delay)
+            continue
 
-            if response.content:
-                return response.json()
-            return None
+        if response.status_code == 304 and cached is not None:
+            limiter.on_success()
+            return get_cache().revalidated(key, cached)
 
-        except httpx.HTTPStatusError as e:
-            if retry_count < max_retries and e.response.status_code >= 500:
-                wait_time = (2**retry_count) * 1
-                time.sleep(wait_time)
-                retry_count += 1
-                continue
-            raise
+        response.raise_for_status()
+        limiter.on_success()
+        if key is not None:
+            get_cache().store(key, response)
 
-    return None
+        if response.content:
+            return response.json()
+        return None
+
+
+def _pages(
+    path: str,
+    account_id: str | None,
+    params: dict[str, Any] | None,
+    limit: int | None,
+) -> Iterator[dict[str, Any]]:
+    """Pages of a listing, stopping once limit items have been fetched"""
+    fetched = 0
+    result = request("GET", path, account_id, params=params)
+    while result:
+        yield result
+        fetched += len(result.get("value", []))
+        next_link = result.get("@odata.nextLink")
+        if not next_link or (limit and fetched >= limit):
+            break
+        result = request("GET", next_link.replace(BASE_URL, ""), account_id)
+
+
+def _prefetch(
+    pages: Iterator[dict[str, Any]], depth: int
+) -> Iterator[dict[str, Any]]:
+    """Pull pages on a background thread, at most depth ahead of the consumer"""
+    slots = threading.Semaphore(depth)
+    ready: queue.Queue[Any] = queue.Queue()
+    stop = threading.Event()
+    done = object()
+
+    def produce() -> None:
+        try:
+            while slots.acquire() and not stop.is_set():
+                page = next(pages, done)
+                ready.put(page)
+                if page is done:
+                    return
+        except Exception as e:
+            ready.put(e)
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while (page := ready.get()) is not done:
+            if isinstance(page, Exception):
+                raise page
+            slots.release()
+            yield page
+    finally:
+        stop.set()
+        slots.release()
 
 
 def request_paginated(
@@ -88,81 +296,142 @@ def request_paginated(
     account_id: str | None = None,
     params: dict[str, Any] | None = None,
     limit: int | None = None,
+    prefetch: int | None = None,
 ) -> Iterator[dict[str, Any]]:
-    """Make paginated requests following @odata.nextLink"""
-    items_returned = 0
-    next_link = None
-
-    while True:
-        if next_link:
-            result = request("GET", next_link.replace(BASE_URL, ""), account_id)
-        else:
-            result = request("GET", path, account_id, params=params)
-
-        if not result:
-            break
+    """Make paginated requests following @odata.nextLink
 
-        if "value" in result:
-            for item in result["value"]:
-                if limit and items_returned >= limit:
-                    return
-                yield item
-                items_returned += 1
+    Up to prefetch pages (PAGINATION_PREFETCH by default) are fetched while
+    the current one is consumed; nothing is fetched once limit is reached.
+    """
+    depth = PAGINATION_PREFETCH if prefetch is None else prefetch
+    pages = _pages(path, account_id, params, limit)
+    if depth > 0:
+        pages = _prefetch(pages, depth)
 
-        next_link = result.get("@odata.nextLink")
-        if not next_link:
-            break
+    items_returned = 0
+    for result in pages:
+        for item in result.get("value", []):
+            if limit and items_returned >= limit:
+                return
+            yield item
+            items_returned += 1
 
 
 def download_raw(
     path: str, account_id: str | None = None, max_retries: int = 3
 ) -> bytes:
     headers = {"Authorization": f"Bearer {get_token(account_id)}"}
+    limiter = get_limiter(account_key(account_id), resource_for(path))
+    url = f"{BASE_URL}{path}"
+    attempts = Retry("GET", url, max_retries)
 
-    retry_count = 0
-    while retry_count <= max_retries:
+    token_refreshed = False
+    while True:
+        attempts.begin()
+        _pace(limiter)
         try:
-            response = _client.get(f"{BASE_URL}{path}", headers=headers)
-
-            if response.status_code == 429:
-                retry_after = int(response.headers.get("Retry-After", "5"))
-                if retry_count < max_retries:
-                    time.sleep(min(retry_after, 60))
-                    retry_count += 1
-                    continue
-
-            if response.status_code >= 500 and retry_count < max_retries:
-                wait_time = (2**retry_count) * 1
-                time.sleep(wait_time)
-                retry_count += 1
-                continue
+            response = _download_client.get(url, headers=headers)
+        except httpx.TransportError as e:
+            delay = attempts.on_error(e)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            continue
 
-            response.raise_for_status()
-            return response.content
+        if response.status_code == 401 and not token_refreshed:
+            invalidate_token(account_id)
+            headers["Authorization"] = f"Bearer {get_token(account_id)}"
+            token_refreshed = True
+            continue
 
-        except httpx.HTTPStatusError as e:
-            if retry_count < max_retries and e.response.status_code >= 500:
-                wait_time = (2**retry_count) * 1
-                time.sleep(wait_time)
-                retry_count += 1
-                continue
-            raise
+        _note_throttle(limiter, response)
+        delay = attempts.on_response(response)
+        if delay is not None:
+            time.sleep(delay)
+            continue
+
+        response.raise_for_status()
+        limiter.on_success()
+        return response.content
+
+
+def _upload_size(data: Upload, size: int | None = None) -> int:
+    """Bytes left to upload; pipes and sockets cannot tell, so need size given"""
+    if size is not None:
+        return size
+    if isinstance(data, bytes):
+        return len(data)
+    if isinstance(data, pl.Path):
+        return data.stat().st_size
+    if not data.seekable():
+        raise ValueError("size is required to upload from a non-seekable stream")
+    start = data.tell()
+    end = data.seek(0, os.SEEK_END)
+    data.seek(start)
+    return end - start
+
+
+def _upload_bytes(data: Upload) -> bytes:
+    """The whole of a small upload"""
+    if isinstance(data, bytes):
+        return data
+    if isinstance(data, pl.Path):
+        return data.read_bytes()
+    return data.read()
+
+
+def _upload_chunks(data: Upload) -> Iterator[memoryview]:
+    """data in UPLOAD_CHUNK_SIZE pieces, read lazily into one reused buffer
 
-    raise ValueError("Failed to download file after all retries")
+    Each piece is only valid until the next one is asked for, so memory use
+    stays at one chunk whatever the size of the file.
+    """
+    if isinstance(data, bytes):
+        view = memoryview(data)
+        for i in range(0, len(view), UPLOAD_CHUNK_SIZE):
+            yield view[i : i + UPLOAD_CHUNK_SIZE]
+        return
+    if isinstance(data, pl.Path):
+        with data.open("rb") as f:
+            yield from _upload_chunks(f)
+        return
+
+    view = memoryview(bytearray(UPLOAD_CHUNK_SIZE))
+    while True:
+        filled = 0
+        while filled < UPLOAD_CHUNK_SIZE:
+            read = data.readinto(view[filled:])
+            if not read:
+                break
+            filled += read
+        if filled:
+            yield view[:filled]
+        if filled < UPLOAD_CHUNK_SIZE:
+            return
+
+
+# httpx only takes bytes or an iterator as content; these send a chunk
+# without copying it, and can be recreated for every retry
+def _chunk_body(chunk: memoryview) -> Iterator[memoryview]:
+    yield chunk
+
+
+async def _achunk_body(chunk: memoryview) -> AsyncIterator[memoryview]:
+    yield chunk
 
 
 def _do_chunked_upload(
     upload_url: str,
-    data: bytes,
+    data: Upload,
+    file_size: int,
     headers: dict[str, str],
+    limiter: RateLimiter,
 ) -> dict[str, Any]:
     """Internal helper for chunked uploads"""
-    file_size = len(data)
 
-    for i in range(0, file_size, UPLOAD_CHUNK_SIZE):
-        chunk_start = i
-        chunk_end = min(i + UPLOAD_CHUNK_SIZE, file_size)
-        chunk = data[chunk_start:chunk_end]
+    for i, chunk in enumerate(_upload_chunks(data)):
+        chunk_start = i * UPLOAD_CHUNK_SIZE
+        chunk_end = chunk_start + len(chunk)
 
         chunk_headers = headers.copy()
         chunk_headers["Content-Length"] = str(len(chunk))
@@ -170,30 +439,33 @@ def _do_chunked_upload(
             f"bytes {chunk_start}-{chunk_end - 1}/{file_size}"
         )
 
-        retry_count = 0
-        while retry_count <= 3:
+        attempts = Retry("PUT", upload_url)
+        while True:
+            attempts.begin()
+            _pace(limiter)
             try:
-                response = _client.put(upload_url, content=chunk, headers=chunk_headers)
-
-                if response.status_code == 429:
-                    retry_after = int(response.headers.get("Retry-After", "5"))
-                    if retry_count < 3:
-                        time.sleep(min(retry_after, 60))
-                        retry_count += 1
-                        continue
+                response = _upload_client.put(
+                    upload_url, content=_chunk_body(chunk), headers=chunk_headers
+                )
+            except httpx.TransportError as e:
+                delay = attempts.on_error(e)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
 
-                response.raise_for_status()
+            _note_throttle(limiter, response)
+            delay = attempts.on_response(response)
+            if delay is not None:
+                time.sleep(delay)
+                continue
 
-                if response.status_code in (200, 201):
-                    return response.json()
-                break
+            response.raise_for_status()
+            limiter.on_success()
+            break
 
-            except httpx.HTTPStatusError as e:
-                if retry_count < 3 and e.response.status_code >= 500:
-                    time.sleep((2**retry_count) * 1)
-                    retry_count += 1
-                    continue
-                raise
+        if response.status_code in (200, 201):
+            return response.json()
 
     raise ValueError("Upload completed but no final response received")
 
@@ -213,15 +485,22 @@ def create_upload_session(
 
 def upload_large_file(
     path: str,
-    data: bytes,
+    data: Upload,
     account_id: str | None = None,
     item_properties: dict[str, Any] | None = None,
+    size: int | None = None,
 ) -> dict[str, Any]:
-    """Upload a large file using upload sessions"""
-    file_size = len(data)
+    """Upload a large file using upload sessions
+
+    data may be a path or binary file object, read one chunk at a time. A
+    non-seekable stream such as a pipe needs its size given.
+    """
+    file_size = _upload_size(data, size)
 
     if file_size <= UPLOAD_CHUNK_SIZE:
-        result = request("PUT", f"{path}/content", account_id, data=data)
+        result = request(
+            "PUT", f"{path}/content", account_id, data=_upload_bytes(data)
+        )
         if not result:
             raise ValueError("Failed to upload file")
         return result
@@ -230,7 +509,13 @@ def upload_large_file(
     upload_url = session["uploadUrl"]
 
     headers = {"Authorization": f"Bearer {get_token(account_id)}"}
-    return _do_chunked_upload(upload_url, data, headers)
+    return _do_chunked_upload(
+        upload_url,
+        data,
+        file_size,
+        headers,
+        get_limiter(account_key(account_id), "drive"),
+    )
 
 
 def create_mail_upload_session(
@@ -253,12 +538,16 @@ def create_mail_upload_session(
 def upload_large_mail_attachment(
     message_id: str,
     name: str,
-    data: bytes,
+    data: Upload,
     account_id: str | None = None,
     content_type: str = "application/octet-stream",
+    size: int | None = None,
 ) -> dict[str, Any]:
-    """Upload a large mail attachment using upload sessions"""
-    file_size = len(data)
+    """Upload a large mail attachment using upload sessions
+
+    A non-seekable stream such as a pipe needs its size given.
+    """
+    file_size = _upload_size(data, size)
 
     attachment_item = {
         "attachmentType": "file",
@@ -271,17 +560,18 @@ def upload_large_mail_attachment(
     upload_url = session["uploadUrl"]
 
     headers = {"Authorization": f"Bearer {get_token(account_id)}"}
-    return _do_chunked_upload(upload_url, data, headers)
+    return _do_chunked_upload(
+        upload_url,
+        data,
+        file_size,
+        headers,
+        get_limiter(account_key(account_id), "mail"),
+    )
 
 
-def search_query(
-    query: str,
-    entity_types: list[str],
-    account_id: str | None = None,
-    limit: int = 50,
-    fields: list[str] | None = None,
-) -> Iterator[dict[str, Any]]:
-    """Use the modern /search/query API endpoint"""
+def _search_payload(
+    query: str, entity_types: list[str], limit: int, fields: list[str] | None
+) -> dict[str, Any]:
     payload = {
         "requests": [
             {
@@ -296,6 +586,38 @@ def search_query(
     if fields:
         payload["requests"][0]["fields"] = fields
 
+    return payload
+
+
+def _search_hits(result: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    for response in result["value"]:
+        if "hitsContainers" in response:
+            for container in response["hitsContainers"]:
+                if "hits" in container:
+                    for hit in container["hits"]:
+                        yield hit["resource"]
+
+
+def _search_has_more(result: dict[str, Any]) -> bool:
+    if "@odata.nextLink" in result:
+        return False
+
+    for response in result.get("value", []):
+        for container in response.get("hitsContainers", []):
+            if container.get("moreResultsAvailable"):
+                return True
+    return False
+
+
+def search_query(
+    query: str,
+    entity_types: list[str],
+    account_id: str | None = None,
+    limit: int = 50,
+    fields: list[str] | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Use the modern /search/query API endpoint"""
+    payload = _search_payload(query, entity_types, limit, fields)
     items_returned = 0
 
     while True:
@@ -304,27 +626,790 @@ def search_query(
         if not result or "value" not in result:
             break
 
-        for response in result["value"]:
-            if "hitsContainers" in response:
-                for container in response["hitsContainers"]:
-                    if "hits" in container:
-                        for hit in container["hits"]:
-                            if limit and items_returned >= limit:
-                                return
-                            yield hit["resource"]
-                            items_returned += 1
-
-        if "@odata.nextLink" in result:
+        for resource in _search_hits(result):
+            if limit and items_returned >= limit:
+                return
+            yield resource
+            items_returned += 1
+
+        if not _search_has_more(result):
             break
 
-        has_more = False
-        for response in result.get("value", []):
-            for container in response.get("hitsContainers", []):
-                if container.get("moreResultsAvailable"):
-                    has_more = True
-                    break
+        payload["requests"][0]["from"] += payload["requests"][0]["size"]
+
+
+class BatchRequest(NamedTuple):
+    """One logical request for batch(); depends_on holds indexes of earlier requests"""
+
+    method: str
+    path: str
+    json: dict[str, Any] | None = None
+    params: dict[str, Any] | None = None
+    headers: dict[str, str] | None = None
+    depends_on: list[int] | None = None
+
+
+class BatchResponse(NamedTuple):
+    status: int
+    body: dict[str, Any] | None
+    headers: dict[str, str]
+
+
+def _plan_batches(requests: list[BatchRequest]) -> list[list[int]]:
+    """Split request indexes into $batch calls, keeping dependency chains together"""
+    parent = list(range(len(requests)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, req in enumerate(requests):
+        for dep in req.depends_on or []:
+            if not 0 <= dep < i:
+                raise ValueError(
+                    f"Request {i} may only depend on earlier requests, got {dep}"
+                )
+            parent[find(i)] = find(dep)
+
+    groups: dict[int, list[int]] = {}
+    for i in range(len(requests)):
+        groups.setdefault(find(i), []).append(i)
+
+    batches: list[list[int]] = []
+    for group in groups.values():
+        if len(group) > BATCH_SIZE:
+            raise ValueError(
+                f"Dependency chain of {len(group)} requests exceeds the "
+                f"{BATCH_SIZE}-request $batch limit"
+            )
+        target = next((b for b in batches if len(b) + len(group) <= BATCH_SIZE), None)
+        if target is None:
+            batches.append(list(group))
+        else:
+            target.extend(group)
+    return [sorted(b) for b in batches]
+
+
+def _batch_resource(requests: list[BatchRequest], indexes: list[int]) -> str:
+    """The throttling bucket most of a batch's sub-requests belong to"""
+    resources = collections.Counter(resource_for(requests[i].path) for i in indexes)
+    return resources.most_common(1)[0][0]
 
-        if not has_more:
+
+def _batch_payload(requests: list[BatchRequest], indexes: list[int]) -> dict[str, Any]:
+    members = set(indexes)
+    payload = []
+    for i in indexes:
+        req = requests[i]
+        url = req.path
+        if req.params:
+            url = f"{url}?{httpx.QueryParams(req.params)}"
+        item: dict[str, Any] = {"id": str(i), "method": req.method, "url": url}
+        headers = dict(req.headers or {})
+        if req.json is not None:
+            item["body"] = req.json
+            headers.setdefault("Content-Type", "application/json")
+        if headers:
+            item["headers"] = headers
+        depends_on = [str(d) for d in req.depends_on or [] if d in members]
+        if depends_on:
+            item["dependsOn"] = depends_on
+        payload.append(item)
+    return {"requests": payload}
+
+
+def _apply_batch_result(
+    result: dict[str, Any] | None,
+    indexes: list[int],
+    results: list[BatchResponse | None],
+) -> None:
+    responses = {r["id"]: r for r in (result or {}).get("responses", [])}
+    for i in indexes:
+        r = responses.get(str(i))
+        if r is None:
+            results[i] = BatchResponse(500, None, {})
+        else:
+            results[i] = BatchResponse(r["status"], r.get("body"), r.get("headers", {}))
+
+
+def _batch_retry_after(result: BatchResponse) -> float:
+    """A throttled sub-request's wait, 5 seconds when it gives no usable one"""
+    headers = {k.lower(): v for k, v in result.headers.items()}
+    wait = parse_retry_after(headers.get("retry-after"))
+    return min(5.0 if wait is None else wait, 60.0)
+
+
+def _note_batch_throttles(
+    requests: list[BatchRequest],
+    results: list[BatchResponse | None],
+    indexes: list[int],
+    account_id: str | None,
+) -> None:
+    """Slow down the limiters of resources whose sub-requests were throttled"""
+    for i in indexes:
+        result = results[i]
+        if result and result.status == 429:
+            resource = resource_for(requests[i].path)
+            get_limiter(account_key(account_id), resource).on_throttle(
+                _batch_retry_after(result)
+            )
+
+
+def _throttled_units(
+    requests: list[BatchRequest],
+    results: list[BatchResponse | None],
+    indexes: list[int],
+) -> list[tuple[list[int], float]]:
+    """Throttled sub-requests (with dependents that failed because of them) to resend
+
+    Each independent chain is retried on its own after the longest Retry-After
+    among its throttled members.
+    """
+    units: dict[int, list[int]] = {}
+    waits: dict[int, float] = {}
+    roots: dict[int, int] = {}
+    for i in indexes:
+        root = next(
+            (roots[d] for d in requests[i].depends_on or [] if d in roots), i
+        )
+        result = results[i]
+        if result and result.status == 429:
+            waits[root] = max(waits.get(root, 0.0), _batch_retry_after(result))
+        elif not (result and result.status == 424 and root in waits):
+            continue
+        roots[i] = root
+        units.setdefault(root, []).append(i)
+    return [(unit, waits[root]) for root, unit in units.items() if root in waits]
+
+
+def batch(
+    requests: list[BatchRequest],
+    account_id: str | None = None,
+    max_concurrency: int = BATCH_CONCURRENCY,
+    max_retries: int = 3,
+) -> list[BatchResponse]:
+    """Send many requests through JSON $batch, returning responses in input order
+
+    Requests are split into 20-request batches that run concurrently.
+    Throttled sub-requests are retried individually after their own Retry-After.
+    """
+    results: list[BatchResponse | None] = [None] * len(requests)
+
+    def send(indexes: list[int]) -> None:
+        result = request(
+            "POST",
+            "/$batch",
+            account_id,
+            json=_batch_payload(requests, indexes),
+            resource=_batch_resource(requests, indexes),
+            weight=len(indexes),
+        )
+        _apply_batch_result(result, indexes, results)
+        _note_batch_throttles(requests, results, indexes, account_id)
+        for _ in range(max_retries):
+            units = _throttled_units(requests, results, indexes)
+            if not units:
+                break
+            for unit, wait in units:
+                time.sleep(wait)
+                result = request(
+                    "POST",
+                    "/$batch",
+                    account_id,
+                    json=_batch_payload(requests, unit),
+                    resource=_batch_resource(requests, unit),
+                    weight=len(unit),
+                )
+                _apply_batch_result(result, unit, results)
+                _note_batch_throttles(requests, results, unit, account_id)
+
+    batches = _plan_batches(requests)
+    if batches:
+        with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+            list(pool.map(send, batches))
+    return results  # type: ignore[return-value]
+
+
+# Async twins of the helpers above, for the async MCP tools. They share one
+# httpx.AsyncClient and never block the event loop while backing off.
+
+
+async def aaccount_key(account_id: str | None) -> str | None:
+    """account_key() once account_id has been resolved against the token cache
+
+    Keys computed before the first token call of a process would still be the
+    email address (or None) rather than the home_account_id.
+    """
+    await aget_token(account_id)
+    return account_key(account_id)
+
+
+async def arequest(
+    method: str,
+    path: str,
+    account_id: str | None = None,
+    params: dict[str, Any] | None = None,
+    json: dict[str, Any] | None = None,
+    data: bytes | None = None,
+    max_retries: int = 3,
+    resource: str | None = None,
+    weight: int = 1,
+) -> dict[str, Any] | None:
+    """Send one Graph request, paced as weight requests to resource's limiter
+
+    resource defaults to the bucket path belongs to.
+    """
+    headers = _prepare_headers(method, path, params, json)
+    headers["Authorization"] = f"Bearer {await aget_token(account_id)}"
+    limiter = get_limiter(account_key(account_id), resource or resource_for(path))
+    url = f"{BASE_URL}{path}"
+    client = _get_async_client()
+    attempts = Retry(method, url, max_retries)
+    key, cached = _cache_lookup(method, url, params, headers, account_id)
+
+    token_refreshed = False
+    while True:
+        attempts.begin()
+        await _apace(limiter, weight)
+        try:
+            response = await client.request(
+                method=method,
+                url=url,
+                headers=headers,
+                params=params,
+                json=json,
+                content=data,
+            )
+        except httpx.TransportError as e:
+            delay = attempts.on_error(e)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            continue
+
+        if response.status_code == 401 and not token_refreshed:
+            invalidate_token(account_id)
+            headers["Authorization"] = f"Bearer {await aget_token(account_id)}"
+            token_refreshed = True
+            continue
+
+        _note_throttle(limiter, response)
+        delay = attempts.on_response(response)
+        if delay is not None:
+            await asyncio.sleep(delay)
+            continue
+
+        if response.status_code == 304 and cached is not None:
+            limiter.on_success()
+            return get_cache().revalidated(key, cached)
+
+        response.raise_for_status()
+        limiter.on_success()
+        if key is not None:
+            get_cache().store(key, response)
+
+        if response.content:
+            return response.json()
+        return None
+
+
+async def _apages(
+    path: str,
+    account_id: str | None,
+    params: dict[str, Any] | None,
+    limit: int | None,
+) -> AsyncIterator[dict[str, Any]]:
+    """Pages of a listing, stopping once limit items have been fetched"""
+    fetched = 0
+    result = await arequest("GET", path, account_id, params=params)
+    while result:
+        yield result
+        fetched += len(result.get("value", []))
+        next_link = result.get("@odata.nextLink")
+        if not next_link or (limit and fetched >= limit):
+            break
+        result = await arequest("GET", next_link.replace(BASE_URL, ""), account_id)
+
+
+async def _aprefetch(
+    pages: AsyncIterator[dict[str, Any]], depth: int
+) -> AsyncIterator[dict[str, Any]]:
+    """Pull pages in a background task, at most depth ahead of the consumer"""
+    slots = asyncio.Semaphore(depth)
+    ready: asyncio.Queue[Any] = asyncio.Queue()
+    done = object()
+
+    async def produce() -> None:
+        try:
+            while True:
+                await slots.acquire()
+                page = await anext(pages, done)
+                ready.put_nowait(page)
+                if page is done:
+                    return
+        except Exception as e:
+            ready.put_nowait(e)
+
+    task = asyncio.create_task(produce())
+    try:
+        while (page := await ready.get()) is not done:
+            if isinstance(page, Exception):
+                raise page
+            slots.release()
+            yield page
+    finally:
+        task.cancel()
+
+
+async def arequest_paginated(
+    path: str,
+    account_id: str | None = None,
+    params: dict[str, Any] | None = None,
+    limit: int | None = None,
+    prefetch: int | None = None,
+) -> AsyncIterator[dict[str, Any]]:
+    """Make paginated requests following @odata.nextLink
+
+    Up to prefetch pages (PAGINATION_PREFETCH by default) are fetched while
+    the current one is consumed; nothing is fetched once limit is reached.
+    """
+    depth = PAGINATION_PREFETCH if prefetch is None else prefetch
+    pages = _apages(path, account_id, params, limit)
+    if depth > 0:
+        pages = _aprefetch(pages, depth)
+
+    items_returned = 0
+    async for result in pages:
+        for item in result.get("value", []):
+            if limit and items_returned >= limit:
+                return
+            yield item
+            items_returned += 1
+
+
+async def arequest_page(
+    path: str,
+    account_id: str | None = None,
+    params: dict[str, Any] | None = None,
+    next_link: str | None = None,
+) -> tuple[list[dict[str, Any]], str | None]:
+    """Fetch one page of a listing: its items and the nextLink continuing it
+
+    With next_link, the page it points to is fetched instead of path.
+    """
+    if next_link:
+        result = await arequest("GET", next_link.replace(BASE_URL, ""), account_id)
+    else:
+        result = await arequest("GET", path, account_id, params=params)
+    result = result or {}
+    return result.get("value", []), result.get("@odata.nextLink")
+
+
+async def adelta(
+    path: str,
+    account_id: str | None = None,
+    params: dict[str, Any] | None = None,
+    delta_link: str | None = None,
+) -> tuple[list[dict[str, Any]], str | None]:
+    """Run a delta query to the end, returning the changes and the next deltaLink
+
+    Without a delta_link this is the initial round, which lists every item.
+    An expired delta_link makes Graph answer 410 Gone, raised as HTTPStatusError.
+    """
+    items: list[dict[str, Any]] = []
+    if delta_link:
+        result = await arequest("GET", delta_link.replace(BASE_URL, ""), account_id)
+    else:
+        result = await arequest("GET", path, account_id, params=params)
+
+    while result:
+        items.extend(result.get("value", []))
+        next_link = result.get("@odata.nextLink")
+        if not next_link:
+            return items, result.get("@odata.deltaLink")
+        result = await arequest("GET", next_link.replace(BASE_URL, ""), account_id)
+
+    return items, None
+
+
+async def adownload_raw(
+    path: str, account_id: str | None = None, max_retries: int = 3
+) -> bytes:
+    headers = {"Authorization": f"Bearer {await aget_token(account_id)}"}
+    limiter = get_limiter(account_key(account_id), resource_for(path))
+    url = f"{BASE_URL}{path}"
+    client = _get_async_client("download")
+    attempts = Retry("GET", url, max_retries)
+
+    token_refreshed = False
+    while True:
+        attempts.begin()
+        await _apace(limiter)
+        try:
+            response = await client.get(url, headers=headers)
+        except httpx.TransportError as e:
+            delay = attempts.on_error(e)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            continue
+
+        if response.status_code == 401 and not token_refreshed:
+            invalidate_token(account_id)
+            headers["Authorization"] = f"Bearer {await aget_token(account_id)}"
+            token_refreshed = True
+            continue
+
+        _note_throttle(limiter, response)
+        delay = attempts.on_response(response)
+        if delay is not None:
+            await asyncio.sleep(delay)
+            continue
+
+        response.raise_for_status()
+        limiter.on_success()
+        return response.content
+
+
+class _RangeIgnored(Exception):
+    """A host answered a Range request with the whole file"""
+
+
+async def _astream_range(
+    url: str,
+    file: BinaryIO,
+    start: int,
+    end: int | None,
+    limiter: RateLimiter,
+    max_retries: int,
+) -> None:
+    """Write bytes start..end (inclusive, None for the rest) of url into file
+
+    A dropped connection is retried with a Range request for what is still
+    missing, so nothing already on disk is fetched twice. An attempt that
+    made progress starts the retry count and deadline over, however long
+    the transfer has been running.
+    """
+    client = _get_async_client("download")
+    attempts = Retry("GET", url, max_retries)
+    position = start
+    while True:
+        attempt_start = position
+        headers = {}
+        if position or end is not None:
+            headers["Range"] = f"bytes={position}-{'' if end is None else end}"
+        attempts.begin()
+        await _apace(limiter)
+        try:
+            async with client.stream("GET", url, headers=headers) as response:
+                _note_throttle(limiter, response)
+                delay = attempts.on_response(response)
+                if delay is None:
+                    response.raise_for_status()
+                    if headers and response.status_code != 206:
+                        # The host sent the whole file instead of the range
+                        if start or end is not None:
+                            raise _RangeIgnored(httpx.URL(url).host)
+                        position = 0
+                    file.seek(position)
+                    # Written as they arrive, so a drop loses nothing received
+                    async for chunk in response.aiter_bytes():
+                        file.write(chunk)
+                        position += len(chunk)
+                    limiter.on_success()
+                    return
+        except httpx.TransportError as e:
+            if position > attempt_start:
+                attempts = Retry("GET", url, max_retries)
+            delay = attempts.on_error(e)
+            if delay is None:
+                raise
+        await asyncio.sleep(delay)
+
+
+async def adownload_file(
+    url: str,
+    path: pl.Path,
+    size: int | None = None,
+    account_id: str | None = None,
+    max_retries: int = 3,
+) -> int:
+    """Stream a pre-authenticated download URL to path, chunk by chunk
+
+    Files of at least two DOWNLOAD_SEGMENT_MIN ranges are fetched as up to
+    DOWNLOAD_SEGMENTS ranges in parallel, or in one stream if the host does
+    not serve ranges. Returns the number of ranges used.
+    """
+    limiter = get_limiter(account_key(account_id), "drive")
+    segments = min(DOWNLOAD_SEGMENTS, (size or 0) // DOWNLOAD_SEGMENT_MIN)
+    if segments >= 2:
+        with path.open("wb") as f:
+            f.truncate(size)
+        bounds = [size * i // segments for i in range(segments + 1)]
+
+        async def fetch(start: int, stop: int) -> None:
+            with path.open("r+b") as f:
+                await _astream_range(url, f, start, stop - 1, limiter, max_retries)
+
+        try:
+            # The first failure cancels the other segments
+            async with asyncio.TaskGroup() as group:
+                for a, b in zip(bounds, bounds[1:]):
+                    group.create_task(fetch(a, b))
+        except BaseExceptionGroup as e:
+            # Raise what the single-stream path would, not the group
+            errors = [
+                error
+                for error in e.exceptions
+                if not isinstance(error, (_RangeIgnored, asyncio.CancelledError))
+            ]
+            if errors:
+                raise errors[0]
+        else:
+            return segments
+
+    with path.open("wb") as f:
+        await _astream_range(url, f, 0, None, limiter, max_retries)
+    return 1
+
+
+async def _ado_chunked_upload(
+    upload_url: str,
+    data: Upload,
+    file_size: int,
+    headers: dict[str, str],
+    limiter: RateLimiter,
+) -> dict[str, Any]:
+    """Internal helper for chunked uploads"""
+    client = _get_async_client("upload")
+
+    for i, chunk in enumerate(_upload_chunks(data)):
+        chunk_start = i * UPLOAD_CHUNK_SIZE
+        chunk_end = chunk_start + len(chunk)
+
+        chunk_headers = headers.copy()
+        chunk_headers["Content-Length"] = str(len(chunk))
+        chunk_headers["Content-Range"] = (
+            f"bytes {chunk_start}-{chunk_end - 1}/{file_size}"
+        )
+
+        attempts = Retry("PUT", upload_url)
+        while True:
+            attempts.begin()
+            await _apace(limiter)
+            try:
+                response = await client.put(
+                    upload_url, content=_achunk_body(chunk), headers=chunk_headers
+                )
+            except httpx.TransportError as e:
+                delay = attempts.on_error(e)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+
+            _note_throttle(limiter, response)
+            delay = attempts.on_response(response)
+            if delay is not None:
+                await asyncio.sleep(delay)
+                continue
+
+            response.raise_for_status()
+            limiter.on_success()
+            break
+
+        if response.status_code in (200, 201):
+            return response.json()
+
+    raise ValueError("Upload completed but no final response received")
+
+
+async def acreate_upload_session(
+    path: str,
+    account_id: str | None = None,
+    item_properties: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    """Create an upload session for large files"""
+    payload = {"item": item_properties or {}}
+    result = await arequest(
+        "POST", f"{path}/createUploadSession", account_id, json=payload
+    )
+    if not result:
+        raise ValueError("Failed to create upload session")
+    return result
+
+
+async def aupload_large_file(
+    path: str,
+    data: Upload,
+    account_id: str | None = None,
+    item_properties: dict[str, Any] | None = None,
+    size: int | None = None,
+) -> dict[str, Any]:
+    """Upload a large file using upload sessions
+
+    data may be a path or binary file object, read one chunk at a time. A
+    non-seekable stream such as a pipe needs its size given.
+    """
+    file_size = _upload_size(data, size)
+
+    if file_size <= UPLOAD_CHUNK_SIZE:
+        result = await arequest(
+            "PUT", f"{path}/content", account_id, data=_upload_bytes(data)
+        )
+        if not result:
+            raise ValueError("Failed to upload file")
+        return result
+
+    session = await acreate_upload_session(path, account_id, item_properties)
+    upload_url = session["uploadUrl"]
+
+    headers = {"Authorization": f"Bearer {await aget_token(account_id)}"}
+    return await _ado_chunked_upload(
+        upload_url,
+        data,
+        file_size,
+        headers,
+        get_limiter(account_key(account_id), "drive"),
+    )
+
+
+async def acreate_mail_upload_session(
+    message_id: str,
+    attachment_item: dict[str, Any],
+    account_id: str | None = None,
+) -> dict[str, Any]:
+    """Create an upload session for large mail attachments"""
+    result = await arequest(
+        "POST",
+        f"/me/messages/{message_id}/attachments/createUploadSession",
+        account_id,
+        json={"AttachmentItem": attachment_item},
+    )
+    if not result:
+        raise ValueError("Failed to create mail attachment upload session")
+    return result
+
+
+async def aupload_large_mail_attachment(
+    message_id: str,
+    name: str,
+    data: Upload,
+    account_id: str | None = None,
+    content_type: str = "application/octet-stream",
+    size: int | None = None,
+) -> dict[str, Any]:
+    """Upload a large mail attachment using upload sessions
+
+    A non-seekable stream such as a pipe needs its size given.
+    """
+    file_size = _upload_size(data, size)
+    attachment_item = {
+        "attachmentType": "file",
+        "name": name,
+        "size": file_size,
+        "contentType": content_type,
+    }
+
+    session = await acreate_mail_upload_session(message_id, attachment_item, account_id)
+    upload_url = session["uploadUrl"]
+
+    headers = {"Authorization": f"Bearer {await aget_token(account_id)}"}
+    return await _ado_chunked_upload(
+        upload_url,
+        data,
+        file_size,
+        headers,
+        get_limiter(account_key(account_id), "mail"),
+    )
+
+
+async def asearch_query(
+    query: str,
+    entity_types: list[str],
+    account_id: str | None = None,
+    limit: int = 50,
+    fields: list[str] | None = None,
+) -> AsyncIterator[dict[str, Any]]:
+    """Use the modern /search/query API endpoint"""
+    payload = _search_payload(query, entity_types, limit, fields)
+    items_returned = 0
+
+    while True:
+        result = await arequest("POST", "/search/query", account_id, json=payload)
+
+        if not result or "value" not in result:
+            break
+
+        for resource in _search_hits(result):
+            if limit and items_returned >= limit:
+                return
+            yield resource
+            items_returned += 1
+
+        if not _search_has_more(result):
             break
 
         payload["requests"][0]["from"] += payload["requests"][0]["size"]
+
+
+async def asearch_page(
+    query: str,
+    entity_types: list[str],
+    account_id: str | None = None,
+    size: int = 25,
+    offset: int = 0,
+    fields: list[str] | None = None,
+) -> tuple[list[dict[str, Any]], bool]:
+    """One page of /search/query hits from offset, and whether more follow"""
+    payload = _search_payload(query, entity_types, size, fields)
+    payload["requests"][0]["from"] = offset
+    result = await arequest("POST", "/search/query", account_id, json=payload)
+    if not result or "value" not in result:
+        return [], False
+    return list(_search_hits(result)), _search_has_more(result)
+
+
+async def abatch(
+    requests: list[BatchRequest],
+    account_id: str | None = None,
+    max_concurrency: int = BATCH_CONCURRENCY,
+    max_retries: int = 3,
+) -> list[BatchResponse]:
+    """Send many requests through JSON $batch, returning responses in input order
+
+    Requests are split into 20-request batches that run concurrently.
+    Throttled sub-requests are retried individually after their own Retry-After.
+    """
+    results: list[BatchResponse | None] = [None] * len(requests)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def post(indexes: list[int]) -> None:
+        async with semaphore:
+            result = await arequest(
+                "POST",
+                "/$batch",
+                account_id,
+                json=_batch_payload(requests, indexes),
+                resource=_batch_resource(requests, indexes),
+                weight=len(indexes),
+            )
+        _apply_batch_result(result, indexes, results)
+        _note_batch_throttles(requests, results, indexes, account_id)
+
+    async def retry(unit: list[int], wait: float) -> None:
+        await asyncio.sleep(wait)
+        await post(unit)
+
+    async def send(indexes: list[int]) -> None:
+        await post(indexes)
+        for _ in range(max_retries):
+            units = _throttled_units(requests, results, indexes)
+            if not units:
+                break
+            await asyncio.gather(*(retry(unit, wait) for unit, wait in units))
+
+    await asyncio.gather(*(send(b) for b in _plan_batches(requests)))
+    return results  # type: ignore[return-value]
@@ -0,0 +1,96 @@
+import base64
+import hashlib
+import pathlib as pl
+from typing import Any
+
+# Checksums OneDrive reports in a drive item's file.hashes, strongest first
+HASHES = ("sha256Hash", "sha1Hash", "quickXorHash")
+
+# Byte i is XORed in at bit 11 * i mod 160 of a 160-bit state, so bytes whose
+# positions are 160 apart land in the same place
+_WIDTH = 160
+_SHIFT = 11
+_BLOCK = 160
+_MASK = (1 << _WIDTH) - 1
+
+
+class QuickXorHash:
+    """OneDrive's quickXorHash with the hashlib update()/digest() interface
+
+    Each chunk is folded to 160 bytes with big-integer XORs, and only those
+    are spread over the state when the digest is taken.
+    """
+
+    def __init__(self) -> None:
+        # XOR of the bytes at positions k mod 160 in byte k, little-endian
+        self._slots = 0
+        self._pending = b""
+        self._length = 0
+
+    def update(self, data: bytes) -> None:
+        self._length += len(data)
+        data = self._pending + data
+        usable = len(data) - len(data) % _BLOCK
+        self._pending = data[usable:]
+        if usable:
+            self._slots ^= _fold(data[:usable])
+
+    def digest(self) -> bytes:
+        slots = self._slots ^ int.from_bytes(self._pending, "little")
+        state = 0
+        for k, byte in enumerate(slots.to_bytes(_BLOCK, "little")):
+            if byte:
+                shift = _SHIFT * k % _WIDTH
+                state ^= ((byte << shift) | (byte >> (_WIDTH - shift))) & _MASK
+        # The length is XORed into the last 64 bits
+        state ^= self._length << (_WIDTH - 64)
+        return state.to_bytes(_WIDTH // 8, "little")
+
+    def b64digest(self) -> str:
+        return base64.b64encode(self.digest()).decode()
+
+
+def _fold(data: bytes) -> int:
+    """XOR of data's 160-byte blocks, data being a whole number of blocks"""
+    value = int.from_bytes(data, "little")
+    width = len(data)
+    while width > _BLOCK:
+        if width // _BLOCK % 2:
+            value = (value & ((1 << _BLOCK * 8) - 1)) ^ (value >> _BLOCK * 8)
+            width -= _BLOCK
+            continue
+        width //= 2
+        value = (value & ((1 << width * 8) - 1)) ^ (value >> width * 8)
+    return value
+
+
+def _hasher(name: str) -> Any:
+    if name == "quickXorHash":
+        return QuickXorHash()
+    return hashlib.sha256() if name == "sha256Hash" else hashlib.sha1()
+
+
+def _encoded(name: str, hasher: Any) -> str:
+    # quickXorHash is reported in base64, the SHA hashes in upper-case hex
+    if name == "quickXorHash":
+        return hasher.b64digest()
+    return hasher.hexdigest().upper()
+
+
+def verify(path: pl.Path, hashes: dict[str, str]) -> str | None:
+    """Check path against the strongest of a drive item's hashes
+
+    Returns the name of the hash checked, or None when the item reports none.
+    Raises ValueError on a mismatch.
+    """
+    name = next((h for h in HASHES if hashes.get(h)), None)
+    if name is None:
+        return None
+    hasher = _hasher(name)
+    with path.open("rb") as f:
+        while chunk := f.read(1024 * 1024):
+            hasher.update(chunk)
+    expected = hashes[name] if name == "quickXorHash" else hashes[name].upper()
+    if _encoded(name, hasher) != expected:
+        raise ValueError(f"{path.name} does not match the {name} OneDrive reports")
+    return name
@@ -0,0 +1,114 @@
+import httpx
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, NamedTuple
+
+# Conditional GET cache; off unless MICROSOFT_MCP_HTTP_CACHE=1
+HTTP_CACHE = os.getenv("MICROSOFT_MCP_HTTP_CACHE", "0") == "1"
+HTTP_CACHE_MAX_BYTES = int(
+    os.getenv("MICROSOFT_MCP_HTTP_CACHE_MAX_BYTES", str(32 * 1024 * 1024))
+)
+# Bodies larger than this are never cached so one item cannot flush the rest
+HTTP_CACHE_MAX_ENTRY_BYTES = HTTP_CACHE_MAX_BYTES // 16
+
+# Pre-authenticated URLs expire after about an hour, so a body carrying one
+# must not outlive the response that brought it
+_EXPIRING = b"@microsoft.graph.downloadUrl"
+
+# (account, URL with query string, Prefer header)
+CacheKey = tuple[str | None, str, str]
+
+
+class CacheEntry(NamedTuple):
+    etag: str
+    body: bytes
+
+
+class ResponseCache:
+    """LRU of GET bodies and their ETags, bounded by total body size
+
+    Entries are never served without revalidation: the caller sends
+    If-None-Match and only a 304 from Graph turns an entry into a hit.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = HTTP_CACHE_MAX_BYTES,
+        max_entry_bytes: int = HTTP_CACHE_MAX_ENTRY_BYTES,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.size = 0
+        self._entries: OrderedDict[CacheKey, CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.bytes_saved = 0
+        self.evictions = 0
+
+    def lookup(self, key: CacheKey) -> CacheEntry | None:
+        with self._lock:
+            self.lookups += 1
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def revalidated(self, key: CacheKey, entry: CacheEntry) -> dict[str, Any]:
+        """Record a 304 for entry and return a fresh copy of its body"""
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += len(entry.body)
+        return json.loads(entry.body)
+
+    def store(self, key: CacheKey, response: httpx.Response) -> None:
+        etag = response.headers.get("ETag")
+        body = response.content
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old.body)
+            if not etag or not body or len(body) > self.max_entry_bytes:
+                return
+            if _EXPIRING in body:
+                return
+            self._entries[key] = CacheEntry(etag, body)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted.body)
+                self.evictions += 1
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_ratio": round(self.hits / self.lookups, 3) if self.lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "evictions": self.evictions,
+        }
+
+
+_cache = ResponseCache()
+
+
+def cache_key(
+    account_id: str | None,
+    url: str,
+    params: dict[str, Any] | None,
+    headers: dict[str, str],
+) -> CacheKey:
+    return (account_id, str(httpx.URL(url, params=params)), headers.get("Prefer", ""))
+
+
+def get_cache() -> ResponseCache | None:
+    """The process-wide response cache, or None when caching is disabled"""
+    return _cache if HTTP_CACHE else None
+
+
+def stats() -> dict[str, Any]:
+    return _cache.stats()
@@ -0,0 +1,221 @@
+import asyncio
+import httpx
+import os
+import time
+from typing import Any, NamedTuple
+from microsoft_graph_mcp import graph
+from microsoft_graph_mcp.auth import account_key
+
+# Seconds before the folder index is brought up to date through a delta query
+MAIL_FOLDERS_TTL = float(os.getenv("MICROSOFT_MCP_MAIL_FOLDERS_TTL", "300"))
+# childFolders listings fetched at once while walking the tree
+WALK_CONCURRENCY = 8
+FOLDER_SELECT = "id,displayName,parentFolderId,childFolderCount"
+
+# Friendly and well-known folder names Graph accepts in place of an id
+WELL_KNOWN = {
+    k.casefold(): v
+    for k, v in {
+        "inbox": "inbox",
+        "sent": "sentitems",
+        "sentitems": "sentitems",
+        "drafts": "drafts",
+        "deleted": "deleteditems",
+        "deleteditems": "deleteditems",
+        "junk": "junkemail",
+        "junkemail": "junkemail",
+        "archive": "archive",
+        "outbox": "outbox",
+    }.items()
+}
+
+
+class MailFolder(NamedTuple):
+    id: str
+    display_name: str
+    parent_id: str | None
+
+
+class FolderIndex:
+    """Every mail folder of one mailbox, addressable by id, name or path
+
+    Paths are display names joined with "/" from the top of the mailbox,
+    e.g. "Projects/2026/Acme"; names and paths match case-insensitively.
+    """
+
+    def __init__(self) -> None:
+        self.folders: dict[str, MailFolder] = {}
+        self.delta_link: str | None = None
+        self.expires = 0.0
+        self.well_known: dict[str, str] | None = None
+        self._by_path: dict[str, str] = {}
+        self._by_name: dict[str, list[str]] = {}
+
+    def update(self, items: list[dict[str, Any]], replace: bool = False) -> None:
+        """Apply folder listings or delta changes, then rebuild the lookups"""
+        if replace:
+            self.folders = {}
+        for item in items:
+            if "@removed" in item:
+                self.folders.pop(item["id"], None)
+                continue
+            old = self.folders.get(item["id"])
+            self.folders[item["id"]] = MailFolder(
+                item["id"],
+                item.get("displayName", old.display_name if old else ""),
+                item.get("parentFolderId", old.parent_id if old else None),
+            )
+        self._reindex()
+
+    def _reindex(self) -> None:
+        self._by_path = {}
+        self._by_name = {}
+        for folder in self.folders.values():
+            self._by_path[self.path(folder.id).casefold()] = folder.id
+            self._by_name.setdefault(folder.display_name.casefold(), []).append(
+                folder.id
+            )
+
+    def path(self, folder_id: str) -> str:
+        names = []
+        folder = self.folders.get(folder_id)
+        while folder is not None and len(names) <= len(self.folders):
+            names.append(folder.display_name)
+            folder = self.folders.get(folder.parent_id or "")
+        return "/".join(reversed(names))
+
+    def lookup(self, name: str) -> str | None:
+        if name in self.folders:
+            return name
+        key = name.strip("/").casefold()
+        if key in self._by_path:
+            return self._by_path[key]
+        ids = self._by_name.get(key, [])
+        if len(ids) > 1:
+            paths = ", ".join(sorted(self.path(i) for i in ids))
+            raise ValueError(f"Folder name '{name}' is ambiguous, use a path: {paths}")
+        return ids[0] if ids else None
+
+
+_indexes: dict[str | None, FolderIndex] = {}
+
+
+async def _walk(account_id: str | None) -> list[dict[str, Any]]:
+    """List every folder, fetching each level's childFolders concurrently"""
+    semaphore = asyncio.Semaphore(WALK_CONCURRENCY)
+    params = {"$top": 100, "$select": FOLDER_SELECT}
+
+    async def children(path: str) -> list[dict[str, Any]]:
+        async with semaphore:
+            return [
+                folder
+                async for folder in graph.arequest_paginated(
+                    path, account_id, params=dict(params)
+                )
+            ]
+
+    found: list[dict[str, Any]] = []
+    level = await children("/me/mailFolders")
+    while level:
+        found.extend(level)
+        listings = await asyncio.gather(
+            *(
+                children(f"/me/mailFolders/{folder['id']}/childFolders")
+                for folder in level
+                if folder.get("childFolderCount")
+            )
+        )
+        level = [folder for listing in listings for folder in listing]
+    return found
+
+
+async def _build(account_id: str | None) -> FolderIndex:
+    """Walk the tree while an initial delta round seeds the index's delta link"""
+    index = FolderIndex()
+    # The delta round starts no later than the walk, so changes the walk misses
+    # come back in the first incremental round
+    (_, delta_link), folders = await asyncio.gather(
+        graph.adelta("/me/mailFolders/delta", account_id, {"$select": FOLDER_SELECT}),
+        _walk(account_id),
+    )
+    index.update(folders)
+    index.delta_link = delta_link
+    index.expires = time.monotonic() + MAIL_FOLDERS_TTL
+    return index
+
+
+async def _refresh(index: FolderIndex, account_id: str | None) -> None:
+    params = {"$select": FOLDER_SELECT}
+    try:
+        items, delta_link = await graph.adelta(
+            "/me/mailFolders/delta", account_id, params, index.delta_link
+        )
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code != 410:
+            raise
+        index.delta_link = None
+        items, delta_link = await graph.adelta(
+            "/me/mailFolders/delta", account_id, params
+        )
+    # Without a delta link the round lists every folder, deleted ones included
+    index.update(items, replace=index.delta_link is None)
+    index.delta_link = delta_link
+    index.expires = time.monotonic() + MAIL_FOLDERS_TTL
+
+
+async def get_index(account_id: str | None) -> FolderIndex:
+    key = await graph.aaccount_key(account_id)
+    index = _indexes.get(key)
+    if index is None:
+        index = _indexes[key] = await _build(account_id)
+    elif index.expires <= time.monotonic():
+        await _refresh(index, account_id)
+    return index
+
+
+def invalidate(account_id: str | None) -> None:
+    """Bring the account's index up to date on its next use"""
+    index = _indexes.get(account_key(account_id))
+    if index is not None:
+        index.expires = 0.0
+
+
+async def well_known_names(account_id: str | None) -> dict[str, str]:
+    """Map the ids of well-known folders to the name Graph also accepts for them"""
+    index = await get_index(account_id)
+    if index.well_known is None:
+        names = sorted(set(WELL_KNOWN.values()))
+        responses = await graph.abatch(
+            [
+                graph.BatchRequest(
+                    "GET", f"/me/mailFolders/{name}", params={"$select": "id"}
+                )
+                for name in names
+            ],
+            account_id,
+        )
+        # Mailboxes without e.g. an archive folder answer 404 for it
+        index.well_known = {
+            r.body["id"]: name
+            for name, r in zip(names, responses)
+            if r.status == 200 and r.body
+        }
+    return index.well_known
+
+
+async def resolve(folder: str, account_id: str | None) -> str:
+    """Map a well-known name, display name, path or id to a folder id"""
+    well_known = WELL_KNOWN.get(folder.casefold())
+    if well_known:
+        # Graph accepts well-known folder names wherever a folder id is expected
+        return well_known
+
+    index = await get_index(account_id)
+    folder_id = index.lookup(folder)
+    if folder_id is None:
+        # Possibly created since the index was last refreshed
+        invalidate(account_id)
+        folder_id = (await get_index(account_id)).lookup(folder)
+    if folder_id is None:
+        raise ValueError(f"Folder '{folder}' not found")
+    return folder_id
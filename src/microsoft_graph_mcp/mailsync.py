@@ -0,0 +1,322 @@
+import asyncio
+import datetime as dt
+import httpx
+import json
+import os
+import re
+import sqlite3
+import time
+from typing import Any
+from microsoft_graph_mcp import bodies, graph, mailfolders
+from microsoft_graph_mcp.auth import account_key
+from microsoft_graph_mcp.syncstore import get_store
+
+# Serve list_emails from a local copy kept current through delta queries
+MAIL_SYNC = os.getenv("MICROSOFT_MCP_MAIL_SYNC", "0") == "1"
+# Only sync messages received in the last N days; 0 syncs whole folders
+MAIL_SYNC_DAYS = int(os.getenv("MICROSOFT_MCP_MAIL_SYNC_DAYS", "90"))
+# Answer search_emails from the full-text index over the synced mailbox
+MAIL_SEARCH = os.getenv("MICROSOFT_MCP_MAIL_SEARCH", "0") == "1"
+# Seconds a mailbox-wide catch-up stays fresh for the next search
+MAIL_SEARCH_SYNC_INTERVAL = 60.0
+# bm25 weights for subject, sender, recipients and body
+SEARCH_WEIGHTS = (10.0, 5.0, 3.0, 1.0)
+
+MESSAGE_FIELDS = [
+    "id",
+    "subject",
+    "from",
+    "toRecipients",
+    "ccRecipients",
+    "receivedDateTime",
+    "hasAttachments",
+    "body",
+    "conversationId",
+    "isRead",
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    account TEXT NOT NULL,
+    id TEXT NOT NULL,
+    folder_id TEXT NOT NULL,
+    received TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (account, id)
+);
+CREATE INDEX IF NOT EXISTS messages_by_folder
+    ON messages (account, folder_id, received);
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    subject, sender, recipients, body, tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def _body_text(body: dict[str, Any] | None) -> str:
+    # One line, so snippets read as running text
+    return " ".join(bodies.body_text(body).split())
+
+
+def _people(*recipients: dict[str, Any]) -> str:
+    parts = []
+    for recipient in recipients:
+        address = recipient.get("emailAddress") or {}
+        parts += [address.get("name") or "", address.get("address") or ""]
+    return " ".join(parts)
+
+
+def _index_columns(message: dict[str, Any]) -> tuple[str, str, str, str]:
+    return (
+        message.get("subject") or "",
+        _people(message.get("from") or {}),
+        _people(
+            *(message.get("toRecipients") or []), *(message.get("ccRecipients") or [])
+        ),
+        _body_text(message.get("body")),
+    )
+
+
+def _unindex(
+    conn: sqlite3.Connection, where: str, params: list[tuple[Any, ...]]
+) -> None:
+    conn.executemany(
+        "DELETE FROM messages_fts"
+        f" WHERE rowid IN (SELECT rowid FROM messages WHERE {where})",
+        params,
+    )
+
+
+def _scope(folder_id: str) -> str:
+    return f"mail:{folder_id}"
+
+
+def apply_changes(
+    conn: sqlite3.Connection,
+    account: str,
+    folder_id: str,
+    items: list[dict[str, Any]],
+) -> None:
+    """Write one delta round for a folder into the store
+
+    Removals only drop the row if it still belongs to this folder: a message
+    moved elsewhere may already have been stored by the target folder's sync.
+    """
+    removed = [
+        (account, item["id"], folder_id) for item in items if "@removed" in item
+    ]
+    where = "account = ? AND id = ? AND folder_id = ?"
+    _unindex(conn, where, removed)
+    conn.executemany(f"DELETE FROM messages WHERE {where}", removed)
+    conn.executemany(
+        "INSERT INTO messages (account, id, folder_id, received, data)"
+        " VALUES (?, ?, ?, ?, ?)"
+        " ON CONFLICT (account, id) DO UPDATE SET"
+        " folder_id = excluded.folder_id,"
+        " received = coalesce(excluded.received, messages.received),"
+        " data = json_patch(messages.data, excluded.data)",
+        [
+            (
+                account,
+                item["id"],
+                folder_id,
+                item.get("receivedDateTime"),
+                json.dumps({k: v for k, v in item.items() if not k.startswith("@")}),
+            )
+            for item in items
+            if "@removed" not in item
+        ],
+    )
+    # Re-index from the merged row, since a change may carry only some fields
+    changed = [(account, item["id"]) for item in items if "@removed" not in item]
+    _unindex(conn, "account = ? AND id = ?", changed)
+    for params in changed:
+        for rowid, data in conn.execute(
+            "SELECT rowid, data FROM messages WHERE account = ? AND id = ?", params
+        ):
+            conn.execute(
+                "INSERT INTO messages_fts"
+                " (rowid, subject, sender, recipients, body) VALUES (?, ?, ?, ?, ?)",
+                (rowid, *_index_columns(json.loads(data))),
+            )
+
+
+def _store_round(
+    account: str,
+    folder_id: str,
+    items: list[dict[str, Any]],
+    delta_link: str | None,
+    next_link: str | None,
+) -> None:
+    """Write a delta round, replacing the folder's copy after a full listing"""
+    store = get_store()
+    with store.transaction() as conn:
+        if delta_link is None:
+            where = "account = ? AND folder_id = ?"
+            _unindex(conn, where, [(account, folder_id)])
+            conn.execute(f"DELETE FROM messages WHERE {where}", (account, folder_id))
+        apply_changes(conn, account, folder_id, items)
+        store.set_delta_link(conn, account, _scope(folder_id), next_link)
+
+
+
+async def sync_folder(account_id: str | None, folder_id: str) -> int:
+    """Catch the local copy of a folder up with Graph, returning the changes applied
+
+    Store access runs in threads, like every SQLite call from async code here:
+    a large round or a common-word search can take hundreds of milliseconds.
+    """
+    store = get_store()
+    await asyncio.to_thread(store.ensure, SCHEMA)
+    account = await graph.aaccount_key(account_id) or ""
+    path = f"/me/mailFolders/{folder_id}/messages/delta"
+    params = {"$select": ",".join(MESSAGE_FIELDS)}
+    if MAIL_SYNC_DAYS:
+        since = dt.datetime.now(dt.timezone.utc) - dt.timedelta(days=MAIL_SYNC_DAYS)
+        params["$filter"] = f"receivedDateTime ge {since:%Y-%m-%dT%H:%M:%SZ}"
+
+    delta_link = await asyncio.to_thread(
+        store.delta_link, account, _scope(folder_id)
+    )
+    try:
+        items, next_link = await graph.adelta(path, account_id, params, delta_link)
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code != 410:
+            raise
+        # Sync state expired; start over from a full listing
+        delta_link = None
+        items, next_link = await graph.adelta(path, account_id, params)
+
+    await asyncio.to_thread(
+        _store_round, account, folder_id, items, delta_link, next_link
+    )
+    return len(items)
+
+
+async def list_messages(
+    account_id: str | None,
+    folder_id: str,
+    limit: int,
+    fields: list[str] = MESSAGE_FIELDS,
+    offset: int = 0,
+) -> list[dict[str, Any]] | None:
+    """Newest messages of a folder from the local copy, after catching up
+
+    Returns None when a sync window is set and the folder holds fewer than
+    limit synced messages past offset, since older mail may exist outside
+    the window.
+    """
+    await sync_folder(account_id, folder_id)
+    rows = await asyncio.to_thread(
+        get_store().query,
+        "SELECT data FROM messages WHERE account = ? AND folder_id = ?"
+        " ORDER BY received DESC LIMIT ? OFFSET ?",
+        (account_key(account_id) or "", folder_id, limit, offset),
+    )
+    if MAIL_SYNC_DAYS and len(rows) < limit:
+        return None
+    messages = [json.loads(data) for (data,) in rows]
+    return [{k: m[k] for k in fields if k in m} for m in messages]
+
+
+_mailbox_synced: dict[str | None, float] = {}
+
+
+async def folder_key(account_id: str | None, folder: str) -> str:
+    """Folder id the local copy files a folder's messages under
+
+    Well-known folders are synced under their name (e.g. "inbox"), the way
+    list_emails addresses them, so the same folder is never stored twice.
+    """
+    folder_id = await mailfolders.resolve(folder, account_id)
+    if folder_id in mailfolders.WELL_KNOWN.values():
+        return folder_id
+    well_known = await mailfolders.well_known_names(account_id)
+    return well_known.get(folder_id, folder_id)
+
+
+async def sync_mailbox(account_id: str | None) -> None:
+    """Catch every folder up, at most once per MAIL_SEARCH_SYNC_INTERVAL"""
+    key = await graph.aaccount_key(account_id)
+    if _mailbox_synced.get(key, 0.0) > time.monotonic():
+        return
+    index = await mailfolders.get_index(account_id)
+    well_known = await mailfolders.well_known_names(account_id)
+    semaphore = asyncio.Semaphore(mailfolders.WALK_CONCURRENCY)
+
+    async def sync(folder_id: str) -> None:
+        async with semaphore:
+            await sync_folder(account_id, well_known.get(folder_id, folder_id))
+
+    await asyncio.gather(*(sync(folder_id) for folder_id in index.folders))
+    _mailbox_synced[key] = time.monotonic() + MAIL_SEARCH_SYNC_INTERVAL
+
+
+def _match_expression(query: str) -> str:
+    """Every word of query as a quoted prefix term, so FTS5 syntax cannot leak in"""
+    return " ".join(f'"{word}"*' for word in _WORD.findall(query))
+
+
+def query_index(
+    account: str,
+    query: str,
+    folder_id: str | None = None,
+    since: dt.datetime | None = None,
+    limit: int = 50,
+    offset: int = 0,
+) -> list[dict[str, Any]]:
+    """Best matches for query among the stored messages, with a snippet each"""
+    expression = _match_expression(query)
+    if not expression:
+        return []
+    where = ""
+    params: list[Any] = [expression, account]
+    if folder_id:
+        where += " AND m.folder_id = ?"
+        params.append(folder_id)
+    if since:
+        where += " AND m.received >= ?"
+        params.append(f"{since.astimezone(dt.timezone.utc):%Y-%m-%dT%H:%M:%SZ}")
+    rows = get_store().query(
+        "SELECT m.folder_id, m.data,"
+        " snippet(messages_fts, -1, '**', '**', '...', 16)"
+        " FROM messages_fts JOIN messages m ON m.rowid = messages_fts.rowid"
+        f" WHERE messages_fts MATCH ? AND m.account = ?{where}"
+        f" ORDER BY bm25(messages_fts, {', '.join(map(str, SEARCH_WEIGHTS))})"
+        " LIMIT ? OFFSET ?",
+        (*params, limit, offset),
+    )
+    results = []
+    for folder, data, snippet in rows:
+        message = json.loads(data)
+        message.pop("body", None)
+        results.append({**message, "folderId": folder, "snippet": snippet})
+    return results
+
+
+async def search_messages(
+    account_id: str | None,
+    query: str,
+    folder: str | None = None,
+    since: dt.datetime | None = None,
+    limit: int = 50,
+    offset: int = 0,
+) -> list[dict[str, Any]]:
+    """Ranked full-text search over the synced mailbox, caught up first"""
+    await asyncio.to_thread(get_store().ensure, SCHEMA)
+    if folder:
+        folder_id = await folder_key(account_id, folder)
+        await sync_folder(account_id, folder_id)
+    else:
+        folder_id = None
+        await sync_mailbox(account_id)
+    return await asyncio.to_thread(
+        query_index,
+        account_key(account_id) or "",
+        query,
+        folder_id,
+        since,
+        limit,
+        offset,
+    )
@@ -0,0 +1,127 @@
+import os
+import threading
+import time
+from typing import Any
+
+# Requests per second allowed per (account, resource) when Graph is not throttling;
+# 0 disables pacing
+RATE_LIMIT = float(os.getenv("MICROSOFT_MCP_RATE_LIMIT", "16"))
+# Requests that may be sent back to back before pacing kicks in
+RATE_BURST = int(os.getenv("MICROSOFT_MCP_RATE_BURST", "10"))
+MIN_RATE = 0.5
+# Additive increase per successful request, in requests per second
+RATE_INCREASE = 0.25
+
+
+def resource_for(path: str) -> str:
+    """Graph throttling bucket a request path belongs to"""
+    parts = path.split("?", 1)[0].strip("/").casefold().split("/")
+    if parts[0] == "me":
+        segment = parts[1] if len(parts) > 1 else ""
+    elif parts[0] == "users":
+        segment = parts[2] if len(parts) > 2 else ""
+    else:
+        segment = parts[0]
+    if segment in ("messages", "mailfolders", "sendmail", "inferenceclassification"):
+        return "mail"
+    if segment in (
+        "events",
+        "calendar",
+        "calendars",
+        "calendarview",
+        "findmeetingtimes",
+    ):
+        return "calendar"
+    if segment in ("drive", "drives"):
+        return "drive"
+    if segment in ("contacts", "contactfolders", "people"):
+        return "contacts"
+    return "other"
+
+
+class RateLimiter:
+    """AIMD pacing for one (account, resource) pair
+
+    Requests are spaced out with a GCRA token bucket. Each 429 halves the rate
+    and pauses the whole bucket until Retry-After has passed; each success adds
+    a little rate back until the configured ceiling is reached again.
+    """
+
+    def __init__(
+        self, max_rate: float = RATE_LIMIT, burst: int = RATE_BURST
+    ) -> None:
+        self.max_rate = max_rate
+        self.rate = max_rate
+        self.burst = max(burst, 1)
+        self._tat = 0.0
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self.waits = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def reserve(self, count: int = 1) -> float:
+        """Claim count send slots and return the seconds to wait before using them
+
+        A $batch POST claims one slot per sub-request, since Graph throttles
+        each of them.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.requests += count
+            wait = max(0.0, self._paused_until - now)
+            if self.max_rate > 0:
+                interval = 1.0 / self.rate
+                tat = max(self._tat, now)
+                wait = max(wait, tat - (self.burst - count) * interval - now)
+                self._tat = max(tat, now + wait) + count * interval
+            if wait > 0:
+                self.waits += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+            return wait
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + RATE_INCREASE)
+
+    def on_throttle(self, retry_after: float) -> None:
+        with self._lock:
+            self.throttled += 1
+            self.rate = max(MIN_RATE, self.rate / 2)
+            self._paused_until = max(
+                self._paused_until, time.monotonic() + retry_after
+            )
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "rate": round(self.rate, 2),
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "waits": self.waits,
+            "total_wait_s": round(self.total_wait, 3),
+            "max_wait_s": round(self.max_wait, 3),
+        }
+
+
+_limiters: dict[tuple[str | None, str], RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(account_id: str | None, resource: str) -> RateLimiter:
+    key = (account_id, resource)
+    limiter = _limiters.get(key)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.setdefault(key, RateLimiter())
+    return limiter
+
+
+def metrics() -> dict[str, dict[str, Any]]:
+    """Pacing and throttling counters per account and resource"""
+    return {
+        f"{account_id or 'default'}/{resource}": limiter.snapshot()
+        for (account_id, resource), limiter in list(_limiters.items())
+    }
@@ -0,0 +1,47 @@
+import copy
+import os
+import time
+from typing import Any, Awaitable, Callable
+from microsoft_graph_mcp import graph
+from microsoft_graph_mcp.auth import account_key
+
+# Seconds before slow-changing per-account data is fetched again
+PROFILE_TTL = float(os.getenv("MICROSOFT_MCP_PROFILE_TTL", "3600"))
+
+# (account, resource name) -> (expiry on the monotonic clock, value)
+_entries: dict[tuple[str | None, str], tuple[float, Any]] = {}
+
+
+async def _cached(
+    account_id: str | None,
+    name: str,
+    ttl: float,
+    fetch: Callable[[], Awaitable[Any]],
+) -> Any:
+    key = (await graph.aaccount_key(account_id), name)
+    entry = _entries.get(key)
+    if entry is None or entry[0] <= time.monotonic():
+        value = await fetch()
+        entry = _entries[key] = (time.monotonic() + ttl, value)
+    # Callers are free to modify what they get back
+    return copy.deepcopy(entry[1])
+
+
+def invalidate(account_id: str | None, name: str | None = None) -> None:
+    """Forget one cached resource of an account, or all of them"""
+    key = account_key(account_id)
+    for k in [k for k in _entries if k[0] == key and name in (None, k[1])]:
+        _entries.pop(k, None)
+
+
+async def profile(account_id: str | None) -> dict[str, Any]:
+    """The signed-in user's /me profile"""
+
+    async def fetch() -> dict[str, Any]:
+        result = await graph.arequest("GET", "/me", account_id)
+        if not result:
+            raise ValueError("Failed to get user profile")
+        return result
+
+    return await _cached(account_id, "profile", PROFILE_TTL, fetch)
+
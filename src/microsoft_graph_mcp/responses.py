@@ -0,0 +1,76 @@
+import os
+from typing import Any
+
+# Strip annotations, empty values and single-key wrappers from tool results
+SLIM_RESPONSES = os.getenv("MICROSOFT_MCP_SLIM_RESPONSES", "1") != "0"
+
+
+def _split(fields: list[str]) -> tuple[list[str], dict[str, list[str]]]:
+    select = ["id"]
+    expand: dict[str, list[str]] = {}
+    for field in fields:
+        head, _, rest = field.partition("/")
+        if rest:
+            expand.setdefault(head, []).append(rest)
+        elif head not in select:
+            select.append(head)
+    return select, expand
+
+
+def query_params(fields: list[str] | None) -> dict[str, str]:
+    """$select and $expand for fields; "attachments/name" expands attachments"""
+    if not fields:
+        return {}
+    select, expand = _split(fields)
+    params = {"$select": ",".join(select)}
+    if expand:
+        params["$expand"] = ",".join(
+            f"{name}($select={','.join(sub)})" for name, sub in expand.items()
+        )
+    return params
+
+
+def is_flat(fields: list[str] | None) -> bool:
+    """Whether fields only names top-level properties, as local copies hold"""
+    return not any("/" in field for field in fields or [])
+
+
+def project(items: list[dict[str, Any]], fields: list[str]) -> list[dict[str, Any]]:
+    """Keep only the top-level properties fields names (and the id)"""
+    keep = _split(fields)[0]
+    return [{k: item[k] for k in keep if k in item} for item in items]
+
+
+# Wrapper keys that carry no meaning of their own; anything else keeps its
+# key so a result's shape never depends on which properties happen to be set
+UNWRAP = frozenset({"emailAddress"})
+
+
+def _empty(value: Any) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+def slim(value: Any) -> Any:
+    """Drop @odata annotations and empty values, and unwrap UNWRAP wrappers
+
+    {"from": {"emailAddress": {"name": ..., "address": ...}}} becomes
+    {"from": {"name": ..., "address": ...}}.
+    """
+    if not SLIM_RESPONSES:
+        return value
+    if isinstance(value, list):
+        return [slim(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+    slimmed = {}
+    for key, item in value.items():
+        if key.startswith("@odata."):
+            continue
+        item = slim(item)
+        if not _empty(item):
+            slimmed[key] = item
+    if len(slimmed) == 1:
+        ((key, only),) = slimmed.items()
+        if key in UNWRAP and isinstance(only, dict):
+            return only
+    return slimmed
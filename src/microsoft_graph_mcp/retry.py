@@ -0,0 +1,241 @@
+import datetime as dt
+import email.utils
+import httpx
+import os
+import random
+import threading
+import time
+
+# Longest a single call may spend retrying before giving up, in seconds
+RETRY_DEADLINE = float(os.getenv("MICROSOFT_MCP_RETRY_DEADLINE", "120"))
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 30.0
+# Retries allowed per original request, process-wide, on top of a small
+# steady allowance so a quiet process can still retry
+RETRY_BUDGET_RATIO = float(os.getenv("MICROSOFT_MCP_RETRY_BUDGET", "0.2"))
+RETRY_BUDGET_PER_SECOND = 1.0
+RETRY_BUDGET_MAX = 50.0
+# Consecutive failures that open a host's circuit, and how long it stays open
+BREAKER_THRESHOLD = int(os.getenv("MICROSOFT_MCP_BREAKER_THRESHOLD", "5"))
+BREAKER_RESET = float(os.getenv("MICROSOFT_MCP_BREAKER_RESET", "30"))
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+# Transport errors raised before the request left this process, safe to retry
+# for any method
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+# Statuses where a non-idempotent request was turned away unprocessed, and
+# may be resent once the server says when
+REJECTED_STATUSES = frozenset({429, 503})
+# Statuses that say the host itself is unhealthy, as opposed to one request
+# failing there
+UNHEALTHY_STATUSES = frozenset({502, 503, 504})
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while the host's circuit is open"""
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Seconds to wait for a Retry-After given in seconds or as an HTTP-date"""
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=dt.timezone.utc)
+    return max((when - dt.datetime.now(dt.timezone.utc)).total_seconds(), 0.0)
+
+
+def retry_after(response: httpx.Response) -> float | None:
+    """Retry-After in seconds, if the response carries a usable one"""
+    return parse_retry_after(response.headers.get("Retry-After"))
+
+
+def is_retryable_status(status: int) -> bool:
+    return status == 429 or (status >= 500 and status not in (501, 505))
+
+
+class RetryBudget:
+    """Token bucket shared by every call so an outage cannot multiply traffic
+
+    Each original request deposits RETRY_BUDGET_RATIO tokens and each retry
+    spends one, so retries stay a bounded fraction of the real load.
+    """
+
+    def __init__(
+        self,
+        ratio: float = RETRY_BUDGET_RATIO,
+        per_second: float = RETRY_BUDGET_PER_SECOND,
+        maximum: float = RETRY_BUDGET_MAX,
+    ) -> None:
+        self.ratio = ratio
+        self.per_second = per_second
+        self.maximum = maximum
+        self.balance = maximum
+        self.exhausted = 0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.balance = min(
+            self.maximum, self.balance + (now - self._updated) * self.per_second
+        )
+        self._updated = now
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._refill()
+            self.balance = min(self.maximum, self.balance + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            self._refill()
+            if self.balance < 1:
+                self.exhausted += 1
+                return False
+            self.balance -= 1
+            return True
+
+
+class CircuitBreaker:
+    """Fails fast for a host after repeated transport failures or 502/503/504s
+
+    After BREAKER_RESET seconds one probe request is let through; its outcome
+    closes the circuit again or keeps it open for another period.
+    """
+
+    def __init__(
+        self, threshold: int = BREAKER_THRESHOLD, reset_after: float = BREAKER_RESET
+    ) -> None:
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._probe_at: float | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_after:
+            return "open"
+        return "half-open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self.opened_at < self.reset_after:
+                return False
+            # A probe that never reported back must not wedge the circuit
+            if self._probe_at is not None and now - self._probe_at < self.reset_after:
+                return False
+            self._probe_at = now
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probe_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._probe_at is not None or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+                self._probe_at = None
+
+
+_budget = RetryBudget()
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(host: str) -> CircuitBreaker:
+    breaker = _breakers.get(host)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(host, CircuitBreaker())
+    return breaker
+
+
+class Retry:
+    """Retry decisions for one logical call, shared by the sync and async loops
+
+    The caller performs the I/O and the waiting; this only says whether to try
+    again and after how long. Delays use decorrelated jitter, honour
+    Retry-After, and never run past the call's deadline.
+    """
+
+    def __init__(
+        self,
+        method: str,
+        url: str,
+        max_retries: int = 3,
+        deadline: float = RETRY_DEADLINE,
+    ) -> None:
+        self.host = httpx.URL(url).host
+        self.idempotent = method.upper() in IDEMPOTENT_METHODS
+        self.max_retries = max_retries
+        self.retries = 0
+        self.breaker = get_breaker(self.host)
+        self._deadline = time.monotonic() + deadline
+        self._delay = RETRY_BASE_DELAY
+        _budget.deposit()
+
+    def begin(self) -> None:
+        """Call before every attempt; raises CircuitOpenError to fail fast"""
+        if not self.breaker.allow():
+            raise CircuitOpenError(
+                f"{self.host} is failing, not sending requests for up to "
+                f"{self.breaker.reset_after:.0f}s"
+            )
+
+    def on_response(self, response: httpx.Response) -> float | None:
+        """Seconds to wait before retrying, or None to accept the response"""
+        status = response.status_code
+        if status in UNHEALTHY_STATUSES:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        if not is_retryable_status(status):
+            return None
+        server_delay = retry_after(response)
+        # A POST that failed mid-way may have taken effect; only an explicit
+        # "come back later" proves it did not
+        if not self.idempotent and (
+            status not in REJECTED_STATUSES or server_delay is None
+        ):
+            return None
+        return self._next_delay(server_delay)
+
+    def on_error(self, error: httpx.TransportError) -> float | None:
+        """Seconds to wait before retrying, or None to re-raise the error"""
+        self.breaker.record_failure()
+        if not (self.idempotent or isinstance(error, NOT_SENT_ERRORS)):
+            return None
+        return self._next_delay(None)
+
+    def _next_delay(self, server_delay: float | None) -> float | None:
+        if self.retries >= self.max_retries or self.breaker.state == "open":
+            return None
+        self._delay = min(
+            RETRY_MAX_DELAY, random.uniform(RETRY_BASE_DELAY, self._delay * 3)
+        )
+        delay = self._delay if server_delay is None else server_delay
+        if time.monotonic() + delay > self._deadline:
+            return None
+        if not _budget.withdraw():
+            return None
+        self.retries += 1
+        return delay
@@ -0,0 +1,94 @@
+import contextlib
+import os
+import pathlib as pl
+import sqlite3
+import threading
+from typing import Any, Iterator
+
+# Local copy of synced mailbox, calendar, drive and contact data
+SYNC_DB = pl.Path(
+    os.getenv("MICROSOFT_MCP_SYNC_DB", str(pl.Path.home() / ".microsoft_mcp_sync.db"))
+)
+
+
+class SyncStore:
+    """SQLite database shared by the delta sync engines
+
+    Each engine creates its own tables through ensure(); delta links are kept
+    here per account and scope (e.g. "mail:inbox") so a restart resumes from
+    the last sync instead of downloading everything again.
+    """
+
+    def __init__(self, path: pl.Path) -> None:
+        self.path = path
+        self._lock = threading.RLock()
+        self._schemas: set[str] = set()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            path, timeout=30.0, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self.ensure(
+            "CREATE TABLE IF NOT EXISTS delta_links ("
+            " account TEXT NOT NULL, scope TEXT NOT NULL, link TEXT NOT NULL,"
+            " PRIMARY KEY (account, scope))"
+        )
+
+    def ensure(self, schema: str) -> None:
+        if schema in self._schemas:
+            return
+        with self._lock:
+            self._conn.executescript(schema)
+            self._schemas.add(schema)
+
+    @contextlib.contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def query(self, sql: str, params: tuple[Any, ...] = ()) -> list[tuple[Any, ...]]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def delta_link(self, account: str, scope: str) -> str | None:
+        rows = self.query(
+            "SELECT link FROM delta_links WHERE account = ? AND scope = ?",
+            (account, scope),
+        )
+        return rows[0][0] if rows else None
+
+    def set_delta_link(
+        self, conn: sqlite3.Connection, account: str, scope: str, link: str | None
+    ) -> None:
+        """Record the link to resume from, inside the transaction that applied it"""
+        if link is None:
+            conn.execute(
+                "DELETE FROM delta_links WHERE account = ? AND scope = ?",
+                (account, scope),
+            )
+        else:
+            conn.execute(
+                "INSERT OR REPLACE INTO delta_links (account, scope, link)"
+                " VALUES (?, ?, ?)",
+                (account, scope, link),
+            )
+
+
+_store: SyncStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> SyncStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SyncStore(SYNC_DB)
+    return _store
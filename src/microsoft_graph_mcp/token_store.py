@@ -0,0 +1,193 @@
+import contextlib
+import json
+import os
+import pathlib as pl
+import sqlite3
+import tempfile
+import threading
+from typing import Any, Iterator, Protocol
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# MSAL cache state: credential type -> cache key -> entry
+CacheState = dict[str, dict[str, dict[str, Any]]]
+# Keys removed since the last load, per credential type
+Deletions = dict[str, set[str]]
+
+
+class TokenStore(Protocol):
+    """Persistent backend for the MSAL token cache shared between processes"""
+
+    def version(self) -> object:
+        """Cheap marker that changes whenever another writer updated the store"""
+        ...
+
+    def load(self) -> CacheState: ...
+
+    def save(self, upserts: CacheState, deletions: Deletions) -> None:
+        """Apply only the entries changed by this process on top of the stored state"""
+        ...
+
+
+def diff_state(base: CacheState, current: CacheState) -> tuple[CacheState, Deletions]:
+    upserts: CacheState = {}
+    deletions: Deletions = {}
+    for section, entries in current.items():
+        base_entries = base.get(section, {})
+        for key, entry in entries.items():
+            if base_entries.get(key) != entry:
+                upserts.setdefault(section, {})[key] = entry
+    for section, base_entries in base.items():
+        entries = current.get(section, {})
+        for key in base_entries:
+            if key not in entries:
+                deletions.setdefault(section, set()).add(key)
+    return upserts, deletions
+
+
+def apply_changes(
+    state: CacheState, upserts: CacheState, deletions: Deletions
+) -> CacheState:
+    for section, keys in deletions.items():
+        for key in keys:
+            state.get(section, {}).pop(key, None)
+    for section, entries in upserts.items():
+        state.setdefault(section, {}).update(entries)
+    return state
+
+
+@contextlib.contextmanager
+def _file_lock(path: pl.Path) -> Iterator[None]:
+    """Exclusive advisory lock held through a sidecar lock file"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class FileTokenStore:
+    """JSON file store with a file lock and atomic temp-file-plus-rename writes
+
+    Writers re-read the file under the lock and apply only their own changes,
+    so concurrent processes never drop each other's refresh tokens.
+    """
+
+    def __init__(self, path: pl.Path) -> None:
+        self.path = path
+        self.lock_path = path.with_name(path.name + ".lock")
+
+    def version(self) -> object:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def load(self) -> CacheState:
+        try:
+            content = self.path.read_text()
+        except FileNotFoundError:
+            return {}
+        return json.loads(content) if content.strip() else {}
+
+    def save(self, upserts: CacheState, deletions: Deletions) -> None:
+        with _file_lock(self.lock_path):
+            state = apply_changes(self.load(), upserts, deletions)
+            self._write_atomic(json.dumps(state, indent=4))
+
+    def _write_atomic(self, content: str) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(
+            dir=self.path.parent, prefix=self.path.name, suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp, 0o600)
+            os.replace(tmp, self.path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(tmp)
+            raise
+
+
+class SqliteTokenStore:
+    """SQLite store keeping one row per cache entry
+
+    Saves touch only the rows that changed, so the cost of a token refresh
+    does not grow with the number of accounts in the cache. An existing JSON
+    cache file is imported the first time the database is created.
+    """
+
+    def __init__(self, path: pl.Path, seed: pl.Path | None = None) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            path, timeout=30.0, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS token_cache ("
+            " section TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+            " PRIMARY KEY (section, key))"
+        )
+        if seed and seed.exists() and not self._has_rows():
+            self.save(FileTokenStore(seed).load(), {})
+
+    def _has_rows(self) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM token_cache LIMIT 1").fetchone()
+        return row is not None
+
+    def version(self) -> object:
+        # data_version only changes when *another* connection commits
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def load(self) -> CacheState:
+        state: CacheState = {}
+        with self._lock:
+            rows = self._conn.execute("SELECT section, key, value FROM token_cache")
+            for section, key, value in rows:
+                state.setdefault(section, {})[key] = json.loads(value)
+        return state
+
+    def save(self, upserts: CacheState, deletions: Deletions) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "DELETE FROM token_cache WHERE section = ? AND key = ?",
+                    [(s, k) for s, keys in deletions.items() for k in keys],
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO token_cache (section, key, value)"
+                    " VALUES (?, ?, ?)",
+                    [
+                        (s, k, json.dumps(v))
+                        for s, entries in upserts.items()
+                        for k, v in entries.items()
+                    ],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
@@ -1,43 +1,71 @@
+import asyncio
 import base64
+import contextlib
 import datetime as dt
 import pathlib as pl
-from typing import Any
+from typing import Any, AsyncIterator
 from fastmcp import FastMCP
-from microsoft_graph_mcp import graph, auth
+from microsoft_graph_mcp import (
+    graph,
+    auth,
+    bodies,
+    calsync,
+    contactsync,
+    cursors,
+    drivesync,
+    hashes,
+    mailfolders,
+    mailsync,
+    refcache,
+    responses,
+)
+
+
+@contextlib.asynccontextmanager
+async def _lifespan(server: FastMCP) -> AsyncIterator[dict[str, Any]]:
+    """Run the background token refresher for as long as the server is up
+
+    Started here rather than in server.main() so `fastmcp run` gets it too.
+    """
+    refresher = auth.get_refresher() if auth.BACKGROUND_REFRESH else None
+    if refresher:
+        refresher.start()
+    try:
+        yield {}
+    finally:
+        if refresher:
+            await asyncio.to_thread(refresher.stop)
+
 
-mcp = FastMCP("microsoft-graph-mcp")
+mcp = FastMCP("microsoft-graph-mcp", lifespan=_lifespan)
 
-FOLDERS = {
-    k.casefold(): v
-    for k, v in {
-        "inbox": "inbox",
-        "sent": "sentitems",
-        "drafts": "drafts",
-        "deleted": "deleteditems",
-        "junk": "junkemail",
-        "archive": "archive",
-    }.items()
-}
+
+async def _recipients(value: str | list[str], account_id: str) -> list[str]:
+    """Normalize recipients to a list, resolving contact names when synced"""
+    recipients = [value] if isinstance(value, str) else value
+    if contactsync.CONTACT_SYNC:
+        recipients = await contactsync.resolve_recipients(account_id, recipients)
+    return recipients
 
 
 @mcp.tool
-def list_accounts() -> list[dict[str, str]]:
+async def list_accounts() -> list[dict[str, str]]:
     """List all signed-in Microsoft accounts"""
     return [
         {"username": acc.username, "account_id": acc.account_id}
-        for acc in auth.list_accounts()
+        for acc in await asyncio.to_thread(auth.list_accounts)
     ]
 
 
 @mcp.tool
-def authenticate_account() -> dict[str, str]:
+async def authenticate_account() -> dict[str, str]:
     """Authenticate a new Microsoft account using device flow authentication
 
     Returns authentication instructions and device code for the user to complete authentication.
     The user must visit the URL and enter the code to authenticate their Microsoft account.
     """
-    app = auth.get_app()
-    flow = app.initiate_device_flow(scopes=auth.SCOPES)
+    app = await asyncio.to_thread(auth.get_app)
+    flow = await asyncio.to_thread(app.initiate_device_flow, scopes=auth.SCOPES)
 
     if "user_code" not in flow:
         error_msg = flow.get("error_description", "Unknown error")
@@ -63,7 +91,7 @@ def authenticate_account() -> dict[str, str]:
 
 
 @mcp.tool
-def complete_authentication(flow_cache: str) -> dict[str, str]:
+async def complete_authentication(flow_cache: str) -> dict[str, str]:
     """Complete the authentication process after the user has entered the device code
 
     Args:
@@ -79,8 +107,8 @@ def complete_authentication(flow_cache: str) -> dict[str, str]:
     except (ValueError, SyntaxError):
         raise ValueError("Invalid flow cache data")
 
-    app = auth.get_app()
-    result = app.acquire_token_by_device_flow(flow)
+    app = await asyncio.to_thread(auth.get_app)
+    result = await asyncio.to_thread(app.acquire_token_by_device_flow, flow)
 
     if "error" in result:
         error_msg = result.get("error_description", result["error"])
@@ -93,34 +121,15 @@ def complete_authentication(flow_cache: str) -> dict[str, str]:
         raise Exception(f"Authentication failed: {error_msg}")
 
     # Save the token cache
-    cache = app.token_cache
-    if isinstance(cache, auth.msal.SerializableTokenCache) and cache.has_state_changed:
-        auth._write_cache(cache.serialize())
-
-    # Get the newly added account
-    accounts = app.get_accounts()
-    if accounts:
-        # Find the account that matches the token we just got
-        for account in accounts:
-            if (
-                account.get("username", "").lower()
-                == result.get("id_token_claims", {})
-                .get("preferred_username", "")
-                .lower()
-            ):
-                return {
-                    "status": "success",
-                    "username": account["username"],
-                    "account_id": account["home_account_id"],
-                    "message": f"Successfully authenticated {account['username']}",
-                }
-        # If exact match not found, return the last account
-        account = accounts[-1]
+    auth._save_cache(app)
+
+    account = auth._account_for_result(app, result)
+    if account:
         return {
             "status": "success",
-            "username": account["username"],
-            "account_id": account["home_account_id"],
-            "message": f"Successfully authenticated {account['username']}",
+            "username": account.username,
+            "account_id": account.account_id,
+            "message": f"Successfully authenticated {account.username}",
         }
 
     return {
@@ -130,49 +139,105 @@ def complete_authentication(flow_cache: str) -> dict[str, str]:
 
 
 @mcp.tool
-def list_emails(
+async def list_emails(
     account_id: str,
     folder: str = "inbox",
     limit: int = 10,
     include_body: bool = True,
     include_details: bool | None = None,
-) -> list[dict[str, Any]]:
-    """List emails from specified folder"""
-    folder_path = FOLDERS.get(folder.casefold(), folder)
+    cursor: str | None = None,
+    fields: list[str] | None = None,
+    body_max_length: int = bodies.BODY_MAX_CHARS,
+    include_quoted: bool = False,
+) -> dict[str, Any]:
+    """List emails from specified folder, one page per call
+
+    Pass next_cursor back as cursor, with the same arguments, for the next page.
+    fields picks the message properties to return (e.g. ["subject", "from"]),
+    overriding include_body. Bodies come back as plain text of at most
+    body_max_length characters each, without quoted replies and signatures
+    unless include_quoted is set.
+    """
+    folder_path = await mailfolders.resolve(folder, account_id)
     # Support include_details as alias for include_body (used by some MCP clients)
     if include_details is not None:
         include_body = include_details
 
     if include_body:
-        select_fields = "id,subject,from,toRecipients,ccRecipients,receivedDateTime,hasAttachments,body,conversationId,isRead"
+        # uniqueBody alone leaves out the quoted thread, which is often most of
+        # the payload; the full body is only needed when asked for
+        body_fields = "body,uniqueBody" if include_quoted else "uniqueBody"
+        select_fields = (
+            "id,subject,from,toRecipients,ccRecipients,receivedDateTime,"
+            f"hasAttachments,{body_fields},conversationId,isRead"
+        )
     else:
         select_fields = "id,subject,from,toRecipients,receivedDateTime,hasAttachments,conversationId,isRead"
 
-    params = {
-        "$top": min(limit, 100),
-        "$select": select_fields,
-        "$orderby": "receivedDateTime desc",
+    select = responses.query_params(fields) or {"$select": select_fields}
+    request = {
+        "folder": folder_path,
+        "include_body": include_body,
+        "include_quoted": include_quoted,
+        "fields": fields,
     }
+    state = await cursors.decode(cursor, "list_emails", account_id, request)
+    offset = state.get("offset", 0)
 
-    emails = list(
-        graph.request_paginated(
-            f"/me/mailFolders/{folder_path}/messages",
-            account_id,
-            params=params,
-            limit=limit,
+    # The local copy has no uniqueBody; quote stripping stands in for it
+    local_fields = list(
+        dict.fromkeys(
+            "body" if f == "uniqueBody" else f for f in select["$select"].split(",")
         )
     )
+    if (
+        mailsync.MAIL_SYNC
+        and "next_link" not in state
+        and "$expand" not in select
+        and set(local_fields) <= set(mailsync.MESSAGE_FIELDS)
+    ):
+        # Keyed like sync_mailbox() and search, so no folder is stored twice
+        folder_id = await mailsync.folder_key(account_id, folder)
+        emails = await mailsync.list_messages(
+            account_id, folder_id, limit + 1, local_fields, offset
+        )
+        if emails is not None:
+            more = {"offset": offset + limit} if len(emails) > limit else None
+            emails = list(
+                bodies.trim(
+                    emails[:limit], body_max_length, include_quoted=include_quoted
+                )
+            )
+            return await cursors.page(emails, "list_emails", account_id, request, more)
 
-    return emails
+    params = {
+        "$top": min(limit, graph.PAGE_SIZE_MAX),
+        **select,
+        "$orderby": "receivedDateTime desc",
+    }
+    if offset:
+        params["$skip"] = offset
+
+    emails, next_link = await graph.arequest_page(
+        f"/me/mailFolders/{folder_path}/messages",
+        account_id,
+        params,
+        state.get("next_link"),
+    )
+    more = {"next_link": next_link} if next_link else None
+    emails = list(bodies.trim(emails, body_max_length, include_quoted=include_quoted))
+    return await cursors.page(emails, "list_emails", account_id, request, more)
 
 
 @mcp.tool
-def get_email(
+async def get_email(
     email_id: str,
     account_id: str,
     include_body: bool = True,
     body_max_length: int = 50000,
     include_attachments: bool = True,
+    fields: list[str] | None = None,
+    include_quoted: bool = False,
 ) -> dict[str, Any]:
     """Get email details with size limits
 
@@ -182,27 +247,26 @@ def get_email(
         include_body: Whether to include the email body (default: True)
         body_max_length: Maximum characters for body content (default: 50000)
         include_attachments: Whether to include attachment metadata (default: True)
+        fields: Properties to return, e.g. ["subject", "attachments/name"];
+            overrides include_attachments
+        include_quoted: Keep quoted replies and the signature in the body
+            (default: False)
     """
-    params = {}
-    if include_attachments:
+    params = responses.query_params(fields)
+    if include_attachments and not fields:
         params["$expand"] = "attachments($select=id,name,size,contentType)"
 
-    result = graph.request("GET", f"/me/messages/{email_id}", account_id, params=params)
+    result = await graph.arequest(
+        "GET", f"/me/messages/{email_id}", account_id, params=params
+    )
     if not result:
         raise ValueError(f"Email with ID {email_id} not found")
 
-    # Truncate body if needed
-    if include_body and "body" in result and "content" in result["body"]:
-        content = result["body"]["content"]
-        if len(content) > body_max_length:
-            result["body"]["content"] = (
-                content[:body_max_length]
-                + f"\n\n[Content truncated - {len(content)} total characters]"
-            )
-            result["body"]["truncated"] = True
-            result["body"]["total_length"] = len(content)
-    elif not include_body and "body" in result:
-        del result["body"]
+    if include_body:
+        result = next(bodies.trim([result], body_max_length, None, include_quoted))
+    else:
+        result.pop("body", None)
+        result.pop("uniqueBody", None)
 
     # Remove attachment content bytes to reduce size
     if "attachments" in result and result["attachments"]:
@@ -210,11 +274,11 @@ def get_email(
             if "contentBytes" in attachment:
                 del attachment["contentBytes"]
 
-    return result
+    return responses.slim(result)
 
 
 @mcp.tool
-def create_email_draft(
+async def create_email_draft(
     account_id: str,
     to: str | list[str],
     subject: str,
@@ -223,7 +287,7 @@ def create_email_draft(
     attachments: str | list[str] | None = None,
 ) -> dict[str, Any]:
     """Create an email draft with file path(s) as attachments"""
-    to_list = [to] if isinstance(to, str) else to
+    to_list = await _recipients(to, account_id)
 
     message = {
         "subject": subject,
@@ -232,7 +296,7 @@ def create_email_draft(
     }
 
     if cc:
-        cc_list = [cc] if isinstance(cc, str) else cc
+        cc_list = await _recipients(cc, account_id)
         message["ccRecipients"] = [
             {"emailAddress": {"address": addr}} for addr in cc_list
         ]
@@ -247,8 +311,7 @@ def create_email_draft(
         )
         for file_path in attachment_paths:
             path = pl.Path(file_path).expanduser().resolve()
-            content_bytes = path.read_bytes()
-            att_size = len(content_bytes)
+            att_size = path.stat().st_size
             att_name = path.name
 
             if att_size < 3 * 1024 * 1024:
@@ -256,14 +319,17 @@ def create_email_draft(
                     {
                         "@odata.type": "#microsoft.graph.fileAttachment",
                         "name": att_name,
-                        "contentBytes": base64.b64encode(content_bytes).decode("utf-8"),
+                        "contentBytes": base64.b64encode(path.read_bytes()).decode(
+                            "utf-8"
+                        ),
                     }
                 )
             else:
+                # Uploaded from the file a chunk at a time
                 large_attachments.append(
                     {
                         "name": att_name,
-                        "content_bytes": content_bytes,
+                        "path": path,
                         "content_type": "application/octet-stream",
                     }
                 )
@@ -271,17 +337,17 @@ def create_email_draft(
     if small_attachments:
         message["attachments"] = small_attachments
 
-    result = graph.request("POST", "/me/messages", account_id, json=message)
+    result = await graph.arequest("POST", "/me/messages", account_id, json=message)
     if not result:
         raise ValueError("Failed to create email draft")
 
     message_id = result["id"]
 
     for att in large_attachments:
-        graph.upload_large_mail_attachment(
+        await graph.aupload_large_mail_attachment(
             message_id,
             att["name"],
-            att["content_bytes"],
+            att["path"],
             account_id,
             att.get("content_type", "application/octet-stream"),
         )
@@ -290,7 +356,7 @@ def create_email_draft(
 
 
 @mcp.tool
-def send_email(
+async def send_email(
     account_id: str,
     to: str | list[str],
     subject: str,
@@ -299,7 +365,7 @@ def send_email(
     attachments: str | list[str] | None = None,
 ) -> dict[str, str]:
     """Send an email immediately with file path(s) as attachments"""
-    to_list = [to] if isinstance(to, str) else to
+    to_list = await _recipients(to, account_id)
 
     message = {
         "subject": subject,
@@ -308,7 +374,7 @@ def send_email(
     }
 
     if cc:
-        cc_list = [cc] if isinstance(cc, str) else cc
+        cc_list = await _recipients(cc, account_id)
         message["ccRecipients"] = [
             {"emailAddress": {"address": addr}} for addr in cc_list
         ]
@@ -324,14 +390,13 @@ def send_email(
         )
         for file_path in attachment_paths:
             path = pl.Path(file_path).expanduser().resolve()
-            content_bytes = path.read_bytes()
-            att_size = len(content_bytes)
+            att_size = path.stat().st_size
             att_name = path.name
 
             processed_attachments.append(
                 {
                     "name": att_name,
-                    "content_bytes": content_bytes,
+                    "path": path,
                     "content_type": "application/octet-stream",
                     "size": att_size,
                 }
@@ -345,28 +410,30 @@ def send_email(
             {
                 "@odata.type": "#microsoft.graph.fileAttachment",
                 "name": att["name"],
-                "contentBytes": base64.b64encode(att["content_bytes"]).decode("utf-8"),
+                "contentBytes": base64.b64encode(att["path"].read_bytes()).decode(
+                    "utf-8"
+                ),
             }
             for att in processed_attachments
         ]
-        graph.request("POST", "/me/sendMail", account_id, json={"message": message})
+        await graph.arequest(
+            "POST", "/me/sendMail", account_id, json={"message": message}
+        )
         return {"status": "sent"}
     elif has_large_attachments:
         # Create draft first, then add large attachments, then send
         # We need to handle large attachments manually here
-        to_list = [to] if isinstance(to, str) else to
         message = {
             "subject": subject,
             "body": {"contentType": "Text", "content": body},
             "toRecipients": [{"emailAddress": {"address": addr}} for addr in to_list],
         }
         if cc:
-            cc_list = [cc] if isinstance(cc, str) else cc
             message["ccRecipients"] = [
                 {"emailAddress": {"address": addr}} for addr in cc_list
             ]
 
-        result = graph.request("POST", "/me/messages", account_id, json=message)
+        result = await graph.arequest("POST", "/me/messages", account_id, json=message)
         if not result:
             raise ValueError("Failed to create email draft")
 
@@ -374,10 +441,10 @@ def send_email(
 
         for att in processed_attachments:
             if att["size"] >= 3 * 1024 * 1024:
-                graph.upload_large_mail_attachment(
+                await graph.aupload_large_mail_attachment(
                     message_id,
                     att["name"],
-                    att["content_bytes"],
+                    att["path"],
                     account_id,
                     att.get("content_type", "application/octet-stream"),
                 )
@@ -385,30 +452,32 @@ def send_email(
                 small_att = {
                     "@odata.type": "#microsoft.graph.fileAttachment",
                     "name": att["name"],
-                    "contentBytes": base64.b64encode(att["content_bytes"]).decode(
+                    "contentBytes": base64.b64encode(att["path"].read_bytes()).decode(
                         "utf-8"
                     ),
                 }
-                graph.request(
+                await graph.arequest(
                     "POST",
                     f"/me/messages/{message_id}/attachments",
                     account_id,
                     json=small_att,
                 )
 
-        graph.request("POST", f"/me/messages/{message_id}/send", account_id)
+        await graph.arequest("POST", f"/me/messages/{message_id}/send", account_id)
         return {"status": "sent"}
     else:
-        graph.request("POST", "/me/sendMail", account_id, json={"message": message})
+        await graph.arequest(
+            "POST", "/me/sendMail", account_id, json={"message": message}
+        )
         return {"status": "sent"}
 
 
 @mcp.tool
-def update_email(
+async def update_email(
     email_id: str, updates: dict[str, Any], account_id: str
 ) -> dict[str, Any]:
     """Update email properties (isRead, categories, flag, etc.)"""
-    result = graph.request(
+    result = await graph.arequest(
         "PATCH", f"/me/messages/{email_id}", account_id, json=updates
     )
     if not result:
@@ -417,37 +486,58 @@ def update_email(
 
 
 @mcp.tool
-def delete_email(email_id: str, account_id: str) -> dict[str, str]:
+async def delete_email(email_id: str, account_id: str) -> dict[str, str]:
     """Delete an email"""
-    graph.request("DELETE", f"/me/messages/{email_id}", account_id)
+    await graph.arequest("DELETE", f"/me/messages/{email_id}", account_id)
     return {"status": "deleted"}
 
 
 @mcp.tool
-def move_email(
-    email_id: str, destination_folder: str, account_id: str
+async def create_mail_folder(
+    display_name: str, account_id: str, parent_folder: str | None = None
 ) -> dict[str, Any]:
-    """Move email to another folder"""
-    folder_path = FOLDERS.get(destination_folder.casefold(), destination_folder)
+    """Create a mail folder, optionally inside another folder"""
+    endpoint = "/me/mailFolders"
+    if parent_folder:
+        parent_id = await mailfolders.resolve(parent_folder, account_id)
+        endpoint = f"/me/mailFolders/{parent_id}/childFolders"
+
+    result = await graph.arequest(
+        "POST", endpoint, account_id, json={"displayName": display_name}
+    )
+    mailfolders.invalidate(account_id)
+    if not result:
+        raise ValueError("Failed to create mail folder")
+    return {"id": result["id"], "display_name": result["displayName"]}
 
-    folders = graph.request("GET", "/me/mailFolders", account_id)
-    folder_id = None
 
-    if not folders:
-        raise ValueError("Failed to retrieve mail folders")
-    if "value" not in folders:
-        raise ValueError(f"Unexpected folder response structure: {folders}")
+@mcp.tool
+async def rename_mail_folder(
+    folder: str, new_name: str, account_id: str
+) -> dict[str, Any]:
+    """Rename a mail folder"""
+    folder_id = await mailfolders.resolve(folder, account_id)
+    result = await graph.arequest(
+        "PATCH",
+        f"/me/mailFolders/{folder_id}",
+        account_id,
+        json={"displayName": new_name},
+    )
+    mailfolders.invalidate(account_id)
+    if not result:
+        raise ValueError("Failed to rename mail folder")
+    return {"id": result["id"], "display_name": result["displayName"]}
 
-    for folder in folders["value"]:
-        if folder["displayName"].lower() == folder_path.lower():
-            folder_id = folder["id"]
-            break
 
-    if not folder_id:
-        raise ValueError(f"Folder '{destination_folder}' not found")
+@mcp.tool
+async def move_email(
+    email_id: str, destination_folder: str, account_id: str
+) -> dict[str, Any]:
+    """Move email to another folder"""
+    folder_id = await mailfolders.resolve(destination_folder, account_id)
 
     payload = {"destinationId": folder_id}
-    result = graph.request(
+    result = await graph.arequest(
         "POST", f"/me/messages/{email_id}/move", account_id, json=payload
     )
     if not result:
@@ -457,69 +547,193 @@ def move_email(
     return {"status": "moved", "new_id": result["id"]}
 
 
+def _batch_status(
+    email_ids: list[str], responses: list[graph.BatchResponse], status: str
+) -> list[dict[str, Any]]:
+    """Per-message outcome of a bulk operation"""
+    results = []
+    for email_id, response in zip(email_ids, responses):
+        if 200 <= response.status < 300:
+            item = {"id": email_id, "status": status}
+            if status == "moved" and response.body and "id" in response.body:
+                item["new_id"] = response.body["id"]
+        else:
+            error = (response.body or {}).get("error", {})
+            item = {
+                "id": email_id,
+                "status": "error",
+                "code": response.status,
+                "error": error.get("message", error.get("code", "Unknown error")),
+            }
+        results.append(item)
+    return results
+
+
 @mcp.tool
-def reply_to_email(account_id: str, email_id: str, body: str) -> dict[str, str]:
+async def update_emails(
+    email_ids: list[str], updates: dict[str, Any], account_id: str
+) -> list[dict[str, Any]]:
+    """Apply the same property updates (isRead, categories, flag, etc.) to many emails
+
+    Sent through JSON $batch; returns one status entry per email id.
+    """
+    responses = await graph.abatch(
+        [
+            graph.BatchRequest("PATCH", f"/me/messages/{email_id}", json=updates)
+            for email_id in email_ids
+        ],
+        account_id,
+    )
+    return _batch_status(email_ids, responses, "updated")
+
+
+@mcp.tool
+async def move_emails(
+    email_ids: list[str], destination_folder: str, account_id: str
+) -> list[dict[str, Any]]:
+    """Move many emails to another folder
+
+    Sent through JSON $batch; returns one status entry per email id with its new id.
+    """
+    folder_id = await mailfolders.resolve(destination_folder, account_id)
+    responses = await graph.abatch(
+        [
+            graph.BatchRequest(
+                "POST",
+                f"/me/messages/{email_id}/move",
+                json={"destinationId": folder_id},
+            )
+            for email_id in email_ids
+        ],
+        account_id,
+    )
+    return _batch_status(email_ids, responses, "moved")
+
+
+@mcp.tool
+async def delete_emails(email_ids: list[str], account_id: str) -> list[dict[str, Any]]:
+    """Delete many emails
+
+    Sent through JSON $batch; returns one status entry per email id.
+    """
+    responses = await graph.abatch(
+        [
+            graph.BatchRequest("DELETE", f"/me/messages/{email_id}")
+            for email_id in email_ids
+        ],
+        account_id,
+    )
+    return _batch_status(email_ids, responses, "deleted")
+
+
+@mcp.tool
+async def reply_to_email(account_id: str, email_id: str, body: str) -> dict[str, str]:
     """Reply to an email (sender only)"""
     endpoint = f"/me/messages/{email_id}/reply"
     payload = {"message": {"body": {"contentType": "Text", "content": body}}}
-    graph.request("POST", endpoint, account_id, json=payload)
+    await graph.arequest("POST", endpoint, account_id, json=payload)
     return {"status": "sent"}
 
 
 @mcp.tool
-def reply_all_email(account_id: str, email_id: str, body: str) -> dict[str, str]:
+async def reply_all_email(account_id: str, email_id: str, body: str) -> dict[str, str]:
     """Reply to all recipients of an email"""
     endpoint = f"/me/messages/{email_id}/replyAll"
     payload = {"message": {"body": {"contentType": "Text", "content": body}}}
-    graph.request("POST", endpoint, account_id, json=payload)
+    await graph.arequest("POST", endpoint, account_id, json=payload)
     return {"status": "sent"}
 
 
 @mcp.tool
-def list_events(
+async def list_events(
     account_id: str,
     days_ahead: int = 7,
     days_back: int = 0,
     include_details: bool = True,
-) -> list[dict[str, Any]]:
-    """List calendar events within specified date range, including recurring event instances"""
-    now = dt.datetime.now(dt.timezone.utc)
-    start = (now - dt.timedelta(days=days_back)).isoformat()
-    end = (now + dt.timedelta(days=days_ahead)).isoformat()
+    limit: int = 100,
+    cursor: str | None = None,
+    fields: list[str] | None = None,
+) -> dict[str, Any]:
+    """List calendar events within specified date range, including recurring event instances
 
-    params = {
-        "startDateTime": start,
-        "endDateTime": end,
-        "$orderby": "start/dateTime",
-        "$top": 100,
+    Pass next_cursor back as cursor, with the same arguments, for the next page.
+    fields picks the event properties to return, overriding include_details.
+    """
+    request = {
+        "days_ahead": days_ahead,
+        "days_back": days_back,
+        "include_details": include_details,
+        "fields": fields,
     }
+    state = await cursors.decode(cursor, "list_events", account_id, request)
+    # Later pages keep the window of the first one
+    now = dt.datetime.now(dt.timezone.utc)
+    start = dt.datetime.fromisoformat(
+        state.get("start") or (now - dt.timedelta(days=days_back)).isoformat()
+    )
+    end = dt.datetime.fromisoformat(
+        state.get("end") or (now + dt.timedelta(days=days_ahead)).isoformat()
+    )
 
     if include_details:
-        params["$select"] = (
-            "id,subject,start,end,location,body,attendees,organizer,isAllDay,recurrence,onlineMeeting,seriesMasterId"
+        select_fields = (
+            "id,subject,start,end,location,body,attendees,organizer,isAllDay,"
+            "recurrence,onlineMeeting,seriesMasterId"
         )
     else:
-        params["$select"] = "id,subject,start,end,location,organizer,seriesMasterId"
+        select_fields = "id,subject,start,end,location,organizer,seriesMasterId"
+    select = responses.query_params(fields) or {"$select": select_fields}
+
+    if calsync.CALENDAR_SYNC and responses.is_flat(fields):
+        offset = state.get("offset", 0)
+        events = await calsync.list_events(
+            account_id, start, end, select["$select"].split(","), limit + 1, offset
+        )
+        more = None
+        if len(events) > limit:
+            more = {
+                "offset": offset + limit,
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+            }
+        return await cursors.page(
+            events[:limit], "list_events", account_id, request, more
+        )
+
+    params = {
+        "startDateTime": start.isoformat(),
+        "endDateTime": end.isoformat(),
+        "$orderby": "start/dateTime",
+        "$top": min(limit, graph.PAGE_SIZE_MAX),
+        **select,
+    }
 
     # Use calendarView to get recurring event instances
-    events = list(
-        graph.request_paginated("/me/calendarView", account_id, params=params)
+    events, next_link = await graph.arequest_page(
+        "/me/calendarView", account_id, params, state.get("next_link")
     )
-
-    return events
+    more = {"next_link": next_link} if next_link else None
+    return await cursors.page(events, "list_events", account_id, request, more)
 
 
 @mcp.tool
-def get_event(event_id: str, account_id: str) -> dict[str, Any]:
-    """Get full event details"""
-    result = graph.request("GET", f"/me/events/{event_id}", account_id)
+async def get_event(
+    event_id: str, account_id: str, fields: list[str] | None = None
+) -> dict[str, Any]:
+    """Get event details, or only the properties named in fields"""
+    result = await graph.arequest(
+        "GET",
+        f"/me/events/{event_id}",
+        account_id,
+        params=responses.query_params(fields),
+    )
     if not result:
         raise ValueError(f"Event with ID {event_id} not found")
-    return result
+    return responses.slim(result)
 
 
 @mcp.tool
-def create_event(
+async def create_event(
     account_id: str,
     subject: str,
     start: str,
@@ -543,19 +757,19 @@ def create_event(
         event["body"] = {"contentType": "Text", "content": body}
 
     if attendees:
-        attendees_list = [attendees] if isinstance(attendees, str) else attendees
+        attendees_list = await _recipients(attendees, account_id)
         event["attendees"] = [
             {"emailAddress": {"address": a}, "type": "required"} for a in attendees_list
         ]
 
-    result = graph.request("POST", "/me/events", account_id, json=event)
+    result = await graph.arequest("POST", "/me/events", account_id, json=event)
     if not result:
         raise ValueError("Failed to create event")
     return result
 
 
 @mcp.tool
-def update_event(
+async def update_event(
     event_id: str, updates: dict[str, Any], account_id: str
 ) -> dict[str, Any]:
     """Update event properties"""
@@ -578,26 +792,28 @@ def update_event(
     if "body" in updates:
         formatted_updates["body"] = {"contentType": "Text", "content": updates["body"]}
 
-    result = graph.request(
+    result = await graph.arequest(
         "PATCH", f"/me/events/{event_id}", account_id, json=formatted_updates
     )
     return result or {"status": "updated"}
 
 
 @mcp.tool
-def delete_event(
+async def delete_event(
     account_id: str, event_id: str, send_cancellation: bool = True
 ) -> dict[str, str]:
     """Delete or cancel a calendar event"""
     if send_cancellation:
-        graph.request("POST", f"/me/events/{event_id}/cancel", account_id, json={})
+        await graph.arequest(
+            "POST", f"/me/events/{event_id}/cancel", account_id, json={}
+        )
     else:
-        graph.request("DELETE", f"/me/events/{event_id}", account_id)
+        await graph.arequest("DELETE", f"/me/events/{event_id}", account_id)
     return {"status": "deleted"}
 
 
 @mcp.tool
-def respond_event(
+async def respond_event(
     account_id: str,
     event_id: str,
     response: str = "accept",
@@ -608,20 +824,22 @@ def respond_event(
     if message:
         payload["comment"] = message
 
-    graph.request("POST", f"/me/events/{event_id}/{response}", account_id, json=payload)
+    await graph.arequest(
+        "POST", f"/me/events/{event_id}/{response}", account_id, json=payload
+    )
     return {"status": response}
 
 
 @mcp.tool
-def check_availability(
+async def check_availability(
     account_id: str,
     start: str,
     end: str,
     attendees: str | list[str] | None = None,
 ) -> dict[str, Any]:
     """Check calendar availability for scheduling"""
-    me_info = graph.request("GET", "/me", account_id)
-    if not me_info or "mail" not in me_info:
+    me_info = await refcache.profile(account_id)
+    if "mail" not in me_info:
         raise ValueError("Failed to get user email address")
     schedules = [me_info["mail"]]
     if attendees:
@@ -635,35 +853,64 @@ def check_availability(
         "availabilityViewInterval": 30,
     }
 
-    result = graph.request("POST", "/me/calendar/getSchedule", account_id, json=payload)
+    result = await graph.arequest(
+        "POST", "/me/calendar/getSchedule", account_id, json=payload
+    )
     if not result:
         raise ValueError("Failed to check availability")
     return result
 
 
 @mcp.tool
-def list_contacts(account_id: str, limit: int = 50) -> list[dict[str, Any]]:
-    """List contacts"""
-    params = {"$top": min(limit, 100)}
+async def list_contacts(
+    account_id: str,
+    limit: int = 50,
+    cursor: str | None = None,
+    fields: list[str] | None = None,
+) -> dict[str, Any]:
+    """List contacts, one page per call
 
-    contacts = list(
-        graph.request_paginated("/me/contacts", account_id, params=params, limit=limit)
-    )
+    Pass next_cursor back as cursor for the next page. fields picks the
+    contact properties to return (e.g. ["displayName", "emailAddresses"]).
+    """
+    request = {"fields": fields}
+    state = await cursors.decode(cursor, "list_contacts", account_id, request)
+    if contactsync.CONTACT_SYNC and responses.is_flat(fields):
+        offset = state.get("offset", 0)
+        contacts = await contactsync.list_contacts(account_id, limit + 1, offset)
+        if fields:
+            contacts = responses.project(contacts, fields)
+        more = {"offset": offset + limit} if len(contacts) > limit else None
+        return await cursors.page(
+            contacts[:limit], "list_contacts", account_id, request, more
+        )
 
-    return contacts
+    params = {"$top": min(limit, graph.PAGE_SIZE_MAX), **responses.query_params(fields)}
+    contacts, next_link = await graph.arequest_page(
+        "/me/contacts", account_id, params, state.get("next_link")
+    )
+    more = {"next_link": next_link} if next_link else None
+    return await cursors.page(contacts, "list_contacts", account_id, request, more)
 
 
 @mcp.tool
-def get_contact(contact_id: str, account_id: str) -> dict[str, Any]:
-    """Get contact details"""
-    result = graph.request("GET", f"/me/contacts/{contact_id}", account_id)
+async def get_contact(
+    contact_id: str, account_id: str, fields: list[str] | None = None
+) -> dict[str, Any]:
+    """Get contact details, or only the properties named in fields"""
+    result = await graph.arequest(
+        "GET",
+        f"/me/contacts/{contact_id}",
+        account_id,
+        params=responses.query_params(fields),
+    )
     if not result:
         raise ValueError(f"Contact with ID {contact_id} not found")
-    return result
+    return responses.slim(result)
 
 
 @mcp.tool
-def create_contact(
+async def create_contact(
     account_id: str,
     given_name: str,
     surname: str | None = None,
@@ -693,50 +940,78 @@ def create_contact(
         if "mobile" in phone_numbers:
             contact["mobilePhone"] = phone_numbers["mobile"]
 
-    result = graph.request("POST", "/me/contacts", account_id, json=contact)
+    result = await graph.arequest("POST", "/me/contacts", account_id, json=contact)
+    contactsync.invalidate(account_id)
     if not result:
         raise ValueError("Failed to create contact")
     return result
 
 
 @mcp.tool
-def update_contact(
+async def update_contact(
     contact_id: str, updates: dict[str, Any], account_id: str
 ) -> dict[str, Any]:
     """Update contact information"""
-    result = graph.request(
+    result = await graph.arequest(
         "PATCH", f"/me/contacts/{contact_id}", account_id, json=updates
     )
+    contactsync.invalidate(account_id)
     return result or {"status": "updated"}
 
 
 @mcp.tool
-def delete_contact(contact_id: str, account_id: str) -> dict[str, str]:
+async def delete_contact(contact_id: str, account_id: str) -> dict[str, str]:
     """Delete a contact"""
-    graph.request("DELETE", f"/me/contacts/{contact_id}", account_id)
+    await graph.arequest("DELETE", f"/me/contacts/{contact_id}", account_id)
+    contactsync.invalidate(account_id)
     return {"status": "deleted"}
 
 
 @mcp.tool
-def list_files(
-    account_id: str, path: str = "/", limit: int = 50
-) -> list[dict[str, Any]]:
-    """List files and folders in OneDrive"""
+async def list_files(
+    account_id: str,
+    path: str = "/",
+    limit: int = 50,
+    cursor: str | None = None,
+    fields: list[str] | None = None,
+) -> dict[str, Any]:
+    """List files and folders in OneDrive, one page per call
+
+    Pass next_cursor back as cursor, with the same path, for the next page.
+    fields returns those driveItem properties instead of the summary. Listings
+    served from the local drive index carry no download_url; use get_file to
+    download.
+    """
+    request = {"path": path, "fields": fields}
+    state = await cursors.decode(cursor, "list_files", account_id, request)
+    if drivesync.DRIVE_SYNC and not fields:
+        offset = state.get("offset", 0)
+        items = await drivesync.list_folder(account_id, path, limit + 1, offset)
+        if items is not None:
+            more = {"offset": offset + limit} if len(items) > limit else None
+            return await cursors.page(
+                items[:limit], "list_files", account_id, request, more
+            )
+
     endpoint = (
         "/me/drive/root/children"
         if path == "/"
         else f"/me/drive/root:/{path}:/children"
     )
     params = {
-        "$top": min(limit, 100),
+        "$top": min(limit, graph.PAGE_SIZE_MAX),
         "$select": "id,name,size,lastModifiedDateTime,folder,file,@microsoft.graph.downloadUrl",
+        **responses.query_params(fields),
     }
 
-    items = list(
-        graph.request_paginated(endpoint, account_id, params=params, limit=limit)
+    items, next_link = await graph.arequest_page(
+        endpoint, account_id, params, state.get("next_link")
     )
+    more = {"next_link": next_link} if next_link else None
+    if fields:
+        return await cursors.page(items, "list_files", account_id, request, more)
 
-    return [
+    files = [
         {
             "id": item["id"],
             "name": item["name"],
@@ -747,14 +1022,17 @@ def list_files(
         }
         for item in items
     ]
+    return await cursors.page(files, "list_files", account_id, request, more)
 
 
 @mcp.tool
-def get_file(file_id: str, account_id: str, download_path: str) -> dict[str, Any]:
-    """Download a file from OneDrive to local path"""
-    import subprocess
+async def get_file(file_id: str, account_id: str, download_path: str) -> dict[str, Any]:
+    """Download a file from OneDrive to local path
 
-    metadata = graph.request("GET", f"/me/drive/items/{file_id}", account_id)
+    The file is streamed to disk, resuming after dropped connections, and
+    checked against the hash OneDrive reports before it is put in place.
+    """
+    metadata = await graph.arequest("GET", f"/me/drive/items/{file_id}", account_id)
     if not metadata:
         raise ValueError(f"File with ID {file_id} not found")
 
@@ -762,32 +1040,37 @@ def get_file(file_id: str, account_id: str, download_path: str) -> dict[str, Any
     if not download_url:
         raise ValueError("No download URL available for this file")
 
+    path = pl.Path(download_path).expanduser()
+    partial = path.with_name(path.name + ".part")
     try:
-        subprocess.run(
-            ["curl", "-L", "-o", download_path, download_url],
-            check=True,
-            capture_output=True,
+        segments = await graph.adownload_file(
+            download_url, partial, metadata.get("size"), account_id
         )
+        verified = await asyncio.to_thread(
+            hashes.verify, partial, metadata.get("file", {}).get("hashes") or {}
+        )
+        partial.replace(path)
+    finally:
+        partial.unlink(missing_ok=True)
 
-        return {
-            "path": download_path,
-            "name": metadata.get("name", "unknown"),
-            "size_mb": round(metadata.get("size", 0) / (1024 * 1024), 2),
-            "mime_type": metadata.get("file", {}).get("mimeType") if metadata else None,
-        }
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError(f"Failed to download file: {e.stderr.decode()}")
+    return {
+        "path": download_path,
+        "name": metadata.get("name", "unknown"),
+        "size_mb": round(metadata.get("size", 0) / (1024 * 1024), 2),
+        "mime_type": metadata.get("file", {}).get("mimeType"),
+        "segments": segments,
+        "verified": verified,
+    }
 
 
 @mcp.tool
-def create_file(
+async def create_file(
     onedrive_path: str, local_file_path: str, account_id: str
 ) -> dict[str, Any]:
     """Upload a local file to OneDrive"""
     path = pl.Path(local_file_path).expanduser().resolve()
-    data = path.read_bytes()
-    result = graph.upload_large_file(
-        f"/me/drive/root:/{onedrive_path}:", data, account_id
+    result = await graph.aupload_large_file(
+        f"/me/drive/root:/{onedrive_path}:", path, account_id
     )
     if not result:
         raise ValueError(f"Failed to create file at path: {onedrive_path}")
@@ -795,29 +1078,32 @@ def create_file(
 
 
 @mcp.tool
-def update_file(file_id: str, local_file_path: str, account_id: str) -> dict[str, Any]:
+async def update_file(
+    file_id: str, local_file_path: str, account_id: str
+) -> dict[str, Any]:
     """Update OneDrive file content from a local file"""
     path = pl.Path(local_file_path).expanduser().resolve()
-    data = path.read_bytes()
-    result = graph.upload_large_file(f"/me/drive/items/{file_id}", data, account_id)
+    result = await graph.aupload_large_file(
+        f"/me/drive/items/{file_id}", path, account_id
+    )
     if not result:
         raise ValueError(f"Failed to update file with ID: {file_id}")
     return result
 
 
 @mcp.tool
-def delete_file(file_id: str, account_id: str) -> dict[str, str]:
+async def delete_file(file_id: str, account_id: str) -> dict[str, str]:
     """Delete a file or folder"""
-    graph.request("DELETE", f"/me/drive/items/{file_id}", account_id)
+    await graph.arequest("DELETE", f"/me/drive/items/{file_id}", account_id)
     return {"status": "deleted"}
 
 
 @mcp.tool
-def get_attachment(
+async def get_attachment(
     email_id: str, attachment_id: str, save_path: str, account_id: str
 ) -> dict[str, Any]:
     """Download email attachment to a specified file path"""
-    result = graph.request(
+    result = await graph.arequest(
         "GET", f"/me/messages/{email_id}/attachments/{attachment_id}", account_id
     )
 
@@ -842,15 +1128,28 @@ def get_attachment(
 
 
 @mcp.tool
-def search_files(
+async def search_files(
     query: str,
     account_id: str,
     limit: int = 50,
-) -> list[dict[str, Any]]:
+    cursor: str | None = None,
+) -> dict[str, Any]:
     """Search for files in OneDrive using the modern search API."""
-    items = list(graph.search_query(query, ["driveItem"], account_id, limit))
+    request = {"query": query}
+    state = await cursors.decode(cursor, "search_files", account_id, request)
+    offset = state.get("offset", 0)
+    if drivesync.DRIVE_SYNC:
+        items = await drivesync.search(account_id, query, limit + 1, offset)
+        more = {"offset": offset + limit} if len(items) > limit else None
+        return await cursors.page(
+            items[:limit], "search_files", account_id, request, more
+        )
 
-    return [
+    items, has_more = await graph.asearch_page(
+        query, ["driveItem"], account_id, limit, offset
+    )
+
+    files = [
         {
             "id": item["id"],
             "name": item["name"],
@@ -861,44 +1160,101 @@ def search_files(
         }
         for item in items
     ]
+    more = {"offset": offset + len(items)} if has_more and items else None
+    return await cursors.page(files, "search_files", account_id, request, more)
 
 
 @mcp.tool
-def search_emails(
+async def search_emails(
     query: str,
     account_id: str,
     limit: int = 50,
     folder: str | None = None,
-) -> list[dict[str, Any]]:
+    days_back: int | None = None,
+    cursor: str | None = None,
+) -> dict[str, Any]:
     """Search emails using the modern search API."""
+    request = {"query": query, "folder": folder, "days_back": days_back}
+    state = await cursors.decode(cursor, "search_emails", account_id, request)
+    offset = state.get("offset", 0)
+    since = (
+        dt.datetime.now(dt.timezone.utc) - dt.timedelta(days=days_back)
+        if days_back is not None
+        else None
+    )
+    if mailsync.MAIL_SEARCH:
+        emails = await mailsync.search_messages(
+            account_id, query, folder, since, limit + 1, offset
+        )
+        more = {"offset": offset + limit} if len(emails) > limit else None
+        return await cursors.page(
+            emails[:limit], "search_emails", account_id, request, more
+        )
+
     if folder:
         # For folder-specific search, use the traditional endpoint
-        folder_path = FOLDERS.get(folder.casefold(), folder)
+        folder_path = await mailfolders.resolve(folder, account_id)
         endpoint = f"/me/mailFolders/{folder_path}/messages"
 
         params = {
             "$search": f'"{query}"',
-            "$top": min(limit, 100),
-            "$select": "id,subject,from,toRecipients,receivedDateTime,hasAttachments,body,conversationId,isRead",
+            "$top": min(limit, graph.PAGE_SIZE_MAX),
+            "$select": (
+                "id,subject,from,toRecipients,receivedDateTime,hasAttachments,"
+                "uniqueBody,conversationId,isRead"
+            ),
         }
 
-        return list(
-            graph.request_paginated(endpoint, account_id, params=params, limit=limit)
+        emails, next_link = await graph.arequest_page(
+            endpoint, account_id, params, state.get("next_link")
         )
+        more = {"next_link": next_link} if next_link else None
+    else:
+        emails, has_more = await graph.asearch_page(
+            query, ["message"], account_id, limit, offset
+        )
+        more = {"offset": offset + len(emails)} if has_more and emails else None
 
-    return list(graph.search_query(query, ["message"], account_id, limit))
+    # $search cannot be combined with $filter, so the date window applies here
+    if since:
+        cutoff = f"{since:%Y-%m-%dT%H:%M:%SZ}"
+        emails = [e for e in emails if e.get("receivedDateTime", "") >= cutoff]
+    emails = list(bodies.trim(emails))
+    return await cursors.page(emails, "search_emails", account_id, request, more)
 
 
 @mcp.tool
-def search_events(
+async def search_events(
     query: str,
     account_id: str,
     days_ahead: int = 365,
     days_back: int = 365,
     limit: int = 50,
-) -> list[dict[str, Any]]:
+    cursor: str | None = None,
+) -> dict[str, Any]:
     """Search calendar events using the modern search API."""
-    events = list(graph.search_query(query, ["event"], account_id, limit))
+    request = {"query": query, "days_ahead": days_ahead, "days_back": days_back}
+    state = await cursors.decode(cursor, "search_events", account_id, request)
+    offset = state.get("offset", 0)
+    if calsync.CALENDAR_SYNC:
+        now = dt.datetime.now(dt.timezone.utc)
+        events = await calsync.search_events(
+            account_id,
+            query,
+            now - dt.timedelta(days=days_back),
+            now + dt.timedelta(days=days_ahead),
+            limit + 1,
+            offset,
+        )
+        more = {"offset": offset + limit} if len(events) > limit else None
+        return await cursors.page(
+            events[:limit], "search_events", account_id, request, more
+        )
+
+    events, has_more = await graph.asearch_page(
+        query, ["event"], account_id, limit, offset
+    )
+    more = {"offset": offset + len(events)} if has_more and events else None
 
     # Filter by date range if needed
     if days_ahead != 365 or days_back != 365:
@@ -918,48 +1274,68 @@ def search_events(
             if event_start <= end and event_end >= start:
                 filtered_events.append(event)
 
-        return filtered_events
+        events = filtered_events
 
-    return events
+    return await cursors.page(events, "search_events", account_id, request, more)
 
 
 @mcp.tool
-def search_contacts(
+async def search_contacts(
     query: str,
     account_id: str,
     limit: int = 50,
-) -> list[dict[str, Any]]:
+    cursor: str | None = None,
+) -> dict[str, Any]:
     """Search contacts. Uses traditional search since unified_search doesn't support contacts."""
+    request = {"query": query}
+    state = await cursors.decode(cursor, "search_contacts", account_id, request)
+    if contactsync.CONTACT_SYNC:
+        offset = state.get("offset", 0)
+        contacts = await contactsync.search(account_id, query, limit + 1, offset)
+        more = {"offset": offset + limit} if len(contacts) > limit else None
+        return await cursors.page(
+            contacts[:limit], "search_contacts", account_id, request, more
+        )
+
     params = {
         "$search": f'"{query}"',
-        "$top": min(limit, 100),
+        "$top": min(limit, graph.PAGE_SIZE_MAX),
     }
 
-    contacts = list(
-        graph.request_paginated("/me/contacts", account_id, params=params, limit=limit)
+    contacts, next_link = await graph.arequest_page(
+        "/me/contacts", account_id, params, state.get("next_link")
     )
-
-    return contacts
+    more = {"next_link": next_link} if next_link else None
+    return await cursors.page(contacts, "search_contacts", account_id, request, more)
 
 
 @mcp.tool
-def unified_search(
+async def unified_search(
     query: str,
     account_id: str,
     entity_types: list[str] | None = None,
     limit: int = 50,
-) -> dict[str, list[dict[str, Any]]]:
+    cursor: str | None = None,
+) -> dict[str, Any]:
     """Search across multiple Microsoft 365 resources using the modern search API
 
     entity_types can include: 'message', 'event', 'drive', 'driveItem', 'list', 'listItem', 'site'
     If not specified, searches across all available types.
+    Results are grouped by type under "items"; pass next_cursor back as
+    cursor, with the same arguments, for the next page.
     """
     if not entity_types:
         entity_types = ["message", "event", "driveItem"]
 
+    request = {"query": query, "entity_types": entity_types}
+    state = await cursors.decode(cursor, "unified_search", account_id, request)
+    offset = state.get("offset", 0)
+
     results = {entity_type: [] for entity_type in entity_types}
 
-    items = list(graph.search_query(query, entity_types, account_id, limit))
+    items, has_more = await graph.asearch_page(
+        query, entity_types, account_id, limit, offset
+    )
 
     for item in items:
         resource_type = item.get("@odata.type", "").split(".")[-1]
@@ -973,4 +1349,6 @@ def unified_search(
         else:
             results.setdefault("other", []).append(item)
 
-    return {k: v for k, v in results.items() if v}
+    more = {"offset": offset + len(items)} if has_more and items else None
+    grouped = {k: v for k, v in results.items() if v}
+    return await cursors.page(grouped, "unified_search", account_id, request, more)
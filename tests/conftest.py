@@ -0,0 +1,60 @@
+import httpx
+import pytest
+from microsoft_graph_mcp import (
+    contactsync,
+    graph,
+    mailfolders,
+    mailsync,
+    ratelimit,
+    refcache,
+    retry,
+)
+
+
+class StubGraph:
+    """Local stand-in for graph.microsoft.com driven by a route table"""
+
+    def __init__(self):
+        self.routes = {}
+        self.requests: list[httpx.Request] = []
+
+    def route(self, method, path, *responses):
+        self.routes[(method, path)] = list(responses)
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        path = request.url.path.removeprefix("/v1.0")
+        responses = self.routes.get((request.method, path))
+        if not responses:
+            return httpx.Response(404, json={"error": {"code": "NotFound"}})
+        response = responses.pop(0) if len(responses) > 1 else responses[0]
+        return response(request) if callable(response) else response
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    stub = StubGraph()
+    transport = httpx.MockTransport(stub.handler)
+    client = httpx.Client(transport=transport)
+    async_client = httpx.AsyncClient(transport=transport)
+    for name in ("_client", "_upload_client", "_download_client"):
+        monkeypatch.setattr(graph, name, client)
+    monkeypatch.setattr(
+        graph, "_async_clients", dict.fromkeys(graph.POOLS, async_client)
+    )
+    monkeypatch.setattr(graph, "get_token", lambda account_id=None: "token")
+    tokens = iter(f"token-{i}" for i in range(100))
+
+    async def aget_token(account_id=None):
+        return next(tokens)
+
+    monkeypatch.setattr(graph, "aget_token", aget_token)
+    monkeypatch.setattr(graph, "invalidate_token", lambda account_id=None: None)
+    monkeypatch.setattr(ratelimit, "_limiters", {})
+    monkeypatch.setattr(refcache, "_entries", {})
+    monkeypatch.setattr(mailfolders, "_indexes", {})
+    monkeypatch.setattr(contactsync, "_indexes", {})
+    monkeypatch.setattr(mailsync, "_mailbox_synced", {})
+    monkeypatch.setattr(retry, "_breakers", {})
+    monkeypatch.setattr(retry, "_budget", retry.RetryBudget())
+    return stub
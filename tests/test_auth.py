@@ -0,0 +1,390 @@
+import base64
+import functools
+import http.server
+import json
+import threading
+import time
+import urllib.parse
+import httpx
+import msal
+import pytest
+from microsoft_graph_mcp import auth, token_store
+
+
+class FakeApp:
+    """Stand-in for msal.PublicClientApplication with an in-memory token endpoint"""
+
+    def __init__(self, accounts=None, expires_in=3600):
+        self.accounts = accounts or [
+            {"username": "alice@example.com", "home_account_id": "alice-id"}
+        ]
+        self.expires_in = expires_in
+        self.token_cache = None
+        self.calls = []
+        self.fail = False
+
+    def get_accounts(self):
+        return list(self.accounts)
+
+    def acquire_token_silent(self, scopes, account=None, force_refresh=False):
+        self.calls.append((account["home_account_id"], force_refresh))
+        if self.fail:
+            return {"error": "temporarily_unavailable", "error_description": "down"}
+        return {
+            "access_token": f"token-{len(self.calls)}",
+            "expires_in": self.expires_in,
+        }
+
+
+@pytest.fixture
+def app(monkeypatch):
+    fake = FakeApp()
+    monkeypatch.setattr(auth, "get_app", lambda: fake)
+    monkeypatch.setattr(auth, "_tokens", {})
+    monkeypatch.setattr(auth, "_stale_tokens", set())
+    monkeypatch.setattr(auth, "_token_aliases", {})
+    return fake
+
+
+def test_get_token_memoizes_until_skew(app, monkeypatch):
+    assert auth.get_token("alice-id") == "token-1"
+    assert auth.get_token("alice-id") == "token-1"
+    assert len(app.calls) == 1
+
+    now = auth.time.monotonic()
+    monkeypatch.setattr(auth.time, "monotonic", lambda: now + 3600 - 10)
+    assert auth.get_token("alice-id") == "token-2"
+    assert len(app.calls) == 2
+
+
+def test_short_lived_tokens_are_not_memoized(app):
+    app.expires_in = auth.TOKEN_EXPIRY_SKEW
+    auth.get_token("alice-id")
+    auth.get_token("alice-id")
+    assert len(app.calls) == 2
+
+
+def test_invalidate_token_forces_refresh(app):
+    auth.get_token("alice-id")
+    auth.invalidate_token("alice-id")
+    assert auth.get_token("alice-id") == "token-2"
+    assert app.calls == [("alice-id", False), ("alice-id", True)]
+
+    auth.get_token("alice-id")
+    assert len(app.calls) == 2
+
+
+def test_get_token_accepts_email_address(app):
+    assert auth.get_token("Alice@Example.com") == "token-1"
+    assert app.calls == [("alice-id", False)]
+    # Id and email share one memoized token
+    assert auth.get_token("alice-id") == "token-1"
+    assert auth.get_token("alice@example.com") == "token-1"
+    assert len(app.calls) == 1
+
+
+def test_account_index_rebuilds_only_on_cache_change(monkeypatch):
+    cache = auth._TokenCache()
+    app = FakeApp()
+    app.token_cache = cache
+    lookups = []
+    get_accounts = app.get_accounts
+    monkeypatch.setattr(
+        app, "get_accounts", lambda: lookups.append(1) or get_accounts()
+    )
+
+    index = auth._account_index(app)
+    assert auth._account_index(app) is index
+    assert index.find("ALICE@example.com") is index.find("alice-id")
+    assert index.find(None)["home_account_id"] == "alice-id"
+    assert index.find("nobody@example.com") is None
+    assert len(lookups) == 1
+
+    cache.replace({})
+    assert auth._account_index(app) is not index
+    assert len(lookups) == 2
+
+
+@pytest.fixture
+def two_accounts(app, monkeypatch):
+    app.accounts.append({"username": "bob@example.com", "home_account_id": "bob-id"})
+    monkeypatch.setattr(
+        auth,
+        "list_accounts",
+        lambda: [
+            auth.Account(a["username"], a["home_account_id"]) for a in app.accounts
+        ],
+    )
+    return app
+
+
+def test_refresher_seeds_and_renews_tokens(two_accounts, monkeypatch):
+    refresher = auth.TokenRefresher(jitter=0)
+    refresher.run_once()
+    assert sorted(two_accounts.calls) == [("alice-id", False), ("bob-id", False)]
+    assert auth.get_token("alice-id").startswith("token-")
+    assert len(two_accounts.calls) == 2
+
+    # Nothing is due yet
+    refresher.run_once()
+    assert len(two_accounts.calls) == 2
+
+    now = auth.time.monotonic()
+    due = 3600 - auth.TOKEN_EXPIRY_SKEW - refresher.lead
+    monkeypatch.setattr(auth.time, "monotonic", lambda: now + due + 1)
+    refresher.run_once()
+    assert sorted(two_accounts.calls[2:]) == [("alice-id", True), ("bob-id", True)]
+    assert refresher.metrics.snapshot()["refreshes"] == 4
+
+
+def test_refresher_jitter_spreads_due_times(two_accounts):
+    refresher = auth.TokenRefresher(jitter=600)
+    refresher.run_once()
+    base = auth.time.monotonic() + 3600 - auth.TOKEN_EXPIRY_SKEW - refresher.lead
+    for due in refresher._due.values():
+        assert base - 600 - 1 <= due <= base + 1
+    assert refresher._due["alice-id"] != refresher._due["bob-id"]
+
+
+def test_refresher_records_failures_and_backs_off(two_accounts):
+    two_accounts.fail = True
+    refresher = auth.TokenRefresher(jitter=0)
+    refresher.run_once()
+
+    metrics = refresher.metrics.snapshot()
+    assert metrics["failures"] == 2
+    assert metrics["refreshes"] == 0
+    assert "down" in metrics["last_error"]
+    assert auth._tokens == {}
+    assert 0 < refresher.next_wakeup() <= refresher.failure_backoff
+
+
+def test_refresher_forgets_removed_accounts(two_accounts):
+    refresher = auth.TokenRefresher(jitter=0)
+    refresher.run_once()
+    two_accounts.accounts.pop()
+    refresher.run_once()
+    assert list(refresher._due) == ["alice-id"]
+
+
+def test_refresher_thread_stops():
+    refresher = auth.TokenRefresher()
+    refresher.poll_interval = 0.01
+    refresher.run_once = lambda: None
+    refresher.start()
+    refresher.stop()
+    assert refresher._thread is None
+
+
+def test_aliases_survive_token_writes_for_other_accounts(two_accounts):
+    cache = auth._TokenCache()
+    two_accounts.token_cache = cache
+    acquire = two_accounts.acquire_token_silent
+
+    def acquire_and_write(*args, **kwargs):
+        # MSAL writes the new tokens to the cache, bumping its generation
+        cache.generation += 1
+        return acquire(*args, **kwargs)
+
+    two_accounts.acquire_token_silent = acquire_and_write
+
+    auth.get_token("alice@example.com")
+    auth.get_token("bob@example.com")
+    assert auth.account_key("alice@example.com") == "alice-id"
+    assert auth.account_key("bob@example.com") == "bob-id"
+
+    # Signing bob out drops only the alias pointing at him
+    two_accounts.accounts.pop()
+    cache.generation += 1
+    auth._account_index(two_accounts)
+    assert auth.account_key("alice@example.com") == "alice-id"
+    assert auth.account_key("bob@example.com") == "bob@example.com"
+
+
+def _b64(claims):
+    return base64.urlsafe_b64encode(json.dumps(claims).encode()).decode().rstrip("=")
+
+
+class LoginHandler(http.server.BaseHTTPRequestHandler):
+    """Local stand-in for login.microsoftonline.com: discovery and a token endpoint"""
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, body):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self.server.discoveries += 1
+        base = "https://login.microsoftonline.com/common"
+        self._reply(
+            {
+                "authorization_endpoint": f"{base}/oauth2/v2.0/authorize",
+                "token_endpoint": f"{base}/oauth2/v2.0/token",
+                "device_authorization_endpoint": f"{base}/oauth2/v2.0/devicecode",
+                "issuer": "https://login.microsoftonline.com/{tenantid}/v2.0",
+            }
+        )
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        form = urllib.parse.parse_qs(self.rfile.read(length).decode())
+        grants = self.server.grants
+        grants.append(form["refresh_token"][0])
+        now = int(time.time())
+        claims = {
+            "iss": "https://login.microsoftonline.com/tenant-id/v2.0",
+            "aud": form["client_id"][0],
+            "iat": now,
+            "exp": now + 3600,
+            "oid": "alice-oid",
+            "tid": "tenant-id",
+            "sub": "alice-sub",
+            "preferred_username": "alice@example.com",
+        }
+        self._reply(
+            {
+                "token_type": "Bearer",
+                "scope": " ".join(auth.SCOPES),
+                "access_token": f"at-{len(grants)}",
+                "refresh_token": f"rt-{len(grants)}",
+                "expires_in": 3600,
+                "id_token": f"{_b64({'alg': 'none'})}.{_b64(claims)}.",
+                "client_info": _b64({"uid": "alice-oid", "utid": "tenant-id"}),
+            }
+        )
+
+
+class LocalLogin(httpx.Client):
+    """HTTP client for MSAL that sends login.microsoftonline.com to the local server"""
+
+    def __init__(self, port):
+        super().__init__()
+        self.base = f"http://127.0.0.1:{port}"
+
+    def request(self, method, url, **kwargs):
+        url = str(url).replace("https://login.microsoftonline.com", self.base)
+        return super().request(method, url, **kwargs)
+
+
+@pytest.fixture
+def login(monkeypatch, tmp_path):
+    """Real MSAL apps from get_app(), talking to a local token endpoint"""
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), LoginHandler)
+    server.grants = []
+    server.discoveries = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    client = LocalLogin(server.server_address[1])
+    monkeypatch.setattr(
+        msal,
+        "PublicClientApplication",
+        functools.partial(msal.PublicClientApplication, http_client=client),
+    )
+    monkeypatch.setenv("MICROSOFT_MCP_CLIENT_ID", "client-id")
+    monkeypatch.setattr(auth, "CACHE_FILE", tmp_path / "cache.json")
+    monkeypatch.setattr(auth, "TOKEN_STORE", "file")
+    monkeypatch.setattr(auth, "_apps", {})
+    monkeypatch.setattr(auth, "_tokens", {})
+    monkeypatch.setattr(auth, "_stale_tokens", set())
+    monkeypatch.setattr(auth, "_token_aliases", {})
+
+    # Sign alice in by redeeming a refresh token, as if after a device flow
+    app = auth.get_app()
+    result = app.acquire_token_by_refresh_token("rt-0", auth.SCOPES)
+    assert "error" not in result, result
+    auth._save_cache(app)
+    yield server
+    server.shutdown()
+    client.close()
+
+
+def test_refresher_renews_through_the_token_endpoint(login):
+    [account] = auth.list_accounts()
+    assert account.username == "alice@example.com"
+
+    refresher = auth.TokenRefresher(jitter=0)
+    refresher.run_once()
+    # The first pass serves the token MSAL already has
+    assert login.grants == ["rt-0"]
+    assert auth.peek_token(account.account_id) == "at-1"
+
+    refresher.refresh(account.account_id)
+    # A forced refresh redeems the rotated refresh token and persists its successor
+    assert login.grants == ["rt-0", "rt-1"]
+    assert auth.peek_token(account.account_id) == "at-2"
+    assert refresher.metrics.snapshot()["refreshes"] == 2
+    assert "rt-2" in auth.CACHE_FILE.read_text()
+
+
+def test_invalidated_token_is_refreshed_through_the_token_endpoint(login):
+    assert auth.get_token("alice@example.com") == "at-1"
+    assert login.grants == ["rt-0"]
+
+    auth.invalidate_token("alice@example.com")
+    assert auth.get_token("alice@example.com") == "at-2"
+    assert login.grants == ["rt-0", "rt-1"]
+
+
+def test_get_app_reuses_one_app_and_cache_per_client_and_tenant(login, monkeypatch):
+    loads = []
+    load = token_store.FileTokenStore.load
+    monkeypatch.setattr(
+        token_store.FileTokenStore, "load", lambda self: loads.append(1) or load(self)
+    )
+    app = auth.get_app()
+    discoveries = login.discoveries
+
+    for _ in range(3):
+        assert auth.get_app() is app
+        assert auth.get_token("alice@example.com") == "at-1"
+    # No tenant discovery, token requests or cache reads after the first build
+    assert login.discoveries == discoveries
+    assert login.grants == ["rt-0"]
+    assert loads == []
+
+    # Another process writing the cache is picked up on the next call
+    token_store.FileTokenStore(auth.CACHE_FILE).save(
+        {"AppMetadata": {"other": {"client_id": "other-client"}}}, {}
+    )
+    loads.clear()
+    assert auth.get_app() is app
+    assert len(loads) == 1
+    assert "other" in app.token_cache.state()["AppMetadata"]
+
+    monkeypatch.setenv("MICROSOFT_MCP_TENANT_ID", "contoso")
+    assert auth.get_app() is not app
+    assert login.discoveries > discoveries
+
+
+def test_reload_keeps_tokens_written_but_not_yet_saved(login):
+    app = auth.get_app()
+    [account] = app.get_accounts()
+    # A thread rotates the refresh token but has not saved the cache yet...
+    result = app.acquire_token_silent(auth.SCOPES, account=account, force_refresh=True)
+    assert result["access_token"] == "at-2"
+    # ...when another process writes the store and this one reloads it
+    token_store.FileTokenStore(auth.CACHE_FILE).save(
+        {"AppMetadata": {"other": {"client_id": "other-client"}}}, {}
+    )
+    assert auth.get_app() is app
+
+    state = app.token_cache.state()
+    assert [t["secret"] for t in state["RefreshToken"].values()] == ["rt-2"]
+    assert "other" in state["AppMetadata"]
+
+    auth._save_cache(app)
+    saved = json.loads(auth.CACHE_FILE.read_text())
+    assert [t["secret"] for t in saved["RefreshToken"].values()] == ["rt-2"]
+    assert "other" in saved["AppMetadata"]
+
+
+def test_get_token_does_not_start_the_refresher(app, monkeypatch):
+    monkeypatch.setattr(auth, "_refresher", None)
+    auth.get_token("alice-id")
+    assert auth._refresher is None
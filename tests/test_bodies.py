@@ -0,0 +1,62 @@
+from microsoft_graph_mcp import bodies
+
+
+def test_html_to_text_keeps_block_structure():
+    html = (
+        "<html><head><style>p { color: red }</style></head><body>"
+        "<p>Hi&nbsp;Ada,</p><div>The  report is <b>ready</b>.<br>Thanks</div>"
+        "<!-- tracking --><script>track()</script></body></html>"
+    )
+    assert bodies.html_to_text(html) == "Hi Ada,\n\nThe report is ready.\nThanks"
+
+
+def test_strip_quoted_drops_history_and_signature():
+    reply = (
+        "Sounds good, see you then.\n"
+        "\n"
+        "-- \n"
+        "Ada Lovelace\n"
+        "\n"
+        "On Mon, 3 Mar 2025 at 10:00, Bob <bob@example.com> wrote:\n"
+        "> Lunch at noon?\n"
+    )
+    assert bodies.strip_quoted(reply) == "Sounds good, see you then."
+    outlook = (
+        "Approved.\n"
+        "\n"
+        "From: Bob <bob@example.com>\n"
+        "Sent: Monday, March 3, 2025 10:00 AM\n"
+        "Subject: Budget\n"
+        "\n"
+        "Please approve."
+    )
+    assert bodies.strip_quoted(outlook) == "Approved."
+    # Nothing of the message's own would be left, so keep it whole
+    assert bodies.strip_quoted("> only a quote") == "> only a quote"
+
+
+def test_trim_applies_per_message_and_total_budgets():
+    messages = [
+        {"id": "m1", "body": {"contentType": "text", "content": "a" * 30}},
+        {
+            "id": "m2",
+            "body": {"contentType": "html", "content": "<p>full</p>"},
+            "uniqueBody": {"contentType": "text", "content": "b" * 10},
+        },
+        {"id": "m3", "body": {"contentType": "text", "content": "c" * 10}},
+        {"id": "m4", "subject": "no body selected"},
+    ]
+    trimmed = list(bodies.trim(messages, max_chars=20, total_chars=25))
+
+    assert trimmed[0]["body"]["content"].startswith("a" * 20 + "\n\n[Content truncated")
+    assert trimmed[0]["body"]["total_length"] == 30
+    # uniqueBody stands in for body, within what is left of the total
+    assert trimmed[1]["body"] == {
+        "contentType": "text",
+        "content": "b" * 5 + "\n\n[Content truncated - 10 total characters]",
+        "truncated": True,
+        "total_length": 10,
+    }
+    assert "uniqueBody" not in trimmed[1]
+    assert trimmed[2]["body"]["content"].startswith("\n\n[Content truncated")
+    assert trimmed[3] == {"id": "m4", "subject": "no body selected"}
@@ -0,0 +1,157 @@
+import asyncio
+import datetime as dt
+import httpx
+import pytest
+from microsoft_graph_mcp import calsync, graph, syncstore, tools
+
+
+def call(tool, **kwargs):
+    return asyncio.run(getattr(tool, "fn", tool)(**kwargs))
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    store = syncstore.SyncStore(tmp_path / "sync.db")
+    monkeypatch.setattr(syncstore, "_store", store)
+    monkeypatch.setattr(calsync, "CALENDAR_SYNC", True)
+    return store
+
+
+NOW = dt.datetime.now(dt.timezone.utc).replace(microsecond=0)
+
+
+def event(id, days, hours=1, **fields):
+    start = NOW + dt.timedelta(days=days)
+    end = start + dt.timedelta(hours=hours)
+    return {
+        "id": id,
+        "subject": f"event {id}",
+        "start": {"dateTime": f"{start:%Y-%m-%dT%H:%M:%S}.0000000", "timeZone": "UTC"},
+        "end": {"dateTime": f"{end:%Y-%m-%dT%H:%M:%S}.0000000", "timeZone": "UTC"},
+        **fields,
+    }
+
+
+def delta(items, token):
+    return httpx.Response(
+        200,
+        json={
+            "value": items,
+            "@odata.deltaLink": f"{graph.BASE_URL}/me/calendarView/delta?token={token}",
+        },
+    )
+
+
+def ids(events):
+    return [e["id"] for e in events]
+
+
+def test_list_events_reads_the_interval_index(stub, store):
+    stub.route(
+        "GET",
+        "/me/calendarView/delta",
+        delta(
+            [
+                event("past", -3),
+                event("soon", 1),
+                event("long", -2, hours=24 * 5),
+                event("later", 20),
+            ],
+            1,
+        ),
+        delta(
+            [
+                event("soon", 2, subject="moved"),
+                {"id": "later", "@removed": {"reason": "deleted"}},
+                event("new", 5),
+            ],
+            2,
+        ),
+    )
+
+    week = call(tools.list_events, account_id="alice", days_ahead=7)["items"]
+    assert ids(week) == ["long", "soon"]
+
+    month = call(
+        tools.list_events, account_id="alice", days_ahead=30, days_back=5
+    )["items"]
+    assert ids(month) == ["past", "long", "soon", "new"]
+    assert month[2]["subject"] == "moved"
+
+    params = [dict(r.url.params) for r in stub.requests]
+    assert "startDateTime" in params[0]
+    assert params[1:] == [{"token": "1"}]
+
+
+def test_query_outside_the_window_widens_it(stub, store, monkeypatch):
+    monkeypatch.setattr(calsync, "CALENDAR_SYNC_DAYS_BACK", 1)
+    stub.route("GET", "/me/calendarView/delta", delta([event("a", 0)], 1))
+
+    call(tools.list_events, account_id="alice", days_ahead=1)
+    call(tools.list_events, account_id="alice", days_ahead=1, days_back=10)
+
+    first, second = (r.url.params for r in stub.requests)
+    assert "startDateTime" in second
+    assert second["startDateTime"] < first["startDateTime"]
+
+
+def test_expired_token_resyncs_the_same_window(stub, store):
+    stub.route(
+        "GET",
+        "/me/calendarView/delta",
+        delta([event("a", 1)], 1),
+        httpx.Response(410),
+        delta([event("b", 1)], 2),
+    )
+    call(tools.list_events, account_id="alice")
+    assert ids(call(tools.list_events, account_id="alice")["items"]) == ["b"]
+    assert stub.requests[0].url.params == stub.requests[2].url.params
+
+
+def test_search_events_matches_text_in_the_date_range(stub, store):
+    stub.route(
+        "GET",
+        "/me/calendarView/delta",
+        delta(
+            [
+                event("a", 1, location={"displayName": "Board Room"}),
+                event(
+                    "b",
+                    2,
+                    attendees=[
+                        {"emailAddress": {"name": "Ada", "address": "ada@x.com"}}
+                    ],
+                ),
+                event("c", 40, location={"displayName": "board room"}),
+            ],
+            1,
+        ),
+    )
+    found = call(
+        tools.search_events,
+        query="board",
+        account_id="alice",
+        days_ahead=10,
+        days_back=1,
+    )["items"]
+    assert ids(found) == ["a"]
+    found = call(tools.search_events, query="ada@x.com", account_id="alice")["items"]
+    assert ids(found) == ["b"]
+
+
+def test_later_queries_with_a_moving_end_reuse_the_window(stub, store):
+    stub.route(
+        "GET",
+        "/me/calendarView/delta",
+        delta([event("a", 1)], 1),
+        delta([], 2),
+    )
+    year = dt.timedelta(days=365)
+    asyncio.run(calsync.sync("alice", NOW - year, NOW + year))
+    # The same "next 365 days" query a few seconds later
+    later = NOW + dt.timedelta(seconds=5)
+    asyncio.run(calsync.sync("alice", later - year, later + year))
+
+    first, second = (r.url.params for r in stub.requests)
+    assert "startDateTime" in first
+    assert dict(second) == {"token": "1"}
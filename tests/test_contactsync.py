@@ -0,0 +1,134 @@
+import asyncio
+import httpx
+import json
+import pytest
+from microsoft_graph_mcp import contactsync, graph, syncstore, tools
+
+
+def call(tool, **kwargs):
+    return asyncio.run(getattr(tool, "fn", tool)(**kwargs))
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    store = syncstore.SyncStore(tmp_path / "sync.db")
+    monkeypatch.setattr(syncstore, "_store", store)
+    monkeypatch.setattr(contactsync, "CONTACT_SYNC", True)
+    return store
+
+
+def contact(id, given, surname, address, company=None):
+    return {
+        "id": id,
+        "displayName": f"{given} {surname}",
+        "givenName": given,
+        "surname": surname,
+        "companyName": company,
+        "emailAddresses": [{"name": f"{given} {surname}", "address": address}],
+    }
+
+
+def delta(items, token):
+    link = f"{graph.BASE_URL}/me/contacts/delta?token={token}"
+    return httpx.Response(200, json={"value": items, "@odata.deltaLink": link})
+
+
+CONTACTS = [
+    contact("1", "Ada", "Lovelace", "ada@example.com", "Analytical Engines"),
+    contact("2", "Alan", "Turing", "alan@example.com"),
+    contact("3", "Grace", "Hopper", "grace@navy.example", "US Navy"),
+    contact("4", "Alan", "Kay", "kay@example.com"),
+]
+
+
+def test_search_matches_prefixes_and_typos_locally(stub, store):
+    stub.route("GET", "/me/contacts/delta", delta(CONTACTS, 1))
+
+    found = call(tools.search_contacts, query="al", account_id="alice")["items"]
+    assert [c["id"] for c in found] == ["4", "2"]
+    found = call(tools.search_contacts, query="alan tur", account_id="alice")["items"]
+    assert [c["id"] for c in found] == ["2"]
+    found = call(tools.search_contacts, query="navy", account_id="alice")["items"]
+    assert [c["id"] for c in found] == ["3"]
+    found = call(tools.search_contacts, query="Lovelase", account_id="alice")["items"]
+    assert [c["id"] for c in found] == ["1"]
+    listed = call(tools.list_contacts, account_id="alice", limit=2)
+    assert [c["id"] for c in listed["items"]] == ["1", "4"]
+    rest = call(
+        tools.list_contacts,
+        account_id="alice",
+        limit=2,
+        cursor=listed["next_cursor"],
+    )
+    assert [c["id"] for c in rest["items"]] == ["2", "3"]
+    assert rest["next_cursor"] is None
+    # Everything after the first sync is answered from memory
+    assert len(stub.requests) == 1
+
+
+def test_delta_changes_and_restart_from_store(stub, store, monkeypatch):
+    stub.route("GET", "/me/contacts/delta", delta(CONTACTS, 1))
+    call(tools.search_contacts, query="grace", account_id="alice")
+
+    contactsync.invalidate("alice")
+    renamed = {**CONTACTS[1], "displayName": "Alan M. Turing"}
+    stub.route(
+        "GET",
+        "/me/contacts/delta",
+        delta([renamed, {"id": "3", "@removed": {"reason": "deleted"}}], 2),
+    )
+    assert call(tools.search_contacts, query="grace", account_id="alice")["items"] == []
+    assert stub.requests[-1].url.params["token"] == "1"
+
+    # A new process loads the stored contacts and only asks for changes
+    monkeypatch.setattr(contactsync, "_indexes", {})
+    stub.route("GET", "/me/contacts/delta", delta([], 3))
+    found = call(tools.search_contacts, query="m turing", account_id="alice")["items"]
+    assert [c["displayName"] for c in found] == ["Alan M. Turing"]
+    assert stub.requests[-1].url.params["token"] == "2"
+    rows = store.query("SELECT data FROM contacts ORDER BY id")
+    assert [json.loads(d)["id"] for (d,) in rows] == ["1", "2", "4"]
+
+
+def test_recipient_names_resolve_to_addresses(stub, store):
+    stub.route("GET", "/me/contacts/delta", delta(CONTACTS, 1))
+    stub.route("POST", "/me/sendMail", httpx.Response(202))
+
+    call(
+        tools.send_email,
+        account_id="alice",
+        to=["Grace Hopper", "bob@example.com"],
+        cc="ada lovelace",
+        subject="Hi",
+        body="Hello",
+    )
+    message = json.loads(stub.requests[-1].content)["message"]
+    assert [r["emailAddress"]["address"] for r in message["toRecipients"]] == [
+        "grace@navy.example",
+        "bob@example.com",
+    ]
+    assert message["ccRecipients"][0]["emailAddress"]["address"] == "ada@example.com"
+
+    with pytest.raises(ValueError, match="No contact"):
+        call(tools.send_email, account_id="alice", to="Nobody", subject="s", body="b")
+
+
+def test_recipient_names_must_be_exact_and_unique(stub, store):
+    twin = contact("5", "Grace", "Hopper", "grace@example.com")
+    stub.route("GET", "/me/contacts/delta", delta(CONTACTS + [twin], 1))
+
+    async def resolve(name):
+        return await contactsync.resolve_recipients("alice", [name])
+
+    # Two contacts share the name
+    with pytest.raises(ValueError, match="several contacts.*grace@example.com"):
+        asyncio.run(resolve("Grace Hopper"))
+    # Prefix matches, even a unique one, are never picked on their own
+    with pytest.raises(ValueError, match="did you mean: Alan Kay.*Alan Turing"):
+        asyncio.run(resolve("Alan"))
+    with pytest.raises(ValueError, match="did you mean: Ada Lovelace <ada@"):
+        asyncio.run(resolve("lovelace"))
+    # Nor is a typo match
+    with pytest.raises(ValueError, match="did you mean: Ada Lovelace"):
+        asyncio.run(resolve("Ada Lovelase"))
+    assert asyncio.run(resolve("alan turing")) == ["alan@example.com"]
@@ -0,0 +1,129 @@
+import asyncio
+import httpx
+import pytest
+from microsoft_graph_mcp import drivesync, graph, syncstore, tools
+
+
+def call(tool, **kwargs):
+    return asyncio.run(getattr(tool, "fn", tool)(**kwargs))
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    store = syncstore.SyncStore(tmp_path / "sync.db")
+    monkeypatch.setattr(syncstore, "_store", store)
+    monkeypatch.setattr(drivesync, "DRIVE_SYNC", True)
+    return store
+
+
+def folder(id, name, parent):
+    return {"id": id, "name": name, "parentReference": {"id": parent}, "folder": {}}
+
+
+def file(id, name, parent, size=10, modified="2026-01-01T00:00:00Z"):
+    return {
+        "id": id,
+        "name": name,
+        "parentReference": {"id": parent},
+        "size": size,
+        "lastModifiedDateTime": modified,
+        "file": {"mimeType": "text/plain", "hashes": {"sha1Hash": "AB"}},
+    }
+
+
+DELTA_URL = f"{graph.BASE_URL}/me/drive/root/delta"
+
+
+def delta(items, token, next_link=None):
+    body = {"value": items}
+    if next_link:
+        body["@odata.nextLink"] = f"{DELTA_URL}?page={next_link}"
+    else:
+        body["@odata.deltaLink"] = f"{DELTA_URL}?token={token}"
+    return httpx.Response(200, json=body)
+
+
+INITIAL = [
+    {"id": "root", "name": "root", "root": {}, "folder": {}},
+    folder("docs", "Documents", "root"),
+    folder("rep", "Reports", "docs"),
+    file("q1", "Q1 Report.xlsx", "rep", modified="2026-03-01T00:00:00Z"),
+    file("q2", "Q2 report.xlsx", "rep", modified="2026-06-01T00:00:00Z"),
+    file("cv", "cv.pdf", "root"),
+]
+
+
+def initial_round(request):
+    if "page" in request.url.params:
+        return delta(INITIAL[3:], 1)
+    return delta(INITIAL[:3], None, next_link="2")
+
+
+def test_list_files_and_search_are_local(stub, store):
+    stub.route("GET", "/me/drive/root/delta", initial_round)
+
+    root = call(tools.list_files, account_id="alice")["items"]
+    assert [(i["name"], i["type"]) for i in root] == [
+        ("cv.pdf", "file"),
+        ("Documents", "folder"),
+    ]
+    # The index is the only request; no download URLs are fetched
+    assert all("download_url" not in i for i in root)
+    assert {r.url.path for r in stub.requests} == {"/v1.0/me/drive/root/delta"}
+    reports = call(
+        tools.list_files, account_id="alice", path="documents/REPORTS"
+    )["items"]
+    assert [i["id"] for i in reports] == ["q1", "q2"]
+
+    found = call(tools.search_files, query="report xlsx", account_id="alice")["items"]
+    assert [(i["id"], i["path"]) for i in found] == [
+        ("q2", "/Documents/Reports/Q2 report.xlsx"),
+        ("q1", "/Documents/Reports/Q1 Report.xlsx"),
+    ]
+    # Paths the index has no folder for are left to Graph
+    stub.route(
+        "GET",
+        "/me/drive/root:/cv.pdf:/children",
+        httpx.Response(400, json={"error": {"code": "invalidRequest"}}),
+    )
+    with pytest.raises(httpx.HTTPStatusError):
+        call(tools.list_files, account_id="alice", path="cv.pdf")
+    with pytest.raises(httpx.HTTPStatusError):
+        call(tools.list_files, account_id="alice", path="Missing")
+
+
+def test_incremental_changes_move_rename_and_delete(stub, store):
+    stub.route("GET", "/me/drive/root/delta", initial_round)
+    call(tools.list_files, account_id="alice")
+
+    stub.route(
+        "GET",
+        "/me/drive/root/delta",
+        delta(
+            [
+                file("cv", "resume.pdf", "docs"),
+                {"id": "rep", "deleted": {"state": "deleted"}},
+            ],
+            2,
+        ),
+    )
+    docs = call(tools.list_files, account_id="alice", path="Documents")["items"]
+    assert [i["name"] for i in docs] == ["resume.pdf"]
+    assert store.query("SELECT count(*) FROM drive_items")[0][0] == 3
+    deltas = [r for r in stub.requests if r.url.path.endswith("/delta")]
+    assert deltas[-1].url.params["token"] == "1"
+
+
+def test_resync_after_expired_token(stub, store):
+    stub.route("GET", "/me/drive/root/delta", initial_round)
+    call(tools.list_files, account_id="alice")
+    stub.route(
+        "GET",
+        "/me/drive/root/delta",
+        httpx.Response(410, json={"error": {"code": "resyncRequired"}}),
+        delta([INITIAL[0], file("new", "new.txt", "root")], 7),
+    )
+
+    listing = call(tools.list_files, account_id="alice")["items"]
+    assert [i["id"] for i in listing] == ["new"]
+    assert store.delta_link("alice", "drive").endswith("token=7")
@@ -0,0 +1,480 @@
+import asyncio
+import datetime as dt
+import email.utils
+import json
+import os
+import httpx
+import pytest
+import tracemalloc
+import types
+from microsoft_graph_mcp import graph, ratelimit, retry
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_arequest_retries_once_on_401(stub):
+    stub.route(
+        "GET",
+        "/me",
+        httpx.Response(401),
+        httpx.Response(200, json={"mail": "alice@example.com"}),
+    )
+    assert run(graph.arequest("GET", "/me", "alice"))["mail"] == "alice@example.com"
+    assert [r.headers["Authorization"] for r in stub.requests] == [
+        "Bearer token-0",
+        "Bearer token-1",
+    ]
+
+
+def test_arequest_paginated_follows_next_link(stub):
+    stub.route(
+        "GET",
+        "/me/contacts",
+        lambda request: httpx.Response(
+            200,
+            json={
+                "value": [{"id": "3"}],
+            }
+            if "skip" in request.url.params
+            else {
+                "value": [{"id": "1"}, {"id": "2"}],
+                "@odata.nextLink": f"{graph.BASE_URL}/me/contacts?skip=2",
+            },
+        ),
+    )
+
+    async def collect(limit):
+        return [
+            item["id"]
+            async for item in graph.arequest_paginated("/me/contacts", limit=limit)
+        ]
+
+    assert run(collect(None)) == ["1", "2", "3"]
+    assert run(collect(2)) == ["1", "2"]
+
+
+def paged_listing(pages, log=None, delay=0.0):
+    """Answer /me/contacts with pages of two items linked through ?skip"""
+
+    async def handle(request):
+        skip = int(request.url.params.get("skip", 0))
+        if log is not None:
+            log.append(("request", skip))
+        await asyncio.sleep(delay)
+        body = {"value": [{"id": str(skip * 2 + i)} for i in range(2)]}
+        if skip + 1 < pages:
+            body["@odata.nextLink"] = f"{graph.BASE_URL}/me/contacts?skip={skip + 1}"
+        return httpx.Response(200, json=body)
+
+    return handle
+
+
+def test_arequest_paginated_prefetches_one_page_ahead(stub):
+    log = []
+    stub.route("GET", "/me/contacts", paged_listing(4, log, delay=0.01))
+
+    async def consume(limit):
+        async for item in graph.arequest_paginated(
+            "/me/contacts", limit=limit, prefetch=1
+        ):
+            log.append(("consumed", int(item["id"])))
+            await asyncio.sleep(0.02)
+
+    run(consume(None))
+    # page 2 is fetched while page 1 is consumed, but page 3 has to wait
+    assert log.index(("request", 1)) < log.index(("consumed", 1))
+    assert log.index(("request", 2)) > log.index(("consumed", 1))
+    assert [e[1] for e in log if e[0] == "consumed"] == list(range(8))
+
+    log.clear()
+    run(consume(4))
+    assert [e for e in log if e[0] == "request"] == [("request", 0), ("request", 1)]
+
+
+def test_request_paginated_prefetch_surfaces_errors(stub):
+    listing = paged_listing(3)
+
+    def handle(request):
+        if request.url.params.get("skip") == "1":
+            return httpx.Response(404, json={"error": {"code": "ItemNotFound"}})
+        return asyncio.run(listing(request))
+
+    stub.route("GET", "/me/contacts", handle)
+    seen = []
+    with pytest.raises(httpx.HTTPStatusError):
+        for item in graph.request_paginated("/me/contacts", prefetch=2):
+            seen.append(item["id"])
+    assert seen == ["0", "1"]
+
+
+def test_requests_overlap_on_one_event_loop(stub):
+    in_flight = 0
+    peak = 0
+
+    async def slow(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+        return httpx.Response(200, json={"ok": True})
+
+    stub.route("GET", "/me", slow)
+
+    async def many():
+        return await asyncio.gather(*(graph.arequest("GET", "/me") for _ in range(5)))
+
+    assert len(run(many())) == 5
+    assert peak == 5
+
+
+def test_asearch_query_pages_with_from_offset(stub):
+    def search(request):
+        payload = json.loads(request.content)["requests"][0]
+        start = payload["from"]
+        return httpx.Response(
+            200,
+            json={
+                "value": [
+                    {
+                        "hitsContainers": [
+                            {
+                                "hits": [
+                                    {"resource": {"id": str(start + i)}}
+                                    for i in range(payload["size"])
+                                ],
+                                "moreResultsAvailable": start < 25,
+                            }
+                        ]
+                    }
+                ]
+            },
+        )
+
+    stub.route("POST", "/search/query", search)
+
+    async def collect():
+        return [
+            hit["id"]
+            async for hit in graph.asearch_query("q", ["message"], limit=30)
+        ]
+
+    assert run(collect()) == [str(i) for i in range(30)]
+
+
+def batch_handler(throttle=()):
+    """Answer $batch calls, throttling the given request ids on first sight"""
+    throttled = set()
+    calls = []
+
+    def handle(request):
+        body = json.loads(request.content)
+        calls.append([r["id"] for r in body["requests"]])
+        responses = []
+        failed = set()
+        for r in body["requests"]:
+            if r["id"] in throttle and r["id"] not in throttled:
+                throttled.add(r["id"])
+                failed.add(r["id"])
+                responses.append(
+                    {"id": r["id"], "status": 429, "headers": {"Retry-After": "0"}}
+                )
+            elif failed.intersection(r.get("dependsOn", [])):
+                failed.add(r["id"])
+                responses.append({"id": r["id"], "status": 424})
+            else:
+                responses.append(
+                    {"id": r["id"], "status": 200, "body": {"url": r["url"]}}
+                )
+        # Graph does not guarantee response order
+        return httpx.Response(200, json={"responses": responses[::-1]})
+
+    return handle, calls
+
+
+def test_abatch_splits_and_preserves_order(stub):
+    handle, calls = batch_handler()
+    stub.route("POST", "/$batch", handle)
+    # Pacing is not under test here
+    limiter = ratelimit.RateLimiter(max_rate=1000, burst=64)
+    ratelimit._limiters[(None, "mail")] = limiter
+    requests = [graph.BatchRequest("GET", f"/me/messages/{i}") for i in range(45)]
+
+    results = run(graph.abatch(requests))
+
+    assert [len(c) for c in calls] == [20, 20, 5]
+    assert [r.body["url"] for r in results] == [f"/me/messages/{i}" for i in range(45)]
+
+
+def test_abatch_keeps_dependency_chains_in_one_batch(stub):
+    handle, calls = batch_handler()
+    stub.route("POST", "/$batch", handle)
+    requests = [graph.BatchRequest("GET", f"/x/{i}") for i in range(19)]
+    requests += [
+        graph.BatchRequest("POST", "/me/mailFolders", json={"displayName": "A"}),
+        graph.BatchRequest("GET", "/me/mailFolders", depends_on=[19]),
+    ]
+
+    run(graph.abatch(requests))
+
+    batches = [set(c) for c in calls]
+    assert any({"19", "20"} <= b for b in batches)
+    with pytest.raises(ValueError):
+        graph._plan_batches([graph.BatchRequest("GET", "/a", depends_on=[0])])
+
+
+def test_abatch_retries_throttled_sub_requests(stub):
+    handle, calls = batch_handler(throttle={"1", "3"})
+    stub.route("POST", "/$batch", handle)
+    requests = [
+        graph.BatchRequest("GET", "/a"),
+        graph.BatchRequest("GET", "/b"),
+        graph.BatchRequest("GET", "/c", depends_on=[1]),
+        graph.BatchRequest("GET", "/d"),
+    ]
+
+    results = run(graph.abatch(requests))
+
+    assert [r.status for r in results] == [200] * 4
+    assert sorted(calls[1:]) == [["1", "2"], ["3"]]
+
+
+def test_batch_sync(stub):
+    handle, calls = batch_handler(throttle={"0"})
+    stub.route("POST", "/$batch", handle)
+    results = graph.batch([graph.BatchRequest("DELETE", "/me/messages/1")])
+    assert results[0].status == 200
+    assert calls == [["0"], ["0"]]
+
+
+def test_batch_throttles_accept_http_date_retry_after(stub):
+    when = dt.datetime.now(dt.timezone.utc) + dt.timedelta(seconds=30)
+    requests = [
+        graph.BatchRequest("GET", "/me/messages/1"),
+        graph.BatchRequest("GET", "/me/messages/2"),
+    ]
+    results = [
+        graph.BatchResponse(
+            429, None, {"Retry-After": email.utils.format_datetime(when, usegmt=True)}
+        ),
+        graph.BatchResponse(429, None, {"retry-after": "soon"}),
+    ]
+
+    graph._note_batch_throttles(requests, results, [0, 1], None)
+    (first, first_wait), (second, second_wait) = graph._throttled_units(
+        requests, results, [0, 1]
+    )
+    assert first == [0] and 25 < first_wait <= 30
+    # An unreadable value falls back to the default wait
+    assert second == [1] and second_wait == 5.0
+
+
+CONTENT = bytes(range(256)) * 64
+
+
+class DroppedStream(httpx.AsyncByteStream):
+    """Body that breaks off after the first `sent` bytes"""
+
+    def __init__(self, data, sent):
+        self.data, self.sent = data, sent
+
+    async def __aiter__(self):
+        yield self.data[: self.sent]
+        raise httpx.ReadError("connection reset")
+
+
+def ranged(request, drop_first=0):
+    requested = request.headers.get("Range", "bytes=0-").removeprefix("bytes=")
+    start, _, end = requested.partition("-")
+    data = CONTENT[int(start) : int(end) + 1 if end else None]
+    status = 206 if "Range" in request.headers else 200
+    if drop_first and len(ranged.dropped) < drop_first:
+        ranged.dropped.append(request)
+        return httpx.Response(status, stream=DroppedStream(data, len(data) // 3))
+    return httpx.Response(status, content=data)
+
+
+def test_adownload_file_resumes_with_range_after_a_drop(stub, tmp_path, monkeypatch):
+    monkeypatch.setattr(retry, "RETRY_BASE_DELAY", 0.001)
+    ranged.dropped = []
+    stub.route("GET", "/download", lambda request: ranged(request, drop_first=1))
+    path = tmp_path / "file.bin"
+
+    segments = run(
+        graph.adownload_file("https://host.example/download", path, len(CONTENT))
+    )
+
+    assert segments == 1
+    assert path.read_bytes() == CONTENT
+    assert "Range" not in stub.requests[0].headers
+    assert stub.requests[1].headers["Range"] == f"bytes={len(CONTENT) // 3}-"
+
+
+def test_adownload_file_resumes_a_drop_after_the_retry_deadline(
+    stub, tmp_path, monkeypatch
+):
+    clock = [retry.time.monotonic()]
+    fake_time = types.SimpleNamespace(monotonic=lambda: clock[0])
+    monkeypatch.setattr(retry, "time", fake_time)
+    monkeypatch.setattr(retry, "RETRY_BASE_DELAY", 0.001)
+
+    class SlowDroppedStream(DroppedStream):
+        async def __aiter__(self):
+            yield self.data[: self.sent]
+            # The connection drops well past the deadline of the first request
+            clock[0] += retry.RETRY_DEADLINE + 60
+            raise httpx.ReadError("connection reset")
+
+    stub.route(
+        "GET",
+        "/download",
+        httpx.Response(200, stream=SlowDroppedStream(CONTENT, len(CONTENT) // 3)),
+        lambda request: ranged(request),
+    )
+    path = tmp_path / "file.bin"
+
+    run(graph.adownload_file("https://host.example/download", path, len(CONTENT)))
+
+    assert path.read_bytes() == CONTENT
+    assert stub.requests[1].headers["Range"] == f"bytes={len(CONTENT) // 3}-"
+
+
+def test_adownload_file_fetches_large_files_in_segments(stub, tmp_path, monkeypatch):
+    monkeypatch.setattr(graph, "DOWNLOAD_SEGMENT_MIN", 4096)
+    monkeypatch.setattr(graph, "DOWNLOAD_SEGMENTS", 3)
+    stub.route("GET", "/download", ranged)
+    path = tmp_path / "file.bin"
+
+    segments = run(
+        graph.adownload_file("https://host.example/download", path, len(CONTENT))
+    )
+
+    assert segments == 3
+    assert path.read_bytes() == CONTENT
+    assert sorted(r.headers["Range"] for r in stub.requests) == [
+        "bytes=0-5460",
+        "bytes=10922-16383",
+        "bytes=5461-10921",
+    ]
+
+
+def test_adownload_file_falls_back_without_ranges(stub, tmp_path, monkeypatch):
+    monkeypatch.setattr(graph, "DOWNLOAD_SEGMENT_MIN", 4096)
+    monkeypatch.setattr(graph, "DOWNLOAD_SEGMENTS", 3)
+    stub.route("GET", "/download", lambda request: httpx.Response(200, content=CONTENT))
+    path = tmp_path / "file.bin"
+
+    segments = run(
+        graph.adownload_file("https://host.example/download", path, len(CONTENT))
+    )
+
+    assert segments == 1
+    assert path.read_bytes() == CONTENT
+    assert "Range" not in stub.requests[-1].headers
+
+
+def test_adownload_file_raises_a_failed_segments_error(stub, tmp_path, monkeypatch):
+    monkeypatch.setattr(retry, "RETRY_BASE_DELAY", 0.001)
+    monkeypatch.setattr(graph, "DOWNLOAD_SEGMENT_MIN", 4096)
+    monkeypatch.setattr(graph, "DOWNLOAD_SEGMENTS", 3)
+
+    def handle(request):
+        if request.headers["Range"].startswith("bytes=5461-"):
+            return httpx.Response(500)
+        return ranged(request)
+
+    stub.route("GET", "/download", handle)
+
+    with pytest.raises(httpx.HTTPStatusError) as raised:
+        run(
+            graph.adownload_file(
+                "https://host.example/download", tmp_path / "file.bin", len(CONTENT)
+            )
+        )
+    assert raised.value.response.status_code == 500
+
+
+class UploadSession(httpx.AsyncBaseTransport):
+    """Upload host that consumes each chunk as a stream, as a socket would"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.ranges = []
+
+    async def handle_async_request(self, request):
+        self.ranges.append(request.headers["Content-Range"])
+        index = len(self.ranges) - 1
+        async for part in request.stream:
+            assert part[0] == part[-1] == index
+        if len(self.ranges) < self.chunks:
+            return httpx.Response(202, json={})
+        return httpx.Response(201, json={"id": "f1"})
+
+
+def test_aupload_large_file_streams_from_disk(stub, tmp_path, monkeypatch):
+    chunk_size = 320 * 1024
+    monkeypatch.setattr(graph, "UPLOAD_CHUNK_SIZE", chunk_size)
+    path = tmp_path / "big.bin"
+    with path.open("wb") as f:
+        for i in range(64):
+            f.write(bytes([i]) * chunk_size)
+    size = path.stat().st_size
+    stub.route(
+        "POST",
+        "/me/drive/items/f1/createUploadSession",
+        httpx.Response(200, json={"uploadUrl": "https://upload.example/session"}),
+    )
+    session = UploadSession(64)
+    # Pacing is not under test here
+    limiter = ratelimit.RateLimiter(max_rate=1000, burst=64)
+    ratelimit._limiters[(None, "drive")] = limiter
+    monkeypatch.setitem(
+        graph._async_clients, "upload", httpx.AsyncClient(transport=session)
+    )
+
+    tracemalloc.start()
+    try:
+        result = run(graph.aupload_large_file("/me/drive/items/f1", path))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    assert result == {"id": "f1"}
+    assert session.ranges[0] == f"bytes 0-{chunk_size - 1}/{size}"
+    assert session.ranges[-1] == f"bytes {size - chunk_size}-{size - 1}/{size}"
+    # One reused chunk buffer, not the 20 MiB file
+    assert peak < 2 * chunk_size
+
+
+def test_aupload_large_file_from_a_pipe_needs_its_size(stub, monkeypatch):
+    chunk_size = 1024
+    monkeypatch.setattr(graph, "UPLOAD_CHUNK_SIZE", chunk_size)
+    stub.route(
+        "POST",
+        "/me/drive/items/f1/createUploadSession",
+        httpx.Response(200, json={"uploadUrl": "https://upload.example/session"}),
+    )
+    session = UploadSession(4)
+    monkeypatch.setitem(
+        graph._async_clients, "upload", httpx.AsyncClient(transport=session)
+    )
+    read_fd, write_fd = os.pipe()
+    for i in range(4):
+        os.write(write_fd, bytes([i]) * chunk_size)
+    os.close(write_fd)
+    with os.fdopen(read_fd, "rb") as pipe:
+        with pytest.raises(ValueError, match="size is required"):
+            run(graph.aupload_large_file("/me/drive/items/f1", pipe))
+        assert stub.requests == []
+
+        result = run(
+            graph.aupload_large_file("/me/drive/items/f1", pipe, size=4 * chunk_size)
+        )
+
+    assert result == {"id": "f1"}
+    assert session.ranges == [
+        f"bytes {i * chunk_size}-{(i + 1) * chunk_size - 1}/{4 * chunk_size}"
+        for i in range(4)
+    ]
@@ -0,0 +1,44 @@
+import base64
+import hashlib
+import os
+import pytest
+from microsoft_graph_mcp import hashes
+
+
+def reference_quickxor(data):
+    """Byte-at-a-time port of Microsoft's published QuickXorHash"""
+    cells, shift = [0, 0, 0], 0
+    for byte in data:
+        index, offset = divmod(shift, 64)
+        bits = 32 if index == 2 else 64
+        cells[index] ^= (byte << offset) & (2**64 - 1)
+        if offset > bits - 8:
+            cells[0 if index == 2 else index + 1] ^= byte >> (bits - offset)
+        shift = (shift + 11) % 160
+    digest = bytearray(b"".join(c.to_bytes(8, "little") for c in cells)[:20])
+    for i, byte in enumerate(len(data).to_bytes(8, "little")):
+        digest[12 + i] ^= byte
+    return base64.b64encode(bytes(digest)).decode()
+
+
+@pytest.mark.parametrize("size", [0, 1, 159, 160, 161, 3331, 20000])
+def test_quickxor_matches_reference_across_chunkings(size):
+    data = os.urandom(size)
+    hasher = hashes.QuickXorHash()
+    for i in range(0, size, 97):
+        hasher.update(data[i : i + 97])
+    assert hasher.b64digest() == reference_quickxor(data)
+
+
+def test_verify_prefers_strongest_hash(tmp_path):
+    path = tmp_path / "file.bin"
+    path.write_bytes(b"payload")
+    sha1 = hashlib.sha1(b"payload").hexdigest().upper()
+
+    assert hashes.verify(path, {}) is None
+    assert hashes.verify(path, {"sha1Hash": sha1, "quickXorHash": "x"}) == "sha1Hash"
+    assert hashes.verify(path, {"quickXorHash": reference_quickxor(b"payload")}) == (
+        "quickXorHash"
+    )
+    with pytest.raises(ValueError, match="sha256Hash"):
+        hashes.verify(path, {"sha256Hash": "00", "sha1Hash": sha1})
@@ -0,0 +1,84 @@
+import httpx
+import pytest
+from microsoft_graph_mcp import graph, httpcache
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = httpcache.ResponseCache(max_bytes=10_000, max_entry_bytes=5_000)
+    monkeypatch.setattr(httpcache, "HTTP_CACHE", True)
+    monkeypatch.setattr(httpcache, "_cache", cache)
+    return cache
+
+
+def etag_handler(etag, body):
+    def handle(request):
+        if request.headers.get("If-None-Match") == etag:
+            return httpx.Response(304)
+        return httpx.Response(200, json=body, headers={"ETag": etag})
+
+    return handle
+
+
+def test_refetch_is_served_from_a_304(stub, cache):
+    stub.route("GET", "/me/messages/1", etag_handler('W/"v1"', {"subject": "Hi"}))
+
+    first = graph.request("GET", "/me/messages/1", "alice")
+    first["subject"] = "mutated by a tool"
+    second = graph.request("GET", "/me/messages/1", "alice")
+
+    assert second == {"subject": "Hi"}
+    assert stub.requests[1].headers["If-None-Match"] == 'W/"v1"'
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["hit_ratio"] == 0.5
+    assert stats["bytes_saved"] == len(b'{"subject":"Hi"}')
+
+
+def test_changed_resource_replaces_the_entry(stub, cache):
+    stub.route(
+        "GET",
+        "/me/events/1",
+        httpx.Response(200, json={"v": 1}, headers={"ETag": "a"}),
+        httpx.Response(200, json={"v": 2}, headers={"ETag": "b"}),
+    )
+    graph.request("GET", "/me/events/1")
+    assert graph.request("GET", "/me/events/1") == {"v": 2}
+    assert cache.lookup(next(iter(cache._entries))).etag == "b"
+
+
+def test_download_urls_are_never_served_from_cache(stub, cache):
+    item = {"id": "f1", "@microsoft.graph.downloadUrl": "https://dl.example/f1?t=1"}
+    stub.route("GET", "/me/drive/items/f1", etag_handler("e", item))
+    graph.request("GET", "/me/drive/items/f1")
+    graph.request("GET", "/me/drive/items/f1")
+    assert "If-None-Match" not in stub.requests[1].headers
+    assert cache.stats()["entries"] == 0
+
+
+def test_accounts_do_not_share_entries(stub, cache):
+    stub.route("GET", "/me", etag_handler("x", {"mail": "a@example.com"}))
+    graph.request("GET", "/me", "alice")
+    graph.request("GET", "/me", "bob")
+    assert "If-None-Match" not in stub.requests[1].headers
+    assert cache.stats()["entries"] == 2
+
+
+def test_lru_respects_byte_limits(cache):
+    def response(size):
+        return httpx.Response(200, content=b"x" * size, headers={"ETag": "e"})
+
+    for i in range(4):
+        cache.store(("a", f"/items/{i}", ""), response(3_000))
+    cache.store(("a", "/huge", ""), response(6_000))
+
+    assert cache.size <= cache.max_bytes
+    assert [k[1] for k in cache._entries] == ["/items/1", "/items/2", "/items/3"]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_disabled_by_default(stub):
+    assert httpcache.get_cache() is None
+    stub.route("GET", "/me", etag_handler("x", {}))
+    graph.request("GET", "/me")
+    graph.request("GET", "/me")
+    assert "If-None-Match" not in stub.requests[1].headers
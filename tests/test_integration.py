@@ -20,6 +20,9 @@ def parse_result(result, tool_name=None):
         if text == "[]":
             return []
         data = json.loads(text)
+        # List and search tools return one page: {"items": [...], "next_cursor": ...}
+        if isinstance(data, dict) and "next_cursor" in data:
+            return data["items"]
         # FastMCP seems to unwrap single-element lists, so rewrap for consistency
         list_tools = {
             "list_accounts",
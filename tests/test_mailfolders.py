@@ -0,0 +1,106 @@
+import asyncio
+import httpx
+import pytest
+from microsoft_graph_mcp import graph, mailfolders
+
+
+def folder(id, name, parent="root", children=0):
+    return {
+        "id": id,
+        "displayName": name,
+        "parentFolderId": parent,
+        "childFolderCount": children,
+    }
+
+
+def page(items, next_link=None, delta_link=None):
+    body = {"value": items}
+    if next_link:
+        body["@odata.nextLink"] = f"{graph.BASE_URL}{next_link}"
+    if delta_link:
+        body["@odata.deltaLink"] = f"{graph.BASE_URL}{delta_link}"
+    return httpx.Response(200, json=body)
+
+
+DELTA_LINK = "/me/mailFolders/delta?token=0"
+
+
+@pytest.fixture
+def mailbox(stub):
+    stub.route(
+        "GET",
+        "/me/mailFolders",
+        lambda request: page([folder("p", "Projects", children=2)])
+        if "skip" in request.url.params
+        else page(
+            [folder("i", "Inbox", children=1)], next_link="/me/mailFolders?skip=1"
+        ),
+    )
+    stub.route(
+        "GET", "/me/mailFolders/i/childFolders", page([folder("ia", "Acme", "i")])
+    )
+    stub.route(
+        "GET",
+        "/me/mailFolders/p/childFolders",
+        page([folder("p26", "2026", "p", 1), folder("p25", "2025", "p")]),
+    )
+    stub.route(
+        "GET", "/me/mailFolders/p26/childFolders", page([folder("pa", "Acme", "p26")])
+    )
+    # The walk fills the index; this initial delta round only seeds its delta link
+    stub.route("GET", "/me/mailFolders/delta", page([], delta_link=DELTA_LINK))
+    return stub
+
+
+def resolve(name):
+    return asyncio.run(mailfolders.resolve(name, "alice"))
+
+
+def test_walk_resolves_nested_paths(mailbox):
+    assert resolve("Projects/2026/Acme") == "pa"
+    assert resolve("projects/2026/acme/") == "pa"
+    assert resolve("inbox/ACME") == "ia"
+    assert resolve("2025") == "p25"
+    assert resolve("sent") == "sentitems"
+    with pytest.raises(ValueError, match="ambiguous"):
+        resolve("acme")
+    assert len(mailbox.requests) == 6
+
+
+def test_unknown_folder_refreshes_through_delta(mailbox):
+    mailbox.route(
+        "GET",
+        "/me/mailFolders/delta",
+        page([], delta_link=DELTA_LINK),
+        page([folder("n", "Receipts")], delta_link="/me/mailFolders/delta?token=1"),
+        page(
+            [{"id": "p25", "@removed": {"reason": "deleted"}}, folder("n", "Invoices")],
+            delta_link="/me/mailFolders/delta?token=2",
+        ),
+    )
+
+    assert resolve("Receipts") == "n"
+    # The delta link seeded at build time makes even the first refresh incremental
+    assert mailbox.requests[-1].url.params["token"] == "0"
+    assert resolve("Projects/2026/Acme") == "pa"
+
+    mailfolders.invalidate("alice")
+    assert resolve("Invoices") == "n"
+    with pytest.raises(ValueError, match="not found"):
+        resolve("Projects/2025")
+    deltas = [r for r in mailbox.requests if r.url.path.endswith("/delta")]
+    tokens = [r.url.params.get("token") for r in deltas]
+    assert tokens == [None, "0", "1", "2"]
+
+
+def test_expired_delta_token_resyncs(mailbox):
+    full = page([folder("x", "Only")], delta_link="/me/mailFolders/delta?token=9")
+    seed = page([], delta_link=DELTA_LINK)
+    mailbox.route("GET", "/me/mailFolders/delta", seed, httpx.Response(410), full)
+    index = asyncio.run(mailfolders.get_index("alice"))
+    index.delta_link = f"{graph.BASE_URL}/me/mailFolders/delta?token=old"
+    mailfolders.invalidate("alice")
+
+    assert resolve("Only") == "x"
+    assert list(index.folders) == ["x"]
+    assert index.delta_link.endswith("token=9")
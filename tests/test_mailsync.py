@@ -0,0 +1,340 @@
+import asyncio
+import httpx
+import json
+import pytest
+import threading
+from microsoft_graph_mcp import auth, graph, mailsync, syncstore, tools
+
+
+def call(tool, **kwargs):
+    return asyncio.run(getattr(tool, "fn", tool)(**kwargs))
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    store = syncstore.SyncStore(tmp_path / "sync.db")
+    monkeypatch.setattr(syncstore, "_store", store)
+    monkeypatch.setattr(mailsync, "MAIL_SYNC", True)
+    monkeypatch.setattr(mailsync, "MAIL_SYNC_DAYS", 0)
+    return store
+
+
+def message(id, received, **fields):
+    return {
+        "@odata.etag": "W/x",
+        "id": id,
+        "subject": f"subject {id}",
+        "receivedDateTime": received,
+        "isRead": False,
+        "body": {"contentType": "text", "content": f"body {id}"},
+        **fields,
+    }
+
+
+def delta(items, token):
+    return httpx.Response(
+        200,
+        json={
+            "value": items,
+            "@odata.deltaLink": (
+                f"{graph.BASE_URL}/me/mailFolders/inbox/messages/delta?token={token}"
+            ),
+        },
+    )
+
+
+def list_inbox(limit=10, include_body=True):
+    return call(
+        tools.list_emails,
+        account_id="alice",
+        folder="inbox",
+        limit=limit,
+        include_body=include_body,
+    )["items"]
+
+
+def test_list_emails_is_served_from_the_store(stub, store):
+    stub.route(
+        "GET",
+        "/me/mailFolders/inbox/messages/delta",
+        delta(
+            [
+                message("a", "2026-01-01T10:00:00Z"),
+                message("b", "2026-01-03T10:00:00Z"),
+                message("c", "2026-01-02T10:00:00Z"),
+            ],
+            1,
+        ),
+        delta(
+            [
+                {"id": "b", "isRead": True},
+                {"id": "c", "@removed": {"reason": "deleted"}},
+                message("d", "2026-01-04T10:00:00Z"),
+            ],
+            2,
+        ),
+        delta([], 3),
+    )
+
+    assert [m["id"] for m in list_inbox()] == ["b", "c", "a"]
+    emails = list_inbox()
+    assert [m["id"] for m in emails] == ["d", "b", "a"]
+    assert emails[1]["isRead"] is True
+    assert emails[1]["subject"] == "subject b"
+    assert "@odata.etag" not in emails[0]
+
+    emails = list_inbox(limit=2, include_body=False)
+    assert [m["id"] for m in emails] == ["d", "b"]
+    assert "body" not in emails[0]
+    assert [r.url.params.get("token") for r in stub.requests] == [None, "1", "2"]
+    assert "$select" in stub.requests[0].url.params
+
+
+def test_store_is_used_off_the_event_loop(stub, store, monkeypatch):
+    monkeypatch.setattr(mailsync, "MAIL_SEARCH", True)
+    threads = []
+    for name in ("query", "transaction", "ensure"):
+        method = getattr(store, name)
+
+        def record(*args, method=method, **kwargs):
+            threads.append(threading.current_thread())
+            return method(*args, **kwargs)
+
+        monkeypatch.setattr(store, name, record)
+    stub.route(
+        "GET",
+        "/me/mailFolders/inbox/messages/delta",
+        delta([message("a", "2026-01-01T10:00:00Z")], 1),
+    )
+
+    assert [m["id"] for m in list_inbox()] == ["a"]
+    call(tools.search_emails, query="body", account_id="alice", folder="inbox")
+    assert threads
+    assert threading.main_thread() not in threads
+
+
+def test_moved_messages_end_up_in_the_target_folder(stub, store):
+    def sync(folder, *items):
+        stub.route(
+            "GET", f"/me/mailFolders/{folder}/messages/delta", delta(list(items), 1)
+        )
+        return asyncio.run(mailsync.sync_folder("alice", folder))
+
+    sync("inbox", message("m", "2026-01-01T00:00:00Z"))
+    # the target folder may catch up before the source reports the removal
+    sync("archive", message("m", "2026-01-01T00:00:00Z"))
+    sync("inbox", {"id": "m", "@removed": {"reason": "deleted"}})
+
+    rows = store.query("SELECT id, folder_id FROM messages")
+    assert rows == [("m", "archive")]
+
+
+def test_expired_delta_link_resyncs_the_folder(stub, store):
+    stub.route(
+        "GET",
+        "/me/mailFolders/inbox/messages/delta",
+        delta([message("a", "2026-01-01T00:00:00Z")], 1),
+        httpx.Response(410, json={"error": {"code": "SyncStateNotFound"}}),
+        delta([message("z", "2026-01-05T00:00:00Z")], 9),
+    )
+    list_inbox()
+    assert [m["id"] for m in list_inbox()] == ["z"]
+    assert store.delta_link("alice", "mail:inbox").endswith("token=9")
+
+
+def test_sync_window_falls_back_to_graph_for_short_folders(stub, store, monkeypatch):
+    monkeypatch.setattr(mailsync, "MAIL_SYNC_DAYS", 30)
+    stub.route(
+        "GET",
+        "/me/mailFolders/inbox/messages/delta",
+        delta([message("a", "2026-01-01T00:00:00Z")], 1),
+    )
+    stub.route(
+        "GET",
+        "/me/mailFolders/inbox/messages",
+        httpx.Response(200, json={"value": [{"id": "a"}, {"id": "old"}]}),
+    )
+
+    assert [m["id"] for m in list_inbox(limit=2)] == ["a", "old"]
+    assert "receivedDateTime ge" in stub.requests[0].url.params["$filter"]
+
+
+def folder_delta(folder, items, token):
+    link = f"{graph.BASE_URL}/me/mailFolders/{folder}/messages/delta?token={token}"
+    return httpx.Response(200, json={"value": items, "@odata.deltaLink": link})
+
+
+def person(address, name=""):
+    return {"emailAddress": {"address": address, "name": name}}
+
+
+def well_known_batch(request):
+    responses = [
+        {"id": r["id"], "status": 200, "body": {"id": "INBOX-ID"}}
+        if r["url"].startswith("/me/mailFolders/inbox")
+        else {"id": r["id"], "status": 404, "body": {"error": {}}}
+        for r in json.loads(request.content)["requests"]
+    ]
+    return httpx.Response(200, json={"responses": responses})
+
+
+def test_search_emails_ranks_the_synced_mailbox(stub, store, monkeypatch):
+    monkeypatch.setattr(mailsync, "MAIL_SEARCH", True)
+    stub.route(
+        "GET",
+        "/me/mailFolders",
+        httpx.Response(
+            200,
+            json={
+                "value": [
+                    {"id": "INBOX-ID", "displayName": "Inbox"},
+                    {"id": "P", "displayName": "Projects"},
+                ]
+            },
+        ),
+    )
+    stub.route("GET", "/me/mailFolders/delta", httpx.Response(200, json={"value": []}))
+    stub.route("POST", "/$batch", well_known_batch)
+    stub.route(
+        "GET",
+        "/me/mailFolders/inbox/messages/delta",
+        folder_delta(
+            "inbox",
+            [
+                message(
+                    "a",
+                    "2026-01-01T00:00:00Z",
+                    subject="Quarterly budget",
+                    **{"from": person("cfo@example.com", "Dana Finance")},
+                ),
+                message(
+                    "b",
+                    "2026-03-01T00:00:00Z",
+                    body={
+                        "contentType": "html",
+                        "content": "<p>Draft of the <b>budget</b>&nbsp;plan</p>",
+                    },
+                ),
+            ],
+            1,
+        ),
+    )
+    stub.route(
+        "GET",
+        "/me/mailFolders/P/messages/delta",
+        folder_delta(
+            "P",
+            [
+                message(
+                    "c",
+                    "2026-02-01T00:00:00Z",
+                    toRecipients=[person("budgeteer@example.com")],
+                )
+            ],
+            1,
+        ),
+    )
+
+    found = call(tools.search_emails, query="budg", account_id="alice")["items"]
+    assert [m["id"] for m in found] == ["a", "c", "b"]
+    assert found[2]["snippet"] == "Draft of the **budget** plan"
+    assert found[1]["folderId"] == "P"
+    assert "body" not in found[0]
+
+    # Swept within the last interval: answered without another delta round
+    requests = len(stub.requests)
+    found = call(tools.search_emails, query="dana", account_id="alice")["items"]
+    assert [m["id"] for m in found] == ["a"]
+    assert len(stub.requests) == requests
+
+    found = call(
+        tools.search_emails, query="budget", account_id="alice", folder="P"
+    )["items"]
+    assert [m["id"] for m in found] == ["c"]
+    # The inbox is kept under its well-known name, even when asked for by id
+    found = call(
+        tools.search_emails, query="budget", account_id="alice", folder="INBOX-ID"
+    )["items"]
+    assert [m["id"] for m in found] == ["a", "b"]
+    assert {r[0] for r in store.query("SELECT folder_id FROM messages")} == {
+        "inbox",
+        "P",
+    }
+
+
+def test_search_index_follows_updates_and_removals(stub, store):
+    stub.route(
+        "GET",
+        "/me/mailFolders/inbox/messages/delta",
+        delta([message("a", "2026-01-01T00:00:00Z", subject="Lunch plans")], 1),
+        delta([{"id": "a", "subject": "Dinner plans"}], 2),
+        delta([{"id": "a", "@removed": {"reason": "deleted"}}], 3),
+    )
+
+    def search(query):
+        return [m["id"] for m in mailsync.query_index("alice", query)]
+
+    asyncio.run(mailsync.sync_folder("alice", "inbox"))
+    assert search("lunch") == ["a"]
+    asyncio.run(mailsync.sync_folder("alice", "inbox"))
+    assert search("lunch") == []
+    assert search("dinner body") == ["a"]
+    asyncio.run(mailsync.sync_folder("alice", "inbox"))
+    assert search("dinner") == []
+    assert store.query("SELECT count(*) FROM messages_fts")[0][0] == 0
+    # FTS5 operators in the query are matched as plain words
+    assert search('plans" OR "x') == []
+
+
+def test_sync_keys_rows_by_the_resolved_account(stub, store, monkeypatch):
+    async def aget_token(account_id=None):
+        # What the first token call of a process does for an email address
+        auth._token_aliases[account_id] = "alice-id"
+        return "token"
+
+    monkeypatch.setattr(auth, "_token_aliases", {})
+    monkeypatch.setattr(graph, "aget_token", aget_token)
+    stub.route(
+        "GET",
+        "/me/mailFolders/inbox/messages/delta",
+        delta([message("a", "2026-01-01T10:00:00Z")], 1),
+        delta([], 2),
+    )
+
+    asyncio.run(mailsync.sync_folder("alice@example.com", "inbox"))
+    asyncio.run(mailsync.sync_folder("alice-id", "inbox"))
+
+    assert store.query("SELECT DISTINCT account FROM messages") == [("alice-id",)]
+    # The second call caught up from the stored delta link
+    assert "token=1" in str(stub.requests[1].url)
+
+
+def test_list_emails_files_folders_like_the_mailbox_sweep(stub, store):
+    stub.route(
+        "GET",
+        "/me/mailFolders",
+        httpx.Response(
+            200, json={"value": [{"id": "SENT-ID", "displayName": "Sent Items"}]}
+        ),
+    )
+
+    def batch(request):
+        responses = [
+            {"id": r["id"], "status": 200, "body": {"id": "SENT-ID"}}
+            if r["url"].startswith("/me/mailFolders/sentitems")
+            else {"id": r["id"], "status": 404, "body": {"error": {}}}
+            for r in json.loads(request.content)["requests"]
+        ]
+        return httpx.Response(200, json={"responses": responses})
+
+    stub.route("GET", "/me/mailFolders/delta", httpx.Response(200, json={"value": []}))
+    stub.route("POST", "/$batch", batch)
+    stub.route(
+        "GET",
+        "/me/mailFolders/sentitems/messages/delta",
+        folder_delta("sentitems", [message("s", "2026-01-01T00:00:00Z")], 1),
+    )
+
+    emails = call(tools.list_emails, account_id="alice", folder="Sent Items")
+    assert [m["id"] for m in emails["items"]] == ["s"]
+    assert store.query("SELECT DISTINCT folder_id FROM messages") == [("sentitems",)]
@@ -0,0 +1,109 @@
+import asyncio
+import httpx
+import json
+import pytest
+import types
+from microsoft_graph_mcp import graph, ratelimit
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_resource_for():
+    assert ratelimit.resource_for("/me/messages/1/move") == "mail"
+    assert ratelimit.resource_for("/me/mailFolders/inbox/messages") == "mail"
+    assert ratelimit.resource_for("/me/calendarView?startDateTime=x") == "calendar"
+    assert ratelimit.resource_for("/users/bob@example.com/drive/root") == "drive"
+    assert ratelimit.resource_for("/me/contacts") == "contacts"
+    assert ratelimit.resource_for("/search/query") == "other"
+
+
+def test_bursts_then_paces(clock):
+    limiter = ratelimit.RateLimiter(max_rate=10, burst=3)
+    assert [limiter.reserve() for _ in range(3)] == [0, 0, 0]
+    assert limiter.reserve() == pytest.approx(0.1)
+    assert limiter.reserve() == pytest.approx(0.2)
+    clock[0] += 1
+    assert limiter.reserve() == 0
+
+
+def test_reserving_many_slots_paces_like_that_many_requests(clock):
+    limiter = ratelimit.RateLimiter(max_rate=10, burst=3)
+    assert limiter.reserve(3) == 0
+    assert limiter.reserve(2) == pytest.approx(0.2)
+    assert limiter.reserve() == pytest.approx(0.3)
+    assert limiter.snapshot()["requests"] == 6
+
+
+def test_batches_are_paced_by_their_sub_requests(stub):
+    stub.route(
+        "POST",
+        "/$batch",
+        lambda request: httpx.Response(
+            200,
+            json={
+                "responses": [
+                    {"id": r["id"], "status": 200}
+                    for r in json.loads(request.content)["requests"]
+                ]
+            },
+        ),
+    )
+    asyncio.run(
+        graph.abatch(
+            [
+                graph.BatchRequest("PATCH", f"/me/messages/{i}", json={"isRead": True})
+                for i in range(5)
+            ]
+        )
+    )
+    assert ratelimit._limiters[(None, "mail")].requests == 5
+    assert (None, "other") not in ratelimit._limiters
+
+
+def test_throttle_pauses_halves_and_recovers(clock):
+    limiter = ratelimit.RateLimiter(max_rate=8, burst=5)
+    limiter.on_throttle(2.0)
+    assert limiter.rate == 4
+    assert limiter.reserve() == pytest.approx(2.0)
+
+    for _ in range(100):
+        limiter.on_success()
+    assert limiter.rate == 8
+    assert limiter.snapshot()["throttled"] == 1
+    assert limiter.snapshot()["max_wait_s"] == pytest.approx(2.0)
+
+
+def test_zero_rate_disables_pacing(clock):
+    limiter = ratelimit.RateLimiter(max_rate=0, burst=1)
+    assert [limiter.reserve() for _ in range(50)] == [0] * 50
+
+
+def test_429_slows_other_calls_for_the_same_account(stub, monkeypatch):
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(graph, "asyncio", types.SimpleNamespace(sleep=fake_sleep))
+    stub.route(
+        "GET",
+        "/me/messages",
+        httpx.Response(429, headers={"Retry-After": "3"}),
+        httpx.Response(200, json={"value": []}),
+    )
+    stub.route("GET", "/me/calendar/events", httpx.Response(200, json={"value": []}))
+
+    asyncio.run(graph.arequest("GET", "/me/messages", "alice"))
+    assert sleeps and max(sleeps) == 3
+    waits = len(sleeps)
+    # calendar has its own bucket and is not paused by the mail 429
+    asyncio.run(graph.arequest("GET", "/me/calendar/events", "alice"))
+    assert len(sleeps) == waits
+    metrics = ratelimit.metrics()
+    assert metrics["alice/mail"]["throttled"] == 1
+    assert metrics["alice/calendar"]["throttled"] == 0
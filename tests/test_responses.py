@@ -0,0 +1,56 @@
+from microsoft_graph_mcp import responses
+
+
+def test_query_params_select_and_expand():
+    assert responses.query_params(None) == {}
+    assert responses.query_params(
+        ["subject", "attachments/name", "attachments/size", "id"]
+    ) == {
+        "$select": "id,subject",
+        "$expand": "attachments($select=name,size)",
+    }
+
+
+def test_slim_strips_annotations_empties_and_wrappers():
+    message = {
+        "@odata.context": "https://graph.microsoft.com/v1.0/$metadata#messages",
+        "@odata.etag": 'W/"abc"',
+        "id": "m1",
+        "isRead": False,
+        "categories": [],
+        "ccRecipients": [],
+        "flag": {"flagStatus": "notFlagged"},
+        "from": {"emailAddress": {"name": "Ada", "address": "ada@example.com"}},
+        "toRecipients": [{"emailAddress": {"name": "", "address": "me@example.com"}}],
+        "inferenceClassification": None,
+        "@microsoft.graph.downloadUrl": "https://example.com/d",
+    }
+    assert responses.slim(message) == {
+        "id": "m1",
+        "isRead": False,
+        "flag": {"flagStatus": "notFlagged"},
+        "from": {"name": "Ada", "address": "ada@example.com"},
+        "toRecipients": [{"address": "me@example.com"}],
+        "@microsoft.graph.downloadUrl": "https://example.com/d",
+    }
+
+
+def test_slim_keeps_other_single_key_objects():
+    event = {
+        "id": "e1",
+        "location": {"displayName": "", "address": {"city": "Oslo"}},
+        "responseStatus": {"response": {"kind": "accepted"}},
+        "organizer": {"emailAddress": {"address": "ada@example.com"}},
+    }
+    assert responses.slim(event) == {
+        "id": "e1",
+        "location": {"address": {"city": "Oslo"}},
+        "responseStatus": {"response": {"kind": "accepted"}},
+        "organizer": {"address": "ada@example.com"},
+    }
+
+
+def test_project_keeps_top_level_fields_and_id():
+    items = [{"id": "1", "subject": "s", "body": {"content": "x"}}]
+    projected = responses.project(items, ["subject", "from"])
+    assert projected == [{"id": "1", "subject": "s"}]
@@ -0,0 +1,175 @@
+import httpx
+import pytest
+import random
+import types
+from microsoft_graph_mcp import graph, retry
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(graph, "time", types.SimpleNamespace(sleep=sleeps.append))
+    return sleeps
+
+
+def fail_with(error, then):
+    calls = []
+
+    def handle(request):
+        calls.append(request)
+        if len(calls) == 1:
+            raise error
+        return then
+
+    return handle
+
+
+def test_transport_errors_are_retried_for_idempotent_calls(stub, sleeps):
+    stub.route(
+        "GET",
+        "/me",
+        fail_with(httpx.ReadTimeout("slow"), httpx.Response(200, json={"id": "1"})),
+    )
+    assert graph.request("GET", "/me")["id"] == "1"
+    assert len(sleeps) == 1
+
+
+def test_post_is_only_retried_when_nothing_was_sent(stub, sleeps):
+    stub.route(
+        "POST",
+        "/me/sendMail",
+        fail_with(httpx.ReadTimeout("slow"), httpx.Response(202)),
+    )
+    with pytest.raises(httpx.ReadTimeout):
+        graph.request("POST", "/me/sendMail", json={})
+
+    stub.route(
+        "POST",
+        "/me/sendMail",
+        fail_with(httpx.ConnectError("refused"), httpx.Response(202)),
+    )
+    assert graph.request("POST", "/me/sendMail", json={}) is None
+
+
+def test_post_is_only_retried_when_told_to_come_back(stub, sleeps):
+    stub.route("POST", "/me/sendMail", httpx.Response(500), httpx.Response(202))
+    with pytest.raises(httpx.HTTPStatusError):
+        graph.request("POST", "/me/sendMail", json={})
+
+    stub.route("POST", "/me/sendMail", httpx.Response(503), httpx.Response(202))
+    with pytest.raises(httpx.HTTPStatusError):
+        graph.request("POST", "/me/sendMail", json={})
+    assert sleeps == []
+
+    stub.route(
+        "POST",
+        "/me/sendMail",
+        httpx.Response(503, headers={"Retry-After": "1"}),
+        httpx.Response(429, headers={"Retry-After": "2"}),
+        httpx.Response(202),
+    )
+    assert graph.request("POST", "/me/sendMail", json={}) is None
+    # The 429 also pauses the mail limiter, which sleeps again before the last try
+    assert sleeps[:2] == [1.0, 2.0]
+
+
+def test_server_errors_back_off_with_jitter(stub, sleeps):
+    stub.route(
+        "GET",
+        "/me",
+        httpx.Response(503),
+        httpx.Response(502),
+        httpx.Response(500),
+        httpx.Response(200, json={}),
+    )
+    graph.request("GET", "/me")
+    assert len(sleeps) == 3
+    assert all(retry.RETRY_BASE_DELAY <= s <= retry.RETRY_MAX_DELAY for s in sleeps)
+
+
+def test_decorrelated_jitter_stays_in_bounds(stub):
+    random.seed(7)
+    attempts = retry.Retry("GET", graph.BASE_URL, max_retries=50, deadline=1e6)
+    previous = retry.RETRY_BASE_DELAY
+    for _ in range(50):
+        delay = attempts._next_delay(None)
+        ceiling = min(retry.RETRY_MAX_DELAY, previous * 3)
+        assert retry.RETRY_BASE_DELAY <= delay <= ceiling
+        previous = delay
+
+
+def test_retry_after_past_the_deadline_gives_up(stub, sleeps):
+    stub.route("GET", "/me", httpx.Response(429, headers={"Retry-After": "600"}))
+    with pytest.raises(httpx.HTTPStatusError):
+        graph.request("GET", "/me")
+    assert len(stub.requests) == 1
+    assert sleeps == []
+
+
+def test_budget_limits_retries_across_calls():
+    budget = retry.RetryBudget(ratio=0.5, per_second=0, maximum=2)
+    assert budget.withdraw() and budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw()
+    assert budget.exhausted == 1
+
+
+def test_exhausted_budget_stops_retrying(stub, sleeps, monkeypatch):
+    monkeypatch.setattr(
+        retry, "_budget", retry.RetryBudget(ratio=0, per_second=0, maximum=0)
+    )
+    stub.route("GET", "/me", httpx.Response(503), httpx.Response(200, json={}))
+    with pytest.raises(httpx.HTTPStatusError):
+        graph.request("GET", "/me")
+    assert sleeps == []
+
+
+def test_circuit_opens_and_fails_fast(stub, sleeps, monkeypatch):
+    breaker = retry.CircuitBreaker(threshold=3, reset_after=30)
+    monkeypatch.setattr(retry, "_breakers", {"graph.microsoft.com": breaker})
+    stub.route("GET", "/me", httpx.Response(503))
+
+    with pytest.raises(httpx.HTTPStatusError):
+        graph.request("GET", "/me", max_retries=5)
+    assert len(stub.requests) == 3
+    assert breaker.state == "open"
+
+    with pytest.raises(retry.CircuitOpenError):
+        graph.request("GET", "/me")
+    assert len(stub.requests) == 3
+
+
+def test_only_unhealthy_host_statuses_open_the_circuit(stub, sleeps, monkeypatch):
+    breaker = retry.CircuitBreaker(threshold=2, reset_after=30)
+    monkeypatch.setattr(retry, "_breakers", {"graph.microsoft.com": breaker})
+    stub.route("GET", "/me", httpx.Response(500))
+    with pytest.raises(httpx.HTTPStatusError):
+        graph.request("GET", "/me", max_retries=3)
+    assert len(stub.requests) == 4
+    assert breaker.state == "closed" and breaker.failures == 0
+
+    stub.route("GET", "/me", httpx.Response(504))
+    with pytest.raises(httpx.HTTPStatusError):
+        graph.request("GET", "/me", max_retries=3)
+    assert breaker.state == "open"
+
+
+def test_half_open_probe_closes_the_circuit(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(retry.time, "monotonic", lambda: now[0])
+    breaker = retry.CircuitBreaker(threshold=1, reset_after=10)
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    now[0] = 11
+    assert breaker.allow()
+    assert not breaker.allow()  # one probe at a time
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] = 22
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
@@ -0,0 +1,74 @@
+import json
+import threading
+import pytest
+from microsoft_graph_mcp import token_store
+
+
+def rt(secret):
+    return {"credential_type": "RefreshToken", "secret": secret}
+
+
+@pytest.fixture(params=["file", "sqlite"])
+def make_store(request, tmp_path):
+    def make():
+        if request.param == "file":
+            return token_store.FileTokenStore(tmp_path / "cache.json")
+        return token_store.SqliteTokenStore(tmp_path / "cache.db")
+
+    return make
+
+
+def test_diff_and_apply_round_trip():
+    base = {"RefreshToken": {"a": rt("1"), "b": rt("2")}}
+    current = {"RefreshToken": {"a": rt("1"), "c": rt("3")}, "Account": {"x": {}}}
+    upserts, deletions = token_store.diff_state(base, current)
+    assert upserts == {"RefreshToken": {"c": rt("3")}, "Account": {"x": {}}}
+    assert deletions == {"RefreshToken": {"b"}}
+    assert token_store.apply_changes(base, upserts, deletions) == current
+
+
+def test_writers_merge_instead_of_overwriting(make_store):
+    first, second = make_store(), make_store()
+    first.save({"RefreshToken": {"alice": rt("a1")}}, {})
+    # second never loaded alice's token but must not drop it
+    second.save({"RefreshToken": {"bob": rt("b1")}}, {})
+    first.save({"RefreshToken": {"alice": rt("a2")}}, {})
+    second.save({}, {"RefreshToken": {"bob"}})
+
+    assert make_store().load() == {"RefreshToken": {"alice": rt("a2")}}
+
+
+def test_version_changes_for_other_writers(make_store):
+    reader, writer = make_store(), make_store()
+    before = reader.version()
+    writer.save({"RefreshToken": {"alice": rt("a1")}}, {})
+    assert reader.version() != before
+
+
+def test_concurrent_writers_lose_nothing(make_store):
+    def worker(n):
+        store = make_store()
+        for i in range(20):
+            store.save({"RefreshToken": {f"acct-{n}-{i}": rt(str(i))}}, {})
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(make_store().load()["RefreshToken"]) == 80
+
+
+def test_file_store_writes_atomically(tmp_path):
+    store = token_store.FileTokenStore(tmp_path / "cache.json")
+    store.save({"RefreshToken": {"alice": rt("a1")}}, {})
+    assert json.loads((tmp_path / "cache.json").read_text())
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_sqlite_store_imports_json_cache(tmp_path):
+    seed = tmp_path / "cache.json"
+    seed.write_text(json.dumps({"RefreshToken": {"alice": rt("a1")}}))
+    store = token_store.SqliteTokenStore(tmp_path / "cache.db", seed=seed)
+    assert store.load() == {"RefreshToken": {"alice": rt("a1")}}
@@ -0,0 +1,365 @@
+import asyncio
+import fastmcp
+import hashlib
+import json
+import httpx
+import pytest
+from microsoft_graph_mcp import auth, graph, ratelimit, tools
+
+
+def call(tool, **kwargs):
+    # FastMCP 2.x wraps tools in FunctionTool; newer versions return the function
+    return asyncio.run(getattr(tool, "fn", tool)(**kwargs))
+
+
+def test_move_emails_resolves_folder_once(stub):
+    stub.route(
+        "GET",
+        "/me/mailFolders",
+        httpx.Response(200, json={"value": [{"id": "f-1", "displayName": "Acme"}]}),
+    )
+
+    def handle(request):
+        body = json.loads(request.content)
+        return httpx.Response(
+            200,
+            json={
+                "responses": [
+                    {"id": r["id"], "status": 201, "body": {"id": f"new-{r['id']}"}}
+                    if r["body"]["destinationId"] == "f-1" and r["id"] != "1"
+                    else {
+                        "id": r["id"],
+                        "status": 404,
+                        "body": {"error": {"message": "Not found"}},
+                    }
+                    for r in body["requests"]
+                ]
+            },
+        )
+
+    stub.route("GET", "/me/mailFolders/delta", httpx.Response(200, json={"value": []}))
+    stub.route("POST", "/$batch", handle)
+
+    result = call(
+        tools.move_emails,
+        email_ids=["a", "b", "c"],
+        destination_folder="acme",
+        account_id="alice",
+    )
+
+    assert result == [
+        {"id": "a", "status": "moved", "new_id": "new-0"},
+        {"id": "b", "status": "error", "code": 404, "error": "Not found"},
+        {"id": "c", "status": "moved", "new_id": "new-2"},
+    ]
+    assert sorted(r.url.path for r in stub.requests) == [
+        "/v1.0/$batch",
+        "/v1.0/me/mailFolders",
+        "/v1.0/me/mailFolders/delta",
+    ]
+
+
+def test_delete_emails_uses_one_batch_per_twenty(stub):
+    def handle(request):
+        body = json.loads(request.content)
+        return httpx.Response(
+            200,
+            json={
+                "responses": [{"id": r["id"], "status": 204} for r in body["requests"]]
+            },
+        )
+
+    stub.route("POST", "/$batch", handle)
+    # Pacing is not under test here
+    limiter = ratelimit.RateLimiter(max_rate=1000, burst=64)
+    ratelimit._limiters[("alice", "mail")] = limiter
+    ids = [f"m{i}" for i in range(45)]
+
+    result = call(tools.delete_emails, email_ids=ids, account_id="alice")
+
+    assert [r["status"] for r in result] == ["deleted"] * 45
+    assert len(stub.requests) == 3
+
+
+def test_check_availability_fetches_profile_once(stub):
+    stub.route("GET", "/me", httpx.Response(200, json={"mail": "alice@example.com"}))
+    stub.route(
+        "POST", "/me/calendar/getSchedule", httpx.Response(200, json={"value": []})
+    )
+
+    for _ in range(3):
+        call(
+            tools.check_availability,
+            account_id="alice",
+            start="2026-01-01T09:00:00",
+            end="2026-01-01T17:00:00",
+        )
+
+    assert [r.url.path for r in stub.requests].count("/v1.0/me") == 1
+    schedule = json.loads(stub.requests[-1].content)
+    assert schedule["schedules"] == ["alice@example.com"]
+
+
+def test_renaming_a_folder_refreshes_the_folder_list(stub):
+    stub.route(
+        "GET",
+        "/me/mailFolders",
+        httpx.Response(200, json={"value": [{"id": "f-1", "displayName": "Acme"}]}),
+    )
+    delta_link = f"{graph.BASE_URL}/me/mailFolders/delta?token="
+    stub.route(
+        "GET",
+        "/me/mailFolders/delta",
+        httpx.Response(200, json={"value": [], "@odata.deltaLink": delta_link + "0"}),
+        httpx.Response(
+            200,
+            json={
+                "value": [{"id": "f-1", "displayName": "Clients"}],
+                "@odata.deltaLink": delta_link + "1",
+            },
+        ),
+    )
+    stub.route(
+        "PATCH",
+        "/me/mailFolders/f-1",
+        httpx.Response(200, json={"id": "f-1", "displayName": "Clients"}),
+    )
+    stub.route("POST", "/me/messages/m1/move", httpx.Response(201, json={"id": "m1b"}))
+
+    call(tools.move_email, email_id="m1", destination_folder="acme", account_id="alice")
+    call(
+        tools.rename_mail_folder, folder="Acme", new_name="Clients", account_id="alice"
+    )
+    call(
+        tools.move_email,
+        email_id="m1",
+        destination_folder="clients",
+        account_id="alice",
+    )
+
+    paths = [r.url.path for r in stub.requests]
+    assert paths.count("/v1.0/me/mailFolders") == 1
+    assert paths.count("/v1.0/me/mailFolders/delta") == 2
+    assert stub.requests[-2].url.params["token"] == "0"
+
+
+def test_list_emails_pages_through_cursors(stub):
+    def handle(request):
+        skip = int(request.url.params.get("$skiptoken", 0))
+        body = {"value": [{"id": f"m{skip + i}"} for i in range(2)]}
+        if skip < 2:
+            body["@odata.nextLink"] = (
+                f"{graph.BASE_URL}/me/mailFolders/inbox/messages?$skiptoken={skip + 2}"
+            )
+        return httpx.Response(200, json=body)
+
+    stub.route("GET", "/me/mailFolders/inbox/messages", handle)
+
+    first = call(tools.list_emails, account_id="alice", limit=2)
+    assert [m["id"] for m in first["items"]] == ["m0", "m1"]
+    second = call(
+        tools.list_emails, account_id="alice", limit=2, cursor=first["next_cursor"]
+    )
+    assert [m["id"] for m in second["items"]] == ["m2", "m3"]
+    assert second["next_cursor"] is None
+    # One round trip per page
+    assert len(stub.requests) == 2
+    assert stub.requests[1].url.params["$skiptoken"] == "2"
+
+    with pytest.raises(ValueError, match="not issued"):
+        call(
+            tools.list_emails,
+            account_id="alice",
+            folder="sent",
+            cursor=first["next_cursor"],
+        )
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        call(tools.list_emails, account_id="alice", cursor="%%%")
+
+
+def test_cursors_outlive_a_restart_for_email_accounts(stub, monkeypatch):
+    stub.route(
+        "GET",
+        "/me/mailFolders/inbox/messages",
+        httpx.Response(
+            200,
+            json={
+                "value": [{"id": "m0"}],
+                "@odata.nextLink": f"{graph.BASE_URL}/me/messages?$skiptoken=1",
+            },
+        ),
+    )
+    stub.route("GET", "/me/messages", httpx.Response(200, json={"value": []}))
+    aliases = {}
+    monkeypatch.setattr(auth, "_token_aliases", aliases)
+
+    async def aget_token(account_id=None):
+        # As in auth.get_token, the first token call maps the email to its account
+        aliases[account_id] = "alice-home-id"
+        return "token"
+
+    monkeypatch.setattr(graph, "aget_token", aget_token)
+    first = call(tools.list_emails, account_id="alice@example.com", limit=1)
+    # A fresh process has not resolved the email address yet
+    aliases.clear()
+
+    second = call(
+        tools.list_emails,
+        account_id="alice@example.com",
+        limit=1,
+        cursor=first["next_cursor"],
+    )
+    assert second["items"] == []
+
+
+def test_search_files_continues_from_the_search_offset(stub):
+    def search(request):
+        offset = json.loads(request.content)["requests"][0]["from"]
+        hits = [
+            {"resource": {"id": f"f{offset + i}", "name": f"f{offset + i}.txt"}}
+            for i in range(2)
+        ]
+        container = {"hits": hits, "moreResultsAvailable": offset == 0}
+        return httpx.Response(200, json={"value": [{"hitsContainers": [container]}]})
+
+    stub.route("POST", "/search/query", search)
+
+    first = call(tools.search_files, query="f", account_id="alice", limit=2)
+    second = call(
+        tools.search_files,
+        query="f",
+        account_id="alice",
+        limit=2,
+        cursor=first["next_cursor"],
+    )
+    assert [f["id"] for f in first["items"] + second["items"]] == [
+        "f0",
+        "f1",
+        "f2",
+        "f3",
+    ]
+    assert second["next_cursor"] is None
+
+
+def test_fields_drive_select_and_expand(stub):
+    stub.route(
+        "GET",
+        "/me/messages/m1",
+        httpx.Response(
+            200,
+            json={
+                "@odata.context": "ctx",
+                "id": "m1",
+                "subject": "Hi",
+                "attachments": [{"@odata.type": "#file", "name": "a.pdf"}],
+            },
+        ),
+    )
+    email = call(
+        tools.get_email,
+        email_id="m1",
+        account_id="alice",
+        fields=["subject", "attachments/name"],
+    )
+    params = stub.requests[0].url.params
+    assert params["$select"] == "id,subject"
+    assert params["$expand"] == "attachments($select=name)"
+    assert email == {"id": "m1", "subject": "Hi", "attachments": [{"name": "a.pdf"}]}
+
+
+def test_list_emails_returns_trimmed_text_bodies(stub):
+    stub.route(
+        "GET",
+        "/me/mailFolders/inbox/messages",
+        httpx.Response(
+            200,
+            json={
+                "value": [
+                    {
+                        "id": "m1",
+                        "uniqueBody": {"contentType": "text", "content": "Yes."},
+                    },
+                    {
+                        "id": "m2",
+                        "uniqueBody": {"contentType": "text", "content": "x" * 500},
+                    },
+                ]
+            },
+        ),
+    )
+    emails = call(tools.list_emails, account_id="alice", body_max_length=100)
+
+    request = stub.requests[0]
+    assert request.headers["Prefer"] == 'outlook.body-content-type="text"'
+    selected = request.url.params["$select"].split(",")
+    assert "uniqueBody" in selected and "body" not in selected
+    first, second = emails["items"]
+    assert first["body"] == {"contentType": "text", "content": "Yes."}
+    assert second["body"]["truncated"] is True
+    assert len(second["body"]["content"]) < 150
+
+
+def test_list_emails_selects_full_body_only_with_quotes(stub):
+    history = "\n\nOn Monday, Bob wrote:\n> older thread"
+    stub.route(
+        "GET",
+        "/me/mailFolders/inbox/messages",
+        httpx.Response(
+            200,
+            json={
+                "value": [
+                    {
+                        "id": "m1",
+                        "body": {"contentType": "text", "content": "Yes." + history},
+                        "uniqueBody": {"contentType": "text", "content": "Yes."},
+                    }
+                ]
+            },
+        ),
+    )
+    emails = call(tools.list_emails, account_id="alice", include_quoted=True)
+
+    selected = stub.requests[0].url.params["$select"].split(",")
+    assert "body" in selected and "uniqueBody" in selected
+    assert emails["items"][0]["body"]["content"] == "Yes." + history
+
+
+def test_get_file_streams_and_verifies(stub, tmp_path):
+    content = b"quarterly numbers\n" * 1000
+    item = {
+        "id": "f1",
+        "name": "report.csv",
+        "size": len(content),
+        "@microsoft.graph.downloadUrl": "https://files.example/dl/f1",
+        "file": {"hashes": {"sha1Hash": hashlib.sha1(content).hexdigest().upper()}},
+    }
+    stub.route("GET", "/me/drive/items/f1", httpx.Response(200, json=item))
+    stub.route("GET", "/dl/f1", httpx.Response(200, content=content))
+    path = tmp_path / "report.csv"
+
+    result = call(
+        tools.get_file, file_id="f1", account_id="alice", download_path=str(path)
+    )
+    assert result["verified"] == "sha1Hash"
+    assert path.read_bytes() == content
+
+    item["file"]["hashes"]["sha1Hash"] = "0" * 40
+    stub.route("GET", "/me/drive/items/f1", httpx.Response(200, json=item))
+    path.unlink()
+    with pytest.raises(ValueError, match="does not match"):
+        call(tools.get_file, file_id="f1", account_id="alice", download_path=str(path))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_server_lifespan_runs_the_token_refresher(monkeypatch):
+    refresher = auth.TokenRefresher()
+    refresher.run_once = lambda: None
+    monkeypatch.setattr(auth, "_refresher", refresher)
+    monkeypatch.setattr(auth, "BACKGROUND_REFRESH", True)
+
+    async def connect():
+        async with fastmcp.Client(tools.mcp):
+            assert refresher._thread.is_alive()
+
+    asyncio.run(connect())
+    assert refresher._thread is None